@@ -0,0 +1,246 @@
+# Statistics cube measures for azstat-report
+
+import heapq
+import json
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+from config import Config
+from periods import period_key, previous_period_key
+
+try:
+    import pyarrow
+except ImportError:  # Optional dependency
+    pyarrow = None
+
+
+# Section I row codes per form
+SALES_ROWS = {'1-isth': '1', '12-isth': '1'}
+EXPORT_ROWS = {'1-isth': '8', '12-isth': '1.2'}
+
+# Cube dimensions (API name -> stats_cube column) and summed measures
+CUBE_DIMENSIONS = {
+    'report_type': 'report_type',
+    'period': 'period_key',
+    'activity_code': 'activity_code',
+    'region': 'region',
+}
+CUBE_MEASURES = ('reports', 'sales', 'exports', 'product_sales')
+
+# Measures that can be ranked by change against the previous period
+RANKING_METRICS = ('sales', 'exports', 'product_sales')
+RANKING_ORDERS = ('change', 'change_pct')
+
+# Product fields available in time series
+PRODUCT_FIELDS = (
+    'produced', 'internal_use', 'sold_quantity', 'sold_value', 'year_end_stock', 'import_value'
+)
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+
+def report_metrics(report_type: str, section_i: List[Dict[str, Any]], products: List[Dict[str, Any]]) -> Dict[str, float]:
+    """One report's contribution to the cube (from Section I rows and products as dicts)."""
+    sales_row = SALES_ROWS.get(report_type)
+    export_row = EXPORT_ROWS.get(report_type)
+    sales = exports = 0.0
+    for row in section_i:
+        code = row.get('row_code')
+        if code == sales_row:
+            sales += row.get('current_year') or 0.0
+        elif code == export_row:
+            exports += row.get('current_year') or 0.0
+    return {
+        'sales': sales,
+        'exports': exports,
+        'product_sales': sum(product.get('sold_value') or 0.0 for product in products),
+    }
+
+
+def parse_dimensions(dims: Optional[str]) -> List[str]:
+    """Parse comma-separated cube dimensions ('period,region')."""
+    names = [name.strip() for name in (dims or '').split(',') if name.strip()]
+    unknown = [name for name in names if name not in CUBE_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown dimension: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def parse_codes(codes: Optional[str]) -> List[str]:
+    """Parse a comma-separated code list ('1,8'), keeping order."""
+    return list(dict.fromkeys(code.strip() for code in (codes or '').split(',') if code.strip()))
+
+
+def build_timeseries(
+    reports: Iterable[Tuple[str, Optional[str], Optional[str]]],
+    row_codes: List[str],
+    product_codes: List[str],
+    product_fields: List[str],
+    max_points: int = Config.TIMESERIES_MAX_POINTS
+) -> Dict[str, Any]:
+    """Columnar series from (period, section_i_json, section_ii_json) in period order.
+    
+    Section I rows give current_year values, products the selected fields
+    (summed if a code repeats). Missing values are None. Histories longer
+    than max_points are averaged over buckets of 'step' periods, labelled
+    with the bucket's first period.
+    """
+    periods: List[str] = []
+    rows: Dict[str, List[Optional[float]]] = {code: [] for code in row_codes}
+    products = {code: {field: [] for field in product_fields} for code in product_codes}
+    
+    for period, section_i_data, section_ii_data in reports:
+        periods.append(period)
+        if rows:
+            values: Dict[str, float] = {}
+            for row in json.loads(section_i_data) if section_i_data else []:
+                values.setdefault(row.get('row_code'), row.get('current_year'))
+            for code, column in rows.items():
+                column.append(values.get(code))
+        if products:
+            totals: Dict[str, Dict[str, float]] = {}
+            for product in json.loads(section_ii_data) if section_ii_data else []:
+                code = product.get('product_code')
+                if code in products:
+                    total = totals.setdefault(code, dict.fromkeys(product_fields, 0.0))
+                    for field in product_fields:
+                        total[field] += product.get(field) or 0.0
+            for code, columns in products.items():
+                for field, column in columns.items():
+                    column.append(totals[code][field] if code in totals else None)
+    
+    step = max(1, -(-len(periods) // max_points)) if max_points > 0 else 1
+    if step > 1:
+        periods = periods[::step]
+        rows = {code: _bucket_means(column, step) for code, column in rows.items()}
+        products = {
+            code: {field: _bucket_means(column, step) for field, column in columns.items()}
+            for code, columns in products.items()
+        }
+    return {'periods': periods, 'step': step, 'rows': rows, 'products': products}
+
+
+def _bucket_means(values: List[Optional[float]], step: int) -> List[Optional[float]]:
+    means = []
+    for start in range(0, len(values), step):
+        present = [value for value in values[start:start + step] if value is not None]
+        means.append(sum(present) / len(present) if present else None)
+    return means
+
+
+def ranking_periods(period: str, metric: str, by: str) -> Tuple[int, int]:
+    """Validate ranking arguments; returns (current, previous) period keys."""
+    if metric not in RANKING_METRICS:
+        raise ValueError(f"Unknown metric: {metric}")
+    if by not in RANKING_ORDERS:
+        raise ValueError(f"Unknown ranking: {by}")
+    current = period_key(period)
+    if current is None:
+        raise ValueError(f"Invalid period: {period}")
+    return current, previous_period_key(current)
+
+
+def top_movers(
+    pairs: Iterable[Tuple[str, Optional[str], float, float]],
+    limit: int,
+    by: str = 'change'
+) -> List[Dict[str, Any]]:
+    """Largest changes from (org_code, org_name, current, previous), kept in a bounded heap.
+    
+    Ranked by absolute change or absolute percentage change (organizations
+    with a zero previous value have no percentage and are skipped then).
+    """
+    def movers():
+        for code, name, current, previous in pairs:
+            change = current - previous
+            change_pct = round(change / abs(previous) * 100, 2) if previous else None
+            if by == 'change_pct' and change_pct is None:
+                continue
+            yield {
+                'organization_code': code,
+                'organization_name': name,
+                'current': current,
+                'previous': previous,
+                'change': change,
+                'change_pct': change_pct,
+            }
+    
+    return heapq.nlargest(limit, movers(), key=lambda mover: abs(mover[by]))
+
+
+def comparison_matrix(reports: Iterable[Tuple[str, Optional[str], Optional[str]]]) -> Dict[str, Any]:
+    """Compare any number of periods from (period, section_i_json, section_ii_json) in period order.
+    
+    Returns Section I current_year values as a rows x periods matrix and,
+    per product and field, the values plus absolute and percentage change
+    from the previous period (None where either side is missing or the
+    previous value is 0). One decoding pass, linear in the number of periods.
+    """
+    periods: List[str] = []
+    rows: Dict[str, Dict[str, Any]] = {}
+    products: Dict[str, Dict[str, Any]] = {}
+    
+    for index, (period, section_i_data, section_ii_data) in enumerate(reports):
+        periods.append(period)
+        for row in json.loads(section_i_data) if section_i_data else []:
+            entry = rows.setdefault(row.get('row_code'), {'row_name': row.get('row_name', ''), 'values': {}})
+            entry['values'].setdefault(index, row.get('current_year'))
+        for product in json.loads(section_ii_data) if section_ii_data else []:
+            code = product.get('product_code')
+            if not code:
+                continue
+            entry = products.setdefault(code, {'product_name': product.get('product_name', ''), 'values': {}})
+            totals = entry['values'].setdefault(index, dict.fromkeys(PRODUCT_FIELDS, 0.0))
+            for field in PRODUCT_FIELDS:
+                totals[field] += product.get(field) or 0.0
+    
+    count = len(periods)
+    return {
+        'periods': periods,
+        'rows': [
+            {'row_code': code, 'row_name': entry['row_name'], 'values': [entry['values'].get(i) for i in range(count)]}
+            for code, entry in rows.items()
+        ],
+        'products': [
+            {
+                'product_code': code,
+                'product_name': entry['product_name'],
+                'fields': {
+                    field: _with_changes([
+                        entry['values'][i][field] if i in entry['values'] else None for i in range(count)
+                    ])
+                    for field in PRODUCT_FIELDS
+                },
+            }
+            for code, entry in products.items()
+        ],
+    }
+
+
+def _with_changes(values: List[Optional[float]]) -> Dict[str, List[Optional[float]]]:
+    """Values with change and change_pct from the previous period (first entry None)."""
+    change: List[Optional[float]] = [None]
+    change_pct: List[Optional[float]] = [None]
+    for previous, current in zip(values, values[1:]):
+        if previous is None or current is None:
+            change.append(None)
+            change_pct.append(None)
+            continue
+        change.append(current - previous)
+        change_pct.append(round((current - previous) / abs(previous) * 100, 2) if previous else None)
+    return {'values': values, 'change': change, 'change_pct': change_pct}
+
+
+def timeseries_to_arrow(series: Dict[str, Any]) -> bytes:
+    """Encode a time series as an Arrow IPC stream (columns: period, row:<code>, <product>:<field>)."""
+    if pyarrow is None:
+        raise RuntimeError("Arrow output requires the pyarrow package")
+    columns = {'period': pyarrow.array(series['periods'], type=pyarrow.string())}
+    for code, values in series['rows'].items():
+        columns[f"row:{code}"] = pyarrow.array(values, type=pyarrow.float64())
+    for code, fields in series['products'].items():
+        for field, values in fields.items():
+            columns[f"{code}:{field}"] = pyarrow.array(values, type=pyarrow.float64())
+    table = pyarrow.table(columns)
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
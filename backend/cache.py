@@ -0,0 +1,150 @@
+# Caching helpers for azstat-report
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from models import ReportData
+
+
+class LRUCache:
+    """Thread-safe bounded LRU cache."""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get value and mark it as recently used."""
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any):
+        """Store value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove a single entry."""
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def invalidate(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Remove all entries for which predicate(key, value) is true."""
+        with self._lock:
+            stale = [key for key, value in self._data.items() if predicate(key, value)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class VersionedTTLCache:
+    """Thread-safe bounded cache whose entries live for a short TTL.
+    
+    An expired entry is not recomputed right away: the data version is read
+    first, and if it has not changed the entry is kept for another TTL. So
+    at most one cheap version read per key and TTL reaches the database.
+    clear() drops everything (used for local writes); a compute that was
+    already running when clear() was called does not store its result.
+    """
+    
+    def __init__(self, ttl: float, max_size: int = 256, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._clock = clock
+        # key -> (value, version, expires_at)
+        self._data: "OrderedDict[Hashable, Tuple[Any, Any, float]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+    
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], version: Callable[[], Any]) -> Any:
+        """Get cached value, revalidating with version() when expired, else compute()."""
+        with self._lock:
+            entry = self._data.get(key)
+            generation = self._generation
+            if entry and self._clock() < entry[2]:
+                self._data.move_to_end(key)
+                return entry[0]
+        
+        current = version()
+        if entry and entry[1] == current:
+            value = entry[0]
+        else:
+            value = compute()
+        
+        with self._lock:
+            if generation == self._generation:
+                self._data[key] = (value, current, self._clock() + self.ttl)
+                self._data.move_to_end(key)
+                while len(self._data) > self.max_size:
+                    self._data.popitem(last=False)
+        return value
+    
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class SingleFlight:
+    """Coalesces concurrent async calls with the same key into one execution.
+    
+    The first caller starts func() as its own task; callers arriving while it
+    runs await the same task and get the same result (or exception). A caller
+    being cancelled does not cancel the shared work.
+    """
+    
+    def __init__(self):
+        self._inflight: Dict[Hashable, "asyncio.Future"] = {}
+    
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Run func() once per key at a time and return its result to every caller."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+    
+    def _forget(self, key: Hashable, task: "asyncio.Future"):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+    
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+def report_digest(report: ReportData) -> str:
+    """Stable SHA-256 digest of report content (upload time excluded)."""
+    payload = report.model_dump(mode='json', exclude={'uploaded_at'})
+    canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
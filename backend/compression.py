@@ -0,0 +1,52 @@
+# Response compression for azstat-report
+
+import gzip
+from typing import Optional, List
+
+from config import Config
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+
+def supported_encodings() -> List[str]:
+    """Content encodings this server can produce, in preference order."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick a content encoding from an Accept-Encoding header (None = identity)."""
+    if not accept_encoding:
+        return None
+    
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name] = q
+    
+    candidates = [
+        (weights.get(encoding, weights.get('*', 0.0)), -index, encoding)
+        for index, encoding in enumerate(supported_encodings())
+    ]
+    q, _, encoding = max(candidates)
+    return encoding if q > 0 else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress body with the given content encoding."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=Config.BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=Config.GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
@@ -15,6 +15,47 @@ class Config:
     
     # Validation
     ANOMALY_THRESHOLD = 0.5  # 50% change threshold
+    STOCK_BALANCE_TOLERANCE = 0.05  # 5% stock balance mismatch allowed
+    VALIDATION_CACHE_SIZE = 512  # In-memory validation results (LRU)
+    BASELINE_CACHE_SIZE = 256  # Decoded previous-period reports (LRU)
+    DETAIL_CACHE_SIZE = 256  # Encoded report detail payloads (LRU)
+    RECONCILIATION_TOLERANCE = 0.01  # 1% monthly sum vs annual mismatch allowed
+    PREVIOUS_YEAR_TOLERANCE = 0.01  # 1% previous_year column vs prior report drift allowed
+    
+    # Writes (single writer thread, group commit)
+    WRITE_BATCH_SIZE = 64  # Max writes committed in one transaction
+    WRITE_BATCH_DELAY = 0.005  # Seconds to wait for more writes before committing
+    WRITE_TIMEOUT = 30.0  # Seconds a caller waits for its write to commit
+    
+    # Statistics cache
+    STATS_CACHE_TTL = 5.0  # Seconds before the data version is re-checked
+    STATS_CACHE_SIZE = 256  # Cached statistics entries (per organization)
+    
+    # Response compression
+    COMPRESSION_MIN_SIZE = 1024  # Smaller responses are sent uncompressed
+    GZIP_LEVEL = 6
+    BROTLI_QUALITY = 5  # Used only if the optional brotli package is installed
+    COMPRESSED_CACHE_SIZE = 256  # Compressed report detail payloads (LRU)
+    
+    # Time series
+    TIMESERIES_MAX_POINTS = 120  # Longer histories are averaged into buckets
+    
+    # Change ranking (top movers against the previous period)
+    RANKING_WORKERS = 4  # Parallel organization chunks
+    RANKING_CACHE_TTL = 5.0  # Seconds before the data version is re-checked
+    RANKING_CACHE_SIZE = 64  # Cached rankings, dropped on local writes
+    
+    # Export
+    EXPORT_CHUNK_SIZE = 500  # Reports fetched and written per step (one Parquet row group)
+    
+    # Submission tracking
+    OBLIGATION_PERIODS = 3  # Periods an organization stays expected after its last submission
+    
+    # Analytics mirror (optional, needs duckdb): cube and movers queries run on a DuckDB copy
+    MIRROR_PATH = None  # e.g. Path("data/analytics.duckdb"); None = query SQLite directly
+    # Only one process can open the mirror; other workers fall back to SQLite with a warning
+    MIRROR_SYNC_INTERVAL = 2.0  # Seconds between change log syncs before queries
+    CHANGE_LOG_MAX_ROWS = 10000  # Newest change log entries kept; a mirror further behind reloads in full
     
     # Paths
     UPLOAD_DIR = Path("data/uploads")
@@ -2,15 +2,370 @@
 
 import sqlite3
 import json
+import sys
+import threading
+import heapq
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Iterator, Set, Tuple
+
+from pydantic import TypeAdapter
 
 from models import (
-    ReportData, ReportRecord, ValidationResult
+    ReportData, ReportRecord, ValidationResult,
+    OrganizationInfo, SectionI, SectionII, SectionIRow, ProductRow,
+    REPORT_BLOB_FIELDS
+)
+from cache import LRUCache, VersionedTTLCache, report_digest
+from versions import make_delta, apply_delta, diff_documents
+from writer import get_writer
+from periods import period_key, period_range, period_label, next_period_key
+from analytics import (
+    CUBE_DIMENSIONS, CUBE_MEASURES, PRODUCT_FIELDS,
+    report_metrics, comparison_matrix, top_movers, ranking_periods
+)
+from products import compact_products, split_product_label
+from config import Config
+
+
+_section_i_adapter = TypeAdapter(List[SectionIRow])
+_section_ii_adapter = TypeAdapter(List[ProductRow])
+
+# (db_path, org_code, report_type, period) -> (version token, previous ReportData or None)
+_baseline_cache = LRUCache(Config.BASELINE_CACHE_SIZE)
+# (db path, report type, period key, metric, by, limit) -> ranking, revalidated by data version
+_ranking_cache = VersionedTTLCache(Config.RANKING_CACHE_TTL, Config.RANKING_CACHE_SIZE)
+_MISSING = object()
+
+# JSON ->> operator (3.38); RETURNING and ALTER TABLE DROP COLUMN need 3.35
+MIN_SQLITE_VERSION = (3, 38, 0)
+
+# Report columns without the large JSON blobs (list and search views)
+HEADER_COLUMNS = (
+    'id, organization_code, organization_name, report_type, report_period, '
+    'validation_status, uploaded_at'
 )
 
 
+def _load_json(data: Optional[str]) -> list:
+    """Decode stored section JSON as plain dicts."""
+    return json.loads(data) if data else []
+
+
+def decode_section_i(data: Optional[str]) -> List[SectionIRow]:
+    """Decode stored Section I JSON straight into models."""
+    return _section_i_adapter.validate_json(data) if data else []
+
+
+def decode_section_ii(data: Optional[str]) -> List[ProductRow]:
+    """Decode stored Section II JSON straight into models (codes and names interned).
+    
+    Baselines kept for validation repeat the same catalog products; interning
+    lets them share one copy of each string.
+    """
+    products = _section_ii_adapter.validate_json(data) if data else []
+    for product in products:
+        product.product_code = sys.intern(product.product_code)
+        product.product_name = sys.intern(product.product_name)
+    return products
+
+
+def _document(
+    organization_name: Optional[str],
+    section_i_data: Optional[str],
+    section_ii_data: Optional[str],
+    validation_results: Optional[str]
+) -> Dict[str, Any]:
+    """Stored report columns -> versioned document (see versions.py)."""
+    return {
+        'organization_name': organization_name,
+        'section_i': json.loads(section_i_data) if section_i_data else [],
+        'section_ii': json.loads(section_ii_data) if section_ii_data else [],
+        'validation_results': json.loads(validation_results) if validation_results else {},
+    }
+
+
+def _version_token(version: int, organization_revision: Optional[int], uploaded_at: Optional[str]) -> str:
+    """Report version token: report version, organization revision and upload time."""
+    return f"{version}.{organization_revision or 0}:{uploaded_at or ''}"
+
+
+# Organization attributes reports can be grouped by
+ORGANIZATION_DIMENSIONS = ('activity_code', 'region', 'property_type', 'organization_type')
+
+# Issue summary groupings -> validation_issues column
+ISSUE_GROUPS = {'rule_id': 'rule_id', 'field': 'field_group', 'period': 'period_key'}
+
+
+def _organization_info(row: sqlite3.Row) -> OrganizationInfo:
+    """organizations row -> OrganizationInfo."""
+    return OrganizationInfo.model_construct(
+        code=row['code'],
+        name=row['name'] or "",
+        region=row['region'],
+        property_type=row['property_type'] or "",
+        activity_code=row['activity_code'] or "",
+        organization_type=row['organization_type']
+    )
+
+
+def _update_cube(
+    conn: sqlite3.Connection,
+    report_id: int,
+    cell: Tuple[str, Optional[int], str, str] = None,
+    metrics: Dict[str, float] = None
+):
+    """Move a report's contribution in stats_cube: subtract the stored one, add the new one.
+    
+    cell is (report_type, period_key, activity_code, region); no cell (delete)
+    or an invalid period only removes the old contribution.
+    """
+    old = conn.execute(
+        'SELECT report_type, period_key, activity_code, region, sales, exports, product_sales '
+        'FROM report_metrics WHERE report_id = ?',
+        (report_id,)
+    ).fetchone()
+    if old:
+        conn.execute('''
+            UPDATE stats_cube SET reports = reports - 1, sales = sales - ?,
+                   exports = exports - ?, product_sales = product_sales - ?
+            WHERE report_type = ? AND period_key = ? AND activity_code = ? AND region = ?
+        ''', (*old[4:], *old[:4]))
+        conn.execute(
+            'DELETE FROM stats_cube WHERE report_type = ? AND period_key = ? AND activity_code = ? '
+            'AND region = ? AND reports <= 0',
+            old[:4]
+        )
+        conn.execute('DELETE FROM report_metrics WHERE report_id = ?', (report_id,))
+    
+    if cell is None or cell[1] is None:
+        return
+    values = (metrics['sales'], metrics['exports'], metrics['product_sales'])
+    conn.execute(
+        'INSERT INTO report_metrics (report_id, report_type, period_key, activity_code, region, '
+        'sales, exports, product_sales) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        (report_id, *cell, *values)
+    )
+    conn.execute('''
+        INSERT INTO stats_cube (report_type, period_key, activity_code, region, reports, sales, exports, product_sales)
+        VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+        ON CONFLICT(report_type, period_key, activity_code, region) DO UPDATE SET
+            reports = reports + 1,
+            sales = sales + excluded.sales,
+            exports = exports + excluded.exports,
+            product_sales = product_sales + excluded.product_sales
+    ''', (*cell, *values))
+
+
+def field_group(field: str) -> str:
+    """Issue field with the row / product code replaced by '*' ('section_ii.111.produced' -> 'section_ii.*.produced')."""
+    parts = field.split('.')
+    if len(parts) > 1 and parts[0] in ('section_i', 'section_ii'):
+        parts[1] = '*'
+    return '.'.join(parts)
+
+
+def _store_issues(
+    conn: sqlite3.Connection,
+    report_id: int,
+    report_type: str = None,
+    key: Optional[int] = None,
+    issues: List[Dict[str, Any]] = ()
+):
+    """Replace a report's rows in validation_issues (no issues: just remove them)."""
+    conn.execute('DELETE FROM validation_issues WHERE report_id = ?', (report_id,))
+    conn.executemany(
+        'INSERT INTO validation_issues (report_id, report_type, period_key, category, severity, '
+        'field, field_group, rule_id, message) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        [
+            (
+                report_id, report_type, key, issue.get('category', 'info'), issue.get('severity', 'anomaly'),
+                issue.get('field', ''), field_group(issue.get('field', '')), issue.get('rule_id', ''),
+                issue.get('message', '')
+            )
+            for issue in issues
+        ]
+    )
+
+
+def _expect_next(conn: sqlite3.Connection, org_code: str, report_type: str, key: Optional[int]):
+    """Expect the organization to file the form for the Config.OBLIGATION_PERIODS periods after key."""
+    if key is None:
+        return
+    keys = []
+    for _ in range(Config.OBLIGATION_PERIODS):
+        key = next_period_key(key)
+        keys.append((org_code, report_type, key))
+    conn.executemany(
+        'INSERT OR IGNORE INTO obligations (organization_code, report_type, period_key) VALUES (?, ?, ?)',
+        keys
+    )
+
+
+def _log_change(conn: sqlite3.Connection, report_id: int, op: str):
+    """Record a report write ('upsert' or 'delete') for the analytics mirror.
+    
+    op 'rebuild' (report_id 0) marks a cube rebuild: the mirror reloads in full.
+    """
+    conn.execute('INSERT INTO change_log (report_id, op) VALUES (?, ?)', (report_id, op))
+    _cap_change_log(conn)
+
+
+def _log_organization_change(conn: sqlite3.Connection, org_id: int):
+    """Record all reports of an organization whose stored attributes changed."""
+    conn.execute("INSERT INTO change_log (report_id, op) SELECT id, 'upsert' FROM reports WHERE org_id = ?", (org_id,))
+    _cap_change_log(conn)
+
+
+def _cap_change_log(conn: sqlite3.Connection):
+    """Keep the newest CHANGE_LOG_MAX_ROWS entries (the log is not pruned without a mirror).
+    
+    A mirror that falls behind the cap sees the gap and reloads in full.
+    """
+    conn.execute(
+        'DELETE FROM change_log WHERE seq <= (SELECT MAX(seq) FROM change_log) - ?',
+        (Config.CHANGE_LOG_MAX_ROWS,)
+    )
+
+
+def _regroup_organization(conn: sqlite3.Connection, org_id: int, activity_code: str, region: str):
+    """Move an organization's reports to the cube cells of its current activity code and region."""
+    moved = conn.execute('''
+        SELECT m.report_id, m.report_type, m.period_key, m.sales, m.exports, m.product_sales
+        FROM report_metrics m
+        JOIN reports r ON r.id = m.report_id
+        WHERE r.org_id = ? AND (m.activity_code != ? OR m.region != ?)
+    ''', (org_id, activity_code, region)).fetchall()
+    for report_id, report_type, key, *values in moved:
+        _update_cube(conn, report_id, (report_type, key, activity_code, region), dict(zip(CUBE_MEASURES[1:], values)))
+
+
+def _rebuild_cube(conn: sqlite3.Connection) -> int:
+    """Recompute report_metrics and stats_cube from all reports in one streaming pass."""
+    conn.execute('DELETE FROM report_metrics')
+    conn.execute('DELETE FROM stats_cube')
+    cube: Dict[Tuple, List[float]] = {}
+    count = 0
+    rows = conn.cursor().execute('''
+        SELECT r.id, r.report_type, r.period_key, r.section_i_data, r.section_ii_data,
+               COALESCE(o.activity_code, ''), COALESCE(o.region, '')
+        FROM reports r
+        LEFT JOIN organizations o ON o.id = r.org_id
+        WHERE r.period_key IS NOT NULL
+    ''')
+    for report_id, report_type, key, section_i_data, section_ii_data, activity_code, region in rows:
+        cell = (report_type, key, activity_code, region)
+        metrics = report_metrics(report_type, _load_json(section_i_data), _load_json(section_ii_data))
+        values = (metrics['sales'], metrics['exports'], metrics['product_sales'])
+        conn.execute(
+            'INSERT INTO report_metrics (report_id, report_type, period_key, activity_code, region, '
+            'sales, exports, product_sales) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (report_id, *cell, *values)
+        )
+        totals = cube.setdefault(cell, [0, 0.0, 0.0, 0.0])
+        totals[0] += 1
+        for i, value in enumerate(values, 1):
+            totals[i] += value
+        count += 1
+    conn.executemany(
+        'INSERT INTO stats_cube (report_type, period_key, activity_code, region, '
+        'reports, sales, exports, product_sales) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+        [(*cell, *totals) for cell, totals in cube.items()]
+    )
+    return count
+
+
+def _compact_section_ii(conn: sqlite3.Connection, products: List[Dict[str, Any]]) -> str:
+    """Upsert a report's products into the catalog; returns the stored Section II JSON.
+    
+    Stored rows carry product_id in place of product_code and product_name
+    (report_view joins them back in).
+    """
+    ids: Dict[Tuple[str, str], int] = {}
+    for product in products:
+        pair = (product.get('product_code', ''), product.get('product_name', ''))
+        if pair in ids:
+            continue
+        row = conn.execute('SELECT id FROM products WHERE code = ? AND name = ?', pair).fetchone()
+        ids[pair] = row[0] if row else conn.execute(
+            'INSERT INTO products (code, name) VALUES (?, ?) RETURNING id', pair
+        ).fetchone()[0]
+    return json.dumps(compact_products(products, ids), ensure_ascii=False, default=str)
+
+
+def _link_products(conn: sqlite3.Connection, report_id: int):
+    """Replace a report's rows in report_products from its stored Section II."""
+    conn.execute('DELETE FROM report_products WHERE report_id = ?', (report_id,))
+    conn.execute('''
+        INSERT INTO report_products (report_id, position, product_id)
+        SELECT reports.id, stored.key, stored.value ->> 'product_id'
+        FROM reports, json_each(reports.section_ii_data) AS stored
+        WHERE reports.id = ? AND stored.value ->> 'product_id' IS NOT NULL
+    ''', (report_id,))
+
+
+# Stored Section II rows with code and name from the catalog, in stored order (json_patch
+# drops null values, which product rows do not have; rows without product_id keep their own)
+_SECTION_II_SQL = '''
+    CASE WHEN reports.section_ii_data IS NULL THEN NULL ELSE (
+        SELECT json_group_array(json(item)) FROM (
+            SELECT json_patch(
+                json_object('product_code', COALESCE(products.code, ''), 'product_name', COALESCE(products.name, '')),
+                json_remove(stored.value, '$.product_id')
+            ) AS item
+            FROM json_each(reports.section_ii_data) AS stored
+            LEFT JOIN products ON products.id = stored.value ->> 'product_id'
+            ORDER BY stored.key
+        )
+    ) END
+'''
+
+
+# Listeners called as listener(event, org_code, report_type, report_period)
+# after a report write ('save' or 'delete') has been committed
+_write_listeners: List[Callable[[str, str, str, str], None]] = []
+
+
+def on_write(listener: Callable[[str, str, str, str], None]) -> Callable[[str, str, str, str], None]:
+    """Register a report write listener."""
+    _write_listeners.append(listener)
+    return listener
+
+
+def _notify_write(event: str, org_code: str, report_type: str, report_period: str):
+    """Call registered write listeners."""
+    for listener in list(_write_listeners):
+        listener(event, org_code, report_type, report_period)
+
+
+# save_report calls vs rows actually written in all tables (write amplification)
+_write_metrics = {'saves': 0, 'rows_written': 0, 'skipped': 0}
+_write_metrics_lock = threading.Lock()
+
+
+def _record_write(rows: int):
+    """Count a save_report call that changed rows rows (0: skipped as unchanged)."""
+    with _write_metrics_lock:
+        _write_metrics['saves'] += 1
+        if rows:
+            _write_metrics['rows_written'] += rows
+        else:
+            _write_metrics['skipped'] += 1
+
+
+def write_metrics() -> Dict[str, Any]:
+    """Get write counters for this process."""
+    with _write_metrics_lock:
+        metrics = dict(_write_metrics)
+    metrics['write_amplification'] = round(metrics['rows_written'] / metrics['saves'], 3) if metrics['saves'] else 0.0
+    return metrics
+
+
+# Database files whose schema has been initialized by this process
+_initialized_paths: Set[str] = set()
+
+
 class DatabaseHandler:
     """SQLite database operations."""
     
@@ -20,13 +375,46 @@ class DatabaseHandler:
         self._init_db()
     
     def _init_db(self):
-        """Initialize database schema."""
+        """Initialize database schema (once per database file and process)."""
+        path = str(self.db_path.resolve())
+        if path in _initialized_paths and self.db_path.exists():
+            return
+        if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+            raise RuntimeError(
+                f"SQLite {'.'.join(map(str, MIN_SQLITE_VERSION))} or newer is required "
+                f"(Python is linked against {sqlite3.sqlite_version})"
+            )
+        
         with sqlite3.connect(self.db_path) as conn:
+            # WAL: readers do not block the writer thread and vice versa
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Organization master data (one row per code, upserted on every report write)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS organizations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    code TEXT NOT NULL UNIQUE,
+                    name TEXT,
+                    region TEXT,
+                    property_type TEXT,
+                    activity_code TEXT,
+                    organization_type TEXT,
+                    updated_at TIMESTAMP,
+                    revision INTEGER NOT NULL DEFAULT 1
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_organizations_activity 
+                ON organizations(activity_code)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_organizations_region 
+                ON organizations(region)
+            ''')
+            
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS reports (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     organization_code TEXT NOT NULL,
-                    organization_name TEXT,
                     report_type TEXT NOT NULL,
                     report_period TEXT NOT NULL,
                     section_i_data TEXT,
@@ -51,58 +439,895 @@ class DatabaseHandler:
                 CREATE INDEX IF NOT EXISTS idx_reports_status 
                 ON reports(validation_status)
             ''')
+            
+            self._migrate(conn)
+            
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_reports_validation_key 
+                ON reports(validation_key)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_reports_org_id 
+                ON reports(org_id)
+            ''')
+            
+            # Product catalog: one row per (code, name), referenced by id from section_ii_data
+            products_exist = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products'"
+            ).fetchone()
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS products (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    code TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    UNIQUE(code, name)
+                )
+            ''')
+            if not products_exist:
+                for report_id, data in conn.execute(
+                    'SELECT id, section_ii_data FROM reports WHERE section_ii_data IS NOT NULL'
+                ).fetchall():
+                    # Older parsers stored the raw autocomplete label; split it as the parser does now
+                    products = json.loads(data)
+                    for product in products:
+                        product['product_code'], product['product_name'] = split_product_label(
+                            product.get('product_code', ''), product.get('product_name', '')
+                        )
+                    conn.execute(
+                        'UPDATE reports SET section_ii_data = ? WHERE id = ?',
+                        (_compact_section_ii(conn, products), report_id)
+                    )
+            
+            # Catalog products of each report by Section II row position (product lookups)
+            links_exist = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'report_products'"
+            ).fetchone()
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS report_products (
+                    report_id INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    product_id INTEGER NOT NULL,
+                    PRIMARY KEY (report_id, position)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_report_products_product_id
+                ON report_products(product_id)
+            ''')
+            if not links_exist:
+                conn.execute('''
+                    INSERT INTO report_products (report_id, position, product_id)
+                    SELECT reports.id, stored.key, stored.value ->> 'product_id'
+                    FROM reports, json_each(reports.section_ii_data) AS stored
+                    WHERE stored.value ->> 'product_id' IS NOT NULL
+                ''')
+            
+            # Reports with the organization name and catalog products joined in (read queries);
+            # recreated when its definition changes (new report columns)
+            columns = [
+                f'reports.{row[1]}' for row in conn.execute('PRAGMA table_info(reports)')
+                if row[1] != 'section_ii_data'
+            ]
+            view_sql = f'''CREATE VIEW report_view AS
+                SELECT {', '.join(columns)}, {_SECTION_II_SQL} AS section_ii_data,
+                       organizations.name AS organization_name
+                FROM reports
+                LEFT JOIN organizations ON organizations.id = reports.org_id'''
+            current = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = 'report_view'").fetchone()
+            if current is None or current[0] != view_sql:
+                conn.execute('DROP VIEW IF EXISTS report_view')
+                conn.execute(view_sql)
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_reports_type_period_key 
+                ON reports(report_type, period_key)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_reports_org_type_period_key 
+                ON reports(organization_code, report_type, period_key DESC)
+            ''')
+            
+            # Superseded report versions, each stored as a delta against the next version
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS report_versions (
+                    report_id INTEGER NOT NULL,
+                    version INTEGER NOT NULL,
+                    validation_status TEXT,
+                    uploaded_at TIMESTAMP,
+                    content_digest TEXT,
+                    delta TEXT NOT NULL,
+                    PRIMARY KEY (report_id, version)
+                )
+            ''')
+            
+            # Validation issues, one row per issue of a report's current validation
+            issues_exist = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'validation_issues'"
+            ).fetchone()
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS validation_issues (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    report_id INTEGER NOT NULL,
+                    report_type TEXT NOT NULL,
+                    period_key INTEGER,
+                    category TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    field TEXT NOT NULL,
+                    field_group TEXT NOT NULL,
+                    rule_id TEXT NOT NULL,
+                    message TEXT
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_validation_issues_report 
+                ON validation_issues(report_id)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_validation_issues_rule 
+                ON validation_issues(rule_id, period_key)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_validation_issues_field 
+                ON validation_issues(field_group, period_key)
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_validation_issues_period 
+                ON validation_issues(period_key, category)
+            ''')
+            if not issues_exist:
+                for report_id, report_type, key, results in conn.execute(
+                    'SELECT id, report_type, period_key, validation_results FROM reports'
+                ).fetchall():
+                    issues = json.loads(results).get('issues', []) if results else []
+                    _store_issues(conn, report_id, report_type, key, issues)
+            
+            # Expected submissions: (organization, form, period) an organization should file,
+            # added for the periods after each submission
+            obligations_exist = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'obligations'"
+            ).fetchone()
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS obligations (
+                    organization_code TEXT NOT NULL,
+                    report_type TEXT NOT NULL,
+                    period_key INTEGER NOT NULL,
+                    PRIMARY KEY (organization_code, report_type, period_key)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_obligations_type_period 
+                ON obligations(report_type, period_key)
+            ''')
+            if not obligations_exist:
+                for org_code, report_type, key in conn.execute(
+                    'SELECT organization_code, report_type, period_key FROM reports WHERE period_key IS NOT NULL'
+                ).fetchall():
+                    _expect_next(conn, org_code, report_type, key)
+            
+            # Statistics cube: per-report contributions and their sums per cell
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS report_metrics (
+                    report_id INTEGER PRIMARY KEY,
+                    report_type TEXT NOT NULL,
+                    period_key INTEGER NOT NULL,
+                    activity_code TEXT NOT NULL,
+                    region TEXT NOT NULL,
+                    sales REAL NOT NULL,
+                    exports REAL NOT NULL,
+                    product_sales REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_report_metrics_type_period_key
+                ON report_metrics(report_type, period_key)
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS stats_cube (
+                    report_type TEXT NOT NULL,
+                    period_key INTEGER NOT NULL,
+                    activity_code TEXT NOT NULL,
+                    region TEXT NOT NULL,
+                    reports INTEGER NOT NULL,
+                    sales REAL NOT NULL,
+                    exports REAL NOT NULL,
+                    product_sales REAL NOT NULL,
+                    PRIMARY KEY (report_type, period_key, activity_code, region)
+                )
+            ''')
+            
+            if conn.execute(
+                'SELECT NOT EXISTS (SELECT 1 FROM report_metrics) AND EXISTS (SELECT 1 FROM reports)'
+            ).fetchone()[0]:
+                _rebuild_cube(conn)
+            
+            # Change log for the analytics mirror (mirror.py), pruned as it syncs
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS change_log (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    report_id INTEGER NOT NULL,
+                    op TEXT NOT NULL
+                )
+            ''')
+            
+            # Data version counter, bumped by every write to reports (shared by all workers)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            ''')
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', 0)")
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                conn.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_reports_version_{event.lower()}
+                    AFTER {event} ON reports
+                    BEGIN
+                        UPDATE meta SET value = value + 1 WHERE key = 'data_version';
+                    END
+                ''')
+        
+        _initialized_paths.add(path)
     
-    def save_report(self, report: ReportData, validation: ValidationResult) -> int:
-        """Save report to database."""
-        section_i_json = json.dumps(
-            [row.model_dump() for row in report.section_i.rows],
-            ensure_ascii=False, default=str
-        )
-        section_ii_json = json.dumps(
-            [prod.model_dump() for prod in report.section_ii.products],
-            ensure_ascii=False, default=str
-        )
+    def _migrate(self, conn: sqlite3.Connection):
+        """Add columns introduced after the initial schema (and move organization names out)."""
+        if 'revision' not in {row[1] for row in conn.execute('PRAGMA table_info(organizations)')}:
+            # Bumped when a stored attribute changes (report version tokens, see get_report_version)
+            conn.execute('ALTER TABLE organizations ADD COLUMN revision INTEGER NOT NULL DEFAULT 1')
+        
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(reports)')}
+        new_columns = {
+            'content_digest': 'TEXT',       # SHA-256 of parsed report content
+            'validation_key': 'TEXT',       # Validation cache key (content + baseline + rules)
+            'version': 'INTEGER NOT NULL DEFAULT 1',  # Current version number (see report_versions)
+            'period_key': 'INTEGER',        # year * 100 + month (annual: month 0), see periods.py
+            'org_id': 'INTEGER REFERENCES organizations(id)',
+        }
+        for name, column_type in new_columns.items():
+            if name not in columns:
+                conn.execute(f'ALTER TABLE reports ADD COLUMN {name} {column_type}')
+        
+        if 'period_key' not in columns:
+            conn.create_function('period_key', 1, period_key, deterministic=True)
+            conn.execute('UPDATE reports SET period_key = period_key(report_period)')
+        
+        if 'organization_name' in columns:
+            # Move names to organizations (latest upload wins), then drop the repeated column
+            conn.execute('''
+                INSERT OR IGNORE INTO organizations (code, name, updated_at)
+                SELECT organization_code, organization_name, uploaded_at FROM reports
+                ORDER BY uploaded_at DESC
+            ''')
+            conn.execute('''
+                UPDATE reports SET org_id = (
+                    SELECT id FROM organizations WHERE code = reports.organization_code
+                ) WHERE org_id IS NULL
+            ''')
+            conn.execute('ALTER TABLE reports DROP COLUMN organization_name')
+    
+    def save_report(
+        self, 
+        report: ReportData, 
+        validation: ValidationResult,
+        validation_key: str = None
+    ) -> int:
+        """Save report to database (keeps the row id; unchanged re-uploads are not written)."""
+        content_digest = report_digest(report)
         validation_json = json.dumps(
             validation.model_dump(),
             ensure_ascii=False, default=str
         )
+        key = (report.organization.code, report.report_type, report.report_period)
         
         with sqlite3.connect(self.db_path) as conn:
-            conn.execute('''
-                INSERT OR REPLACE INTO reports (
-                    organization_code, organization_name, report_type, 
+            existing = conn.execute(
+                'SELECT id, content_digest, validation_results, validation_key FROM reports '
+                'WHERE organization_code = ? AND report_type = ? AND report_period = ?',
+                key
+            ).fetchone()
+        if existing and tuple(existing[1:]) == (content_digest, validation_json, validation_key):
+            _record_write(0)
+            return existing[0]
+        
+        section_i = [row.model_dump() for row in report.section_i.rows]
+        section_ii = [prod.model_dump() for prod in report.section_ii.products]
+        section_i_json = json.dumps(section_i, ensure_ascii=False, default=str)
+        
+        def write(conn: sqlite3.Connection):
+            # Rows changed by this job in every table (triggers included)
+            changes = conn.total_changes
+            previous = conn.execute(
+                'SELECT id, organization_name, section_i_data, section_ii_data, validation_results, '
+                'validation_status, uploaded_at, content_digest, version, validation_key FROM report_view '
+                'WHERE organization_code = ? AND report_type = ? AND report_period = ?',
+                key
+            ).fetchone()
+            if previous and (previous[7], previous[4], previous[9]) == (content_digest, validation_json, validation_key):
+                return previous[0], 0
+            
+            # Keep the superseded version as a delta against the new one
+            if previous:
+                document = {
+                    'organization_name': report.organization.name,
+                    'section_i': section_i,
+                    'section_ii': section_ii,
+                    'validation_results': validation.model_dump(),
+                }
+                conn.execute(
+                    'INSERT OR REPLACE INTO report_versions '
+                    '(report_id, version, validation_status, uploaded_at, content_digest, delta) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (
+                        previous[0], previous[8], previous[5], previous[6], previous[7],
+                        json.dumps(make_delta(document, _document(*previous[1:5])), ensure_ascii=False, default=str)
+                    )
+                )
+            
+            org_id, activity_code, region, org_changed = self._upsert_organization(
+                conn, report.organization, report.uploaded_at
+            )
+            section_ii_json = _compact_section_ii(conn, section_ii)
+            result = conn.execute('''
+                INSERT INTO reports (
+                    organization_code, org_id, report_type, 
                     report_period, section_i_data, section_ii_data,
-                    validation_results, validation_status, uploaded_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    validation_results, validation_status, uploaded_at,
+                    content_digest, validation_key, period_key
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(organization_code, report_type, report_period) DO UPDATE SET
+                    org_id = excluded.org_id,
+                    section_i_data = excluded.section_i_data,
+                    section_ii_data = excluded.section_ii_data,
+                    validation_results = excluded.validation_results,
+                    validation_status = excluded.validation_status,
+                    uploaded_at = excluded.uploaded_at,
+                    content_digest = excluded.content_digest,
+                    validation_key = excluded.validation_key,
+                    period_key = excluded.period_key,
+                    version = reports.version + 1
+                RETURNING id
             ''', (
                 report.organization.code,
-                report.organization.name,
+                org_id,
                 report.report_type,
                 report.report_period,
                 section_i_json,
                 section_ii_json,
                 validation_json,
                 validation.status,
-                report.uploaded_at
-            ))
+                report.uploaded_at,
+                content_digest,
+                validation_key,
+                period_key(report.report_period)
+            )).fetchone()
             
-            # Get the ID of inserted/updated row
-            cursor = conn.execute('SELECT last_insert_rowid()')
-            result = cursor.fetchone()
-            return result[0] if result else None
+            _link_products(conn, result[0])
+            cell = (report.report_type, period_key(report.report_period), activity_code, region)
+            _update_cube(conn, result[0], cell, report_metrics(report.report_type, section_i, section_ii))
+            _store_issues(
+                conn, result[0], report.report_type, period_key(report.report_period),
+                [issue.model_dump() for issue in validation.issues]
+            )
+            _expect_next(conn, report.organization.code, report.report_type, period_key(report.report_period))
+            _log_change(conn, result[0], 'upsert')
+            if org_changed:
+                _regroup_organization(conn, org_id, activity_code, region)
+                _log_organization_change(conn, org_id)
+            return result[0], conn.total_changes - changes
+        
+        report_id, rows = get_writer(self.db_path).run(write)
+        _record_write(rows)
+        if rows:
+            self._invalidate_baselines(*key)
+            _ranking_cache.clear()
+            _notify_write('save', *key)
+        return report_id
+    
+    @staticmethod
+    def _upsert_organization(
+        conn: sqlite3.Connection,
+        org: OrganizationInfo,
+        uploaded_at: datetime
+    ) -> Tuple[int, str, str, bool]:
+        """Insert or update organization master data (empty values keep stored ones).
+        
+        The revision is bumped only when a stored attribute changes.
+        Returns (id, activity_code, region, changed) as stored; changed is
+        True when an existing organization's attributes were updated.
+        """
+        before = conn.execute('SELECT revision FROM organizations WHERE code = ?', (org.code,)).fetchone()
+        org_id, activity_code, region, revision = conn.execute('''
+            INSERT INTO organizations (
+                code, name, region, property_type, activity_code, organization_type, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(code) DO UPDATE SET
+                name = COALESCE(NULLIF(excluded.name, ''), organizations.name),
+                region = COALESCE(NULLIF(excluded.region, ''), organizations.region),
+                property_type = COALESCE(NULLIF(excluded.property_type, ''), organizations.property_type),
+                activity_code = COALESCE(NULLIF(excluded.activity_code, ''), organizations.activity_code),
+                organization_type = COALESCE(NULLIF(excluded.organization_type, ''), organizations.organization_type),
+                updated_at = excluded.updated_at,
+                revision = organizations.revision + (
+                    COALESCE(NULLIF(excluded.name, ''), organizations.name) IS NOT organizations.name
+                    OR COALESCE(NULLIF(excluded.region, ''), organizations.region) IS NOT organizations.region
+                    OR COALESCE(NULLIF(excluded.property_type, ''), organizations.property_type)
+                        IS NOT organizations.property_type
+                    OR COALESCE(NULLIF(excluded.activity_code, ''), organizations.activity_code)
+                        IS NOT organizations.activity_code
+                    OR COALESCE(NULLIF(excluded.organization_type, ''), organizations.organization_type)
+                        IS NOT organizations.organization_type
+                )
+            RETURNING id, COALESCE(activity_code, ''), COALESCE(region, ''), revision
+        ''', (
+            org.code, org.name, org.region, org.property_type,
+            org.activity_code, org.organization_type, uploaded_at
+        )).fetchone()
+        return org_id, activity_code, region, before is not None and before[0] != revision
+    
+    def get_organization(self, org_code: str) -> Optional[OrganizationInfo]:
+        """Get organization master data by code."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                'SELECT * FROM organizations WHERE code = ?', (org_code,)
+            ).fetchone()
+        return _organization_info(row) if row else None
+    
+    def search_products(self, query: str = '', limit: int = 20) -> List[Dict[str, Any]]:
+        """Search the product catalog by code prefix or name."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                'SELECT id, code, name FROM products WHERE code LIKE ? OR name LIKE ? ORDER BY code, name LIMIT ?',
+                (f"{query}%", f"%{query}%", limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def get_product_reports(
+        self,
+        product_code: str,
+        report_type: str = None,
+        period: str = None,
+        limit: int = 100
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Section II values of a product per report, latest period first (None if not in the catalog).
+        
+        The product's catalog ids are looked up in report_products (indexed by
+        product_id), which gives the reports and row positions: only matching
+        Section II rows are read, no product strings are compared or decoded.
+        """
+        query = (
+            'SELECT r.id AS report_id, r.organization_code, o.name AS organization_name, '
+            'r.report_type, r.report_period, p.name AS product_name, '
+            + ', '.join(f"r.section_ii_data -> rp.position ->> '{field}' AS {field}" for field in ('unit', *PRODUCT_FIELDS))
+            + ' FROM report_products rp CROSS JOIN reports r ON r.id = rp.report_id '
+            'JOIN products p ON p.id = rp.product_id '
+            'LEFT JOIN organizations o ON o.id = r.org_id WHERE rp.product_id IN ({ids})'
+        )
+        params: List[Any] = []
+        if report_type:
+            query += ' AND r.report_type = ?'
+            params.append(report_type)
+        if period:
+            query += ' AND r.period_key >= ? AND r.period_key < ?'
+            params.extend(period_range(period))
+        query += ' ORDER BY r.period_key DESC, r.id, rp.position LIMIT ?'
+        params.append(limit)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            ids = [row[0] for row in conn.execute('SELECT id FROM products WHERE code = ?', (product_code,))]
+            if not ids:
+                return None
+            rows = conn.execute(query.format(ids=', '.join('?' * len(ids))), (*ids, *params)).fetchall()
+        return [dict(row) for row in rows]
+    
+    def get_breakdown(self, dimension: str, report_type: str = None, period: str = None) -> List[Dict[str, Any]]:
+        """Report counts by status grouped by an organization attribute ('activity_code' or 'region')."""
+        if dimension not in ORGANIZATION_DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {dimension}")
+        
+        query = f'''
+            SELECT o.{dimension} AS value,
+                   COUNT(DISTINCT r.org_id) AS organizations,
+                   COUNT(*) AS total,
+                   SUM(r.validation_status = 'passed') AS passed,
+                   SUM(r.validation_status = 'warning') AS warnings,
+                   SUM(r.validation_status = 'failed') AS failed
+            FROM reports r
+            JOIN organizations o ON o.id = r.org_id
+            WHERE 1=1
+        '''
+        params: List[Any] = []
+        if report_type:
+            query += ' AND r.report_type = ?'
+            params.append(report_type)
+        if period:
+            query += ' AND r.period_key >= ? AND r.period_key < ?'
+            params.extend(period_range(period))
+        query += f' GROUP BY o.{dimension} ORDER BY total DESC, value'
+        
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            return [{dimension: row['value'], **{k: row[k] for k in row.keys() if k != 'value'}}
+                    for row in conn.execute(query, params)]
+    
+    def query_cube(self, dimensions: List[str], filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Sum cube measures grouped by the given dimensions (see analytics.CUBE_DIMENSIONS).
+        
+        filters: report_type, activity_code, region (exact) and period
+        ('2025', '2025-Q3', ...).
+        """
+        filters = filters or {}
+        columns = [CUBE_DIMENSIONS[name] for name in dimensions]
+        query = 'SELECT ' + ', '.join(columns + [f'SUM({m}) AS {m}' for m in CUBE_MEASURES]) + ' FROM stats_cube WHERE 1=1'
+        params: List[Any] = []
+        for name in ('report_type', 'activity_code', 'region'):
+            if filters.get(name) is not None:
+                query += f' AND {name} = ?'
+                params.append(filters[name])
+        if filters.get('period'):
+            query += ' AND period_key >= ? AND period_key < ?'
+            params.extend(period_range(filters['period']))
+        if columns:
+            query += f' GROUP BY {", ".join(columns)} ORDER BY {", ".join(columns)}'
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cells = []
+            for row in conn.execute(query, params):
+                cell = dict(zip(dimensions, row))
+                if 'period' in cell:
+                    cell['period'] = period_label(cell['period'])
+                cell.update(zip(CUBE_MEASURES, (value or 0 for value in row[len(columns):])))
+                cells.append(cell)
+            return cells
+    
+    def rebuild_stats_cube(self) -> int:
+        """Rebuild report_metrics and stats_cube from all reports in one streaming pass."""
+        def rebuild(conn: sqlite3.Connection) -> int:
+            count = _rebuild_cube(conn)
+            _log_change(conn, 0, 'rebuild')
+            return count
+        
+        count = get_writer(self.db_path).run(rebuild)
+        _ranking_cache.clear()
+        return count
+    
+    def rank_changes(
+        self,
+        period: str,
+        report_type: str,
+        metric: str = 'sales',
+        by: str = 'change',
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """Top organizations by change of a metric against the previous period.
+        
+        Uses report_metrics; organizations are split into org_id chunks that
+        are ranked in parallel (one connection each) and merged. The result
+        is cached like statistics: dropped on local writes, and re-checked
+        against the data version after RANKING_CACHE_TTL, so writes from
+        other processes are seen too.
+        """
+        current, previous = ranking_periods(period, metric, by)
+        key = (str(self.db_path), report_type, current, metric, by, limit)
+        return _ranking_cache.get_or_compute(
+            key, lambda: self._rank(report_type, current, previous, metric, by, limit), self.get_data_version
+        )
+    
+    def _rank(
+        self,
+        report_type: str,
+        current: int,
+        previous: int,
+        metric: str,
+        by: str,
+        limit: int
+    ) -> Dict[str, Any]:
+        """Uncached rank_changes."""
+        with sqlite3.connect(self.db_path) as conn:
+            low, high = conn.execute(
+                'SELECT MIN(r.org_id), MAX(r.org_id) FROM report_metrics m JOIN reports r ON r.id = m.report_id '
+                'WHERE m.report_type = ? AND m.period_key = ?',
+                (report_type, current)
+            ).fetchone()
+        
+        movers: List[Dict[str, Any]] = []
+        if low is not None:
+            workers = max(1, min(Config.RANKING_WORKERS, high - low + 1))
+            span = -(-(high - low + 1) // workers)
+            chunks = [(start, start + span - 1) for start in range(low, high + 1, span)]
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                ranked = pool.map(
+                    lambda chunk: self._rank_chunk(chunk, report_type, current, previous, metric, by, limit),
+                    chunks
+                )
+                movers = heapq.nlargest(limit, (m for part in ranked for m in part), key=lambda m: abs(m[by]))
+        
+        return {
+            'period': period_label(current),
+            'previous_period': period_label(previous),
+            'report_type': report_type,
+            'metric': metric,
+            'by': by,
+            'movers': movers,
+        }
+    
+    def _rank_chunk(
+        self,
+        org_ids: Tuple[int, int],
+        report_type: str,
+        current: int,
+        previous: int,
+        metric: str,
+        by: str,
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """Top movers among organizations with org_id in the inclusive range."""
+        with sqlite3.connect(self.db_path) as conn:
+            pairs = conn.execute(f'''
+                SELECT r.organization_code, o.name, cur.{metric}, prev.{metric}
+                FROM report_metrics cur
+                JOIN reports r ON r.id = cur.report_id
+                JOIN reports p ON p.organization_code = r.organization_code
+                              AND p.report_type = r.report_type AND p.period_key = ?
+                JOIN report_metrics prev ON prev.report_id = p.id
+                LEFT JOIN organizations o ON o.id = r.org_id
+                WHERE cur.report_type = ? AND cur.period_key = ? AND r.org_id BETWEEN ? AND ?
+            ''', (previous, report_type, current, *org_ids))
+            return top_movers(pairs, limit, by)
+    
+    @staticmethod
+    def _issue_filters(filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """SQL conditions for issue filters (field may use '*' for the code: 'section_ii.*.produced')."""
+        query = ''
+        params: List[Any] = []
+        for name in ('rule_id', 'category', 'severity', 'report_type'):
+            if filters.get(name):
+                query += f' AND i.{name} = ?'
+                params.append(filters[name])
+        if filters.get('field'):
+            query += ' AND i.field_group = ?' if '*' in filters['field'] else ' AND i.field = ?'
+            params.append(filters['field'])
+        if filters.get('period'):
+            query += ' AND i.period_key >= ? AND i.period_key < ?'
+            params.extend(period_range(filters['period']))
+        return query, params
+    
+    def issue_summary(self, by: str, filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Validation issue counts grouped by 'rule_id', 'field' (field group) or 'period'.
+        
+        filters: rule_id, category, severity, report_type, field, period.
+        """
+        column = ISSUE_GROUPS.get(by)
+        if column is None:
+            raise ValueError(f"Unknown grouping: {by}")
+        conditions, params = self._issue_filters(filters or {})
+        
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute(f'''
+                SELECT i.{column}, COUNT(*), COUNT(DISTINCT i.report_id),
+                       SUM(i.category = 'error'), SUM(i.category = 'warning'), SUM(i.category = 'info')
+                FROM validation_issues i
+                WHERE 1=1{conditions}
+                GROUP BY i.{column}
+                ORDER BY COUNT(*) DESC, i.{column}
+            ''', params).fetchall()
+        return [
+            {
+                by: period_label(value) if by == 'period' else value,
+                'issues': issues, 'reports': reports, 'errors': errors, 'warnings': warnings, 'info': info,
+            }
+            for value, issues, reports, errors, warnings, info in rows
+        ]
+    
+    def list_issues(self, filters: Dict[str, Any] = None, limit: int = 50, before_id: int = None) -> List[Dict[str, Any]]:
+        """Validation issues, newest first; page with before_id (the last id of the previous page)."""
+        conditions, params = self._issue_filters(filters or {})
+        if before_id is not None:
+            conditions += ' AND i.id < ?'
+            params.append(before_id)
+        params.append(limit)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(f'''
+                SELECT i.id, i.report_id, r.organization_code, i.report_type, r.report_period,
+                       i.category, i.severity, i.field, i.rule_id, i.message
+                FROM validation_issues i
+                JOIN reports r ON r.id = i.report_id
+                WHERE 1=1{conditions}
+                ORDER BY i.id DESC
+                LIMIT ?
+            ''', params).fetchall()
+        return [dict(row) for row in rows]
+    
+    def get_missing_reports(
+        self,
+        period: str,
+        report_type: str,
+        activity_code: str = None,
+        region: str = None,
+        limit: int = 1000
+    ) -> Dict[str, Any]:
+        """Organizations expected to file report_type for period that have not.
+        
+        Outstanding obligations are found with an anti-join against reports
+        (idx_obligations_type_period, then idx_reports_org_type_period_key).
+        """
+        key = period_key(period)
+        if key is None:
+            raise ValueError(f"Invalid period: {period}")
+        
+        conditions = ''
+        params: List[Any] = [report_type, key]
+        if activity_code:
+            conditions += ' AND o.activity_code = ?'
+            params.append(activity_code)
+        if region:
+            conditions += ' AND o.region = ?'
+            params.append(region)
+        scope = f'''
+            FROM obligations ob
+            LEFT JOIN organizations o ON o.code = ob.organization_code
+            WHERE ob.report_type = ? AND ob.period_key = ?{conditions}
+        '''
+        outstanding = scope + '''
+              AND NOT EXISTS (
+                  SELECT 1 FROM reports r
+                  WHERE r.organization_code = ob.organization_code
+                    AND r.report_type = ob.report_type
+                    AND r.period_key = ob.period_key
+              )
+        '''
+        
+        with sqlite3.connect(self.db_path) as conn:
+            expected_count = conn.execute('SELECT COUNT(*)' + scope, params).fetchone()[0]
+            missing_count = conn.execute('SELECT COUNT(*)' + outstanding, params).fetchone()[0]
+            rows = conn.execute(f'''
+                SELECT ob.organization_code, o.name, o.activity_code, o.region,
+                       (SELECT MAX(r.period_key) FROM reports r
+                        WHERE r.organization_code = ob.organization_code
+                          AND r.report_type = ob.report_type AND r.period_key < ob.period_key)
+                {outstanding}
+                ORDER BY ob.organization_code
+                LIMIT ?
+            ''', params + [limit]).fetchall()
+        
+        return {
+            'period': period_label(key),
+            'report_type': report_type,
+            'expected': expected_count,
+            'missing_count': missing_count,
+            'missing': [
+                {
+                    'organization_code': code,
+                    'organization_name': name,
+                    'activity_code': activity,
+                    'region': org_region,
+                    'last_period': period_label(last),
+                }
+                for code, name, activity, org_region, last in rows
+            ],
+        }
+    
+    def get_cached_validation(self, validation_key: str) -> Optional[ValidationResult]:
+        """Get stored validation result by validation cache key."""
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                'SELECT validation_results FROM reports WHERE validation_key = ? LIMIT 1',
+                (validation_key,)
+            ).fetchone()
+        
+        if row and row[0]:
+            return ValidationResult.model_validate_json(row[0])
+        return None
     
     def get_report(self, report_id: int) -> Optional[ReportRecord]:
         """Get report by ID."""
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             row = conn.execute(
-                'SELECT * FROM reports WHERE id = ?', (report_id,)
+                'SELECT * FROM report_view WHERE id = ?', (report_id,)
             ).fetchone()
             
             if row:
                 return self._row_to_record(row)
             return None
     
+    def get_report_row(self, report_id: int) -> Optional[Dict[str, Any]]:
+        """Get raw report columns by ID (no model construction), with its 'version_token'."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                'SELECT v.*, o.revision AS organization_revision FROM report_view v '
+                'LEFT JOIN organizations o ON o.id = v.org_id WHERE v.id = ?',
+                (report_id,)
+            ).fetchone()
+            if not row:
+                return None
+            row = dict(row)
+            row['version_token'] = _version_token(row['version'], row.pop('organization_revision'), row['uploaded_at'])
+            return row
+    
+    def get_report_version(self, report_id: int) -> Optional[str]:
+        """Get the token of everything a report's detail shows, None if not found.
+        
+        Changes with the report version and with the organization's revision
+        (a rename shows in every report of the organization).
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                'SELECT r.version, o.revision, r.uploaded_at FROM reports r '
+                'LEFT JOIN organizations o ON o.id = r.org_id WHERE r.id = ?',
+                (report_id,)
+            ).fetchone()
+            return _version_token(*row) if row else None
+    
+    def list_report_versions(self, report_id: int) -> List[Dict[str, Any]]:
+        """List versions of a report, newest (current) first. Empty if not found."""
+        with sqlite3.connect(self.db_path) as conn:
+            current = conn.execute(
+                'SELECT version, validation_status, uploaded_at, content_digest FROM reports WHERE id = ?',
+                (report_id,)
+            ).fetchone()
+            if not current:
+                return []
+            older = conn.execute(
+                'SELECT version, validation_status, uploaded_at, content_digest, LENGTH(delta) '
+                'FROM report_versions WHERE report_id = ? ORDER BY version DESC',
+                (report_id,)
+            ).fetchall()
+        
+        versions = [{
+            'version': current[0], 'validation_status': current[1], 'uploaded_at': current[2],
+            'content_digest': current[3], 'current': True, 'delta_size': 0
+        }]
+        for version, status, uploaded_at, digest, delta_size in older:
+            versions.append({
+                'version': version, 'validation_status': status, 'uploaded_at': uploaded_at,
+                'content_digest': digest, 'current': False, 'delta_size': delta_size
+            })
+        return versions
+    
+    def get_report_document(self, report_id: int, version: int = None) -> Optional[Dict[str, Any]]:
+        """Get report content at a version (default current) as a plain document."""
+        with sqlite3.connect(self.db_path) as conn:
+            current = conn.execute(
+                'SELECT organization_name, section_i_data, section_ii_data, validation_results, '
+                'version, validation_status, uploaded_at FROM report_view WHERE id = ?',
+                (report_id,)
+            ).fetchone()
+            if not current or (version is not None and not 1 <= version <= current[4]):
+                return None
+            
+            document = _document(*current[:4])
+            header = {'version': current[4], 'validation_status': current[5], 'uploaded_at': current[6]}
+            if version is not None and version < current[4]:
+                deltas = conn.execute(
+                    'SELECT version, validation_status, uploaded_at, delta FROM report_versions '
+                    'WHERE report_id = ? AND version >= ? ORDER BY version DESC',
+                    (report_id, version)
+                ).fetchall()
+                if not deltas or deltas[-1][0] != version:
+                    return None
+                for _, status, uploaded_at, delta in deltas:
+                    document = apply_delta(document, json.loads(delta))
+                header = {'version': version, 'validation_status': status, 'uploaded_at': uploaded_at}
+        
+        return {'report_id': report_id, **header, **document}
+    
+    def diff_report_versions(self, report_id: int, from_version: int, to_version: int = None) -> Optional[Dict[str, Any]]:
+        """Diff two versions of a report (to_version defaults to current)."""
+        older = self.get_report_document(report_id, from_version)
+        newer = self.get_report_document(report_id, to_version)
+        if not older or not newer:
+            return None
+        return {
+            'report_id': report_id,
+            'from_version': older['version'],
+            'to_version': newer['version'],
+            **diff_documents(older, newer)
+        }
+    
     def get_latest_report(
         self, 
         org_code: str, 
@@ -113,27 +1338,204 @@ class DatabaseHandler:
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
             row = conn.execute('''
-                SELECT * FROM reports 
+                SELECT * FROM report_view 
                 WHERE organization_code = ? 
                   AND report_type = ?
-                  AND report_period < ?
-                ORDER BY report_period DESC
+                  AND period_key < ?
+                ORDER BY period_key DESC
                 LIMIT 1
+            ''', (org_code, report_type, period_key(period))).fetchone()
+            
+            if row:
+                return self._row_to_record(row)
+            return None
+    
+    def get_previous_report_data(
+        self, 
+        org_code: str, 
+        report_type: str, 
+        period: str
+    ) -> Optional[ReportData]:
+        """Get previous report (latest before given period) as ReportData.
+        
+        Decoded baselines are cached and checked against the version token
+        of the latest earlier report before being returned, so writes from
+        other processes are seen; local writes also drop them. Callers must
+        not mutate the returned object.
+        """
+        key = (str(self.db_path), org_code, report_type, period)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            latest = conn.execute('''
+                SELECT r.id, r.version, o.revision, r.uploaded_at
+                FROM reports r
+                LEFT JOIN organizations o ON o.id = r.org_id
+                WHERE r.organization_code = ? 
+                  AND r.report_type = ?
+                  AND r.period_key < ?
+                ORDER BY r.period_key DESC
+                LIMIT 1
+            ''', (org_code, report_type, period_key(period))).fetchone()
+            token = (latest['id'], _version_token(latest['version'], latest['revision'], latest['uploaded_at'])) if latest else None
+            
+            cached = _baseline_cache.get(key, _MISSING)
+            if cached is not _MISSING and cached[0] == token:
+                return cached[1]
+            
+            row = conn.execute('''
+                SELECT organization_name, report_type, report_period,
+                       section_i_data, section_ii_data, uploaded_at
+                FROM report_view 
+                WHERE id = ?
+            ''', (latest['id'],)).fetchone() if latest else None
+        
+        report = None
+        if row:
+            report = ReportData.model_construct(
+                organization=OrganizationInfo(code=org_code, name=row['organization_name'] or ""),
+                report_type=row['report_type'],
+                report_period=row['report_period'],
+                section_i=SectionI.model_construct(rows=decode_section_i(row['section_i_data'])),
+                section_ii=SectionII.model_construct(products=decode_section_ii(row['section_ii_data'])),
+                uploaded_at=datetime.fromisoformat(row['uploaded_at']) if row['uploaded_at'] else None
+            )
+        
+        _baseline_cache.set(key, (token, report))
+        return report
+    
+    def _invalidate_baselines(self, org_code: str, report_type: str, period: str):
+        """Drop cached baselines that a write to (org, type, period) may change."""
+        db_path = str(self.db_path)
+        written = period_key(period)
+        _baseline_cache.invalidate(
+            lambda key, value: key[:3] == (db_path, org_code, report_type)
+            and (written is None or (period_key(key[3]) or 0) > written)
+        )
+    
+    def get_report_by_key(
+        self, 
+        org_code: str, 
+        report_type: str, 
+        period: str
+    ) -> Optional[ReportRecord]:
+        """Get report for an exact (organization, type, period)."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('''
+                SELECT * FROM report_view 
+                WHERE organization_code = ? AND report_type = ? AND report_period = ?
             ''', (org_code, report_type, period)).fetchone()
             
             if row:
                 return self._row_to_record(row)
             return None
     
+    def get_year_reports(self, org_code: str, year: str) -> List[ReportRecord]:
+        """Get annual and monthly reports of an organization for a year."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute('''
+                SELECT * FROM report_view 
+                WHERE organization_code = ? 
+                  AND report_type IN ('1-isth', '12-isth')
+                  AND period_key >= ? AND period_key < ?
+                ORDER BY report_type, period_key
+            ''', (org_code, *period_range(year))).fetchall()
+            return [self._row_to_record(row) for row in rows]
+    
+    def iter_year_reports(self, year: str) -> Iterator[ReportRecord]:
+        """Stream all annual and monthly reports for a year, ordered by organization."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute('''
+                SELECT * FROM report_view 
+                WHERE report_type IN ('1-isth', '12-isth')
+                  AND period_key >= ? AND period_key < ?
+                ORDER BY organization_code, report_type, period_key
+            ''', period_range(year))
+            for row in cursor:
+                yield self._row_to_record(row)
+    
+    def iter_export_chunks(
+        self,
+        start: str = None,
+        end: str = None,
+        report_type: str = None,
+        status: str = None,
+        activity_code: str = None,
+        with_sections: bool = True,
+        chunk_size: int = Config.EXPORT_CHUNK_SIZE
+    ) -> Iterator[List[sqlite3.Row]]:
+        """Stream reports matching an export filter in chunks of chunk_size rows.
+        
+        start/end bound the period range inclusively ('2024', '2025-Q3', ...);
+        activity_code matches as a prefix (sector '13' -> '13.10'). Rows are
+        fetched from one open cursor, so memory depends on the chunk size
+        only. The connection may be used from several threads in turn (as
+        when a streamed HTTP response is iterated in a thread pool).
+        """
+        query = (
+            'SELECT r.id, r.organization_code, r.organization_name, r.report_type, r.report_period, '
+            'r.validation_status, r.uploaded_at, o.activity_code, o.region'
+            + (', r.section_i_data, r.section_ii_data' if with_sections else '')
+            + ' FROM report_view r LEFT JOIN organizations o ON o.id = r.org_id'
+            ' WHERE r.period_key >= ? AND r.period_key < ?'
+        )
+        params: List[Any] = [period_range(start)[0] if start else 0, period_range(end)[1] if end else 1000000]
+        if report_type:
+            query += ' AND r.report_type = ?'
+            params.append(report_type)
+        if status:
+            query += ' AND r.validation_status = ?'
+            params.append(status)
+        if activity_code:
+            query += " AND o.activity_code LIKE ? || '%'"
+            params.append(activity_code)
+        query += ' ORDER BY r.period_key, r.organization_code, r.report_type'
+        
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            conn.close()
+    
+    def iter_previous_year_pairs(self, year: str) -> Iterator[Dict[str, Any]]:
+        """Stream 1-isth reports for a year joined with the same organization's prior-year report."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.execute('''
+                SELECT cur.id AS report_id,
+                       cur.organization_code,
+                       cur.section_i_data,
+                       prev.id AS prior_report_id,
+                       prev.section_i_data AS prior_section_i_data
+                FROM reports cur
+                JOIN reports prev
+                  ON prev.organization_code = cur.organization_code
+                 AND prev.report_type = cur.report_type
+                 AND prev.period_key = ?
+                WHERE cur.report_type = '1-isth' AND cur.period_key = ?
+                ORDER BY cur.organization_code
+            ''', (period_range(year)[0] - 100, period_range(year)[0]))
+            for row in cursor:
+                yield dict(row)
+    
     def get_history(
         self, 
         org_code: str = None, 
         report_type: str = None,
         limit: int = 10,
-        status: str = None
+        status: str = None,
+        period: str = None
     ) -> List[ReportRecord]:
-        """Get report history with optional filters."""
-        query = 'SELECT * FROM reports WHERE 1=1'
+        """Get report history with optional filters (period: '2025', '2025-07', '2025-Q3', '2025-H1')."""
+        query = f'SELECT {HEADER_COLUMNS} FROM report_view WHERE 1=1'
         params = []
         
         if org_code:
@@ -148,6 +1550,10 @@ class DatabaseHandler:
             query += ' AND validation_status = ?'
             params.append(status)
         
+        if period:
+            query += ' AND period_key >= ? AND period_key < ?'
+            params.extend(period_range(period))
+        
         query += ' ORDER BY uploaded_at DESC LIMIT ?'
         params.append(limit)
         
@@ -156,6 +1562,35 @@ class DatabaseHandler:
             rows = conn.execute(query, params).fetchall()
             return [self._row_to_record(row) for row in rows]
     
+    def iter_org_sections(
+        self,
+        org_code: str,
+        report_type: str,
+        start: str = None,
+        end: str = None
+    ) -> Iterator[tuple]:
+        """Stream (report_period, section_i_data, section_ii_data) for an organization in period order.
+        
+        start/end are period specs ('2024', '2025-Q3', ...) bounding the range
+        inclusively. Section data is JSON as stored (Section II with catalog
+        codes and names); one scan of idx_reports_org_type_period_key.
+        """
+        low = period_range(start)[0] if start else 0
+        high = period_range(end)[1] if end else 1000000
+        with sqlite3.connect(self.db_path) as conn:
+            yield from conn.execute('''
+                SELECT report_period, section_i_data, section_ii_data
+                FROM report_view
+                WHERE organization_code = ? AND report_type = ? AND period_key >= ? AND period_key < ?
+                ORDER BY period_key
+            ''', (org_code, report_type, low, high))
+    
+    def get_data_version(self) -> int:
+        """Get reports data version (changes on every committed write, from any process)."""
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'data_version'").fetchone()
+            return row[0] if row else 0
+    
     def get_statistics(self) -> Dict[str, int]:
         """Get overall statistics."""
         with sqlite3.connect(self.db_path) as conn:
@@ -203,8 +1638,9 @@ class DatabaseHandler:
                 (org_code,)
             ).fetchone()[0]
             
+            conn.row_factory = sqlite3.Row
             last_report = conn.execute(
-                'SELECT * FROM reports WHERE organization_code = ? ORDER BY uploaded_at DESC LIMIT 1',
+                f'SELECT {HEADER_COLUMNS} FROM report_view WHERE organization_code = ? ORDER BY uploaded_at DESC LIMIT 1',
                 (org_code,)
             ).fetchone()
             
@@ -219,9 +1655,28 @@ class DatabaseHandler:
     
     def delete_report(self, report_id: int) -> bool:
         """Delete a report by ID."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute('DELETE FROM reports WHERE id = ?', (report_id,))
-            return cursor.rowcount > 0
+        def write(conn: sqlite3.Connection):
+            key = conn.execute(
+                'SELECT organization_code, report_type, report_period FROM reports WHERE id = ?',
+                (report_id,)
+            ).fetchone()
+            if key:
+                conn.execute('DELETE FROM reports WHERE id = ?', (report_id,))
+                conn.execute('DELETE FROM report_versions WHERE report_id = ?', (report_id,))
+                conn.execute('DELETE FROM report_products WHERE report_id = ?', (report_id,))
+                _update_cube(conn, report_id)
+                _store_issues(conn, report_id)
+                _log_change(conn, report_id, 'delete')
+            return key
+        
+        key = get_writer(self.db_path).run(write)
+        if not key:
+            return False
+        
+        self._invalidate_baselines(*key)
+        _ranking_cache.clear()
+        _notify_write('delete', *key)
+        return True
     
     def compare_reports(
         self, 
@@ -256,6 +1711,16 @@ class DatabaseHandler:
             "comparison": comparison
         }
     
+    def compare_periods(
+        self,
+        org_code: str,
+        report_type: str,
+        start: str = None,
+        end: str = None
+    ) -> Dict[str, Any]:
+        """Compare all of an organization's reports between two periods (see analytics.comparison_matrix)."""
+        return comparison_matrix(self.iter_org_sections(org_code, report_type, start, end))
+    
     def _build_comparison(
         self, 
         current: ReportRecord, 
@@ -322,20 +1787,43 @@ class DatabaseHandler:
         }
     
     def _row_to_record(self, row: sqlite3.Row) -> ReportRecord:
-        """Convert sqlite3.Row to ReportRecord."""
-        return ReportRecord(
-            id=row['id'],
-            organization_code=row['organization_code'],
-            organization_name=row['organization_name'],
-            report_type=row['report_type'],
-            report_period=row['report_period'],
-            section_i_data=row['section_i_data'],
-            section_ii_data=row['section_ii_data'],
-            validation_results=row['validation_results'],
-            validation_status=row['validation_status'],
-            uploaded_at=datetime.fromisoformat(row['uploaded_at']) if row['uploaded_at'] else None
+        """Convert sqlite3.Row to ReportRecord.
+        
+        Column values are referenced as-is (no validation copy). Rows
+        selected with HEADER_COLUMNS get a handle that fetches the JSON
+        blobs on first access.
+        """
+        header = {
+            'id': row['id'],
+            'organization_code': row['organization_code'],
+            'organization_name': row['organization_name'] or "",
+            'report_type': row['report_type'],
+            'report_period': row['report_period'],
+            'validation_status': row['validation_status'] or "",
+            'uploaded_at': datetime.fromisoformat(row['uploaded_at']) if row['uploaded_at'] else None
+        }
+        
+        if 'section_i_data' not in row.keys():
+            report_id = row['id']
+            return ReportRecord.lazy(lambda: self._fetch_blobs(report_id), **header)
+        
+        return ReportRecord.model_construct(
+            section_i_data=row['section_i_data'] or "",
+            section_ii_data=row['section_ii_data'] or "",
+            validation_results=row['validation_results'] or "",
+            **header
         )
     
+    def _fetch_blobs(self, report_id: int) -> Dict[str, Optional[str]]:
+        """Fetch JSON blob columns of a report."""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute(
+                f'SELECT {", ".join(REPORT_BLOB_FIELDS)} FROM report_view WHERE id = ?',
+                (report_id,)
+            ).fetchone()
+            return dict(row) if row else {}
+    
     def search_reports(
         self, 
         query: str, 
@@ -346,8 +1834,8 @@ class DatabaseHandler:
         
         with sqlite3.connect(self.db_path) as conn:
             conn.row_factory = sqlite3.Row
-            rows = conn.execute('''
-                SELECT * FROM reports 
+            rows = conn.execute(f'''
+                SELECT {HEADER_COLUMNS} FROM report_view 
                 WHERE organization_code LIKE ? OR organization_name LIKE ?
                 ORDER BY uploaded_at DESC
                 LIMIT ?
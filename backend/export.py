@@ -0,0 +1,135 @@
+# Streaming CSV / Parquet export for azstat-report
+
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Optional dependency
+    pyarrow = None
+
+
+# Exported tables: (column, type) with type 'int', 'float' or 'str'
+_REPORT_KEY = [
+    ('report_id', 'int'), ('organization_code', 'str'), ('report_type', 'str'), ('report_period', 'str'),
+]
+EXPORT_TABLES: Dict[str, List[Tuple[str, str]]] = {
+    'reports': _REPORT_KEY + [
+        ('organization_name', 'str'), ('activity_code', 'str'), ('region', 'str'),
+        ('validation_status', 'str'), ('uploaded_at', 'str'),
+    ],
+    'section_i': _REPORT_KEY + [
+        ('row_code', 'str'), ('row_name', 'str'), ('current_year', 'float'), ('previous_year', 'float'),
+    ],
+    'products': _REPORT_KEY + [
+        ('product_code', 'str'), ('product_name', 'str'), ('unit', 'str'),
+        ('produced', 'float'), ('internal_use', 'float'), ('sold_quantity', 'float'),
+        ('sold_value', 'float'), ('year_end_stock', 'float'), ('import_value', 'float'),
+    ],
+}
+
+EXPORT_FORMATS = ('csv', 'parquet')
+MEDIA_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def table_rows(chunks: Iterable[List[Any]], table: str) -> Iterator[List[tuple]]:
+    """Turn chunks of report rows (see DatabaseHandler.iter_export_chunks) into export row chunks."""
+    columns = [name for name, _ in EXPORT_TABLES[table]]
+    for chunk in chunks:
+        rows = []
+        for report in chunk:
+            key = (report['id'], report['organization_code'], report['report_type'], report['report_period'])
+            if table == 'reports':
+                rows.append(key + tuple(report[name] for name in columns[4:]))
+                continue
+            data = report['section_i_data'] if table == 'section_i' else report['section_ii_data']
+            for item in json.loads(data) if data else []:
+                rows.append(key + tuple(item.get(name) for name in columns[4:]))
+        yield rows
+
+
+def iter_csv(row_chunks: Iterable[List[tuple]], table: str) -> Iterator[bytes]:
+    """Encode row chunks as CSV, one piece per chunk (header first)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in EXPORT_TABLES[table]])
+    for rows in row_chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the caller."""
+    
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+        self._position = 0
+    
+    def writable(self) -> bool:
+        return True
+    
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def iter_parquet(row_chunks: Iterable[List[tuple]], table: str) -> Iterator[bytes]:
+    """Encode row chunks as Parquet, one row group per chunk, yielding bytes as they are written."""
+    if pyarrow is None:
+        raise RuntimeError("Parquet export requires the pyarrow package")
+    types = {'int': pyarrow.int64(), 'float': pyarrow.float64(), 'str': pyarrow.string()}
+    schema = pyarrow.schema([(name, types[kind]) for name, kind in EXPORT_TABLES[table]])
+    
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    try:
+        for rows in row_chunks:
+            if rows:
+                columns = list(zip(*rows))
+                writer.write_table(pyarrow.Table.from_arrays(
+                    [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)],
+                    schema=schema
+                ))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_stream(chunks: Iterable[List[Any]], table: str, fmt: str) -> Iterator[bytes]:
+    """Stream an export table in the given format from report chunks."""
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Unknown export table: {table}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == 'parquet' and pyarrow is None:
+        raise RuntimeError("Parquet export requires the pyarrow package")
+    rows = table_rows(chunks, table)
+    return iter_csv(rows, table) if fmt == 'csv' else iter_parquet(rows, table)
+
+
+def format_for_path(path: str, fmt: Optional[str] = None) -> str:
+    """Export format from an explicit choice or the output file extension."""
+    return fmt or ('parquet' if str(path).lower().endswith('.parquet') else 'csv')
@@ -1,21 +1,41 @@
 # CLI Entry Point and Web API for azstat-report
 
+import re
 import sys
 import json
+import hashlib
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, Any
 
 import click
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 
 from config import Config
 from parser import AzstatParser
-from validator import ValidationEngine
-from database import DatabaseHandler
+from database import DatabaseHandler, on_write, write_metrics
+from validation_cache import validation_cache
+from reconciler import ReconciliationEngine
 from models import ReportData, ValidationResult
+from cache import LRUCache, VersionedTTLCache, SingleFlight
+from compression import negotiate_encoding, compress
+from export import EXPORT_TABLES, EXPORT_FORMATS, MEDIA_TYPES, export_stream, format_for_path
+from periods import ANNUAL_MONTH, period_key, period_range
+from mirror import AnalyticsMirror, get_mirror
+from analytics import (
+    parse_dimensions, parse_codes, build_timeseries, timeseries_to_arrow,
+    PRODUCT_FIELDS, ARROW_MEDIA_TYPE, RANKING_METRICS, RANKING_ORDERS
+)
+
+
+def _analytics():
+    """Source for analytics queries: the DuckDB mirror when configured, else SQLite."""
+    db = DatabaseHandler()
+    return get_mirror(db.db_path) or db
 
 
 # ========================
@@ -48,36 +68,22 @@ def validate(file_path: str, compare: bool, output: str):
     click.echo(f"Organization: {report.organization.name} ({report.organization.code})")
     
     # Get previous report for comparison
+    db = DatabaseHandler()
     previous_report = None
     if compare:
-        db = DatabaseHandler()
-        prev_record = db.get_latest_report(
-            report.organization.code,
-            report.report_type,
-            report.report_period
-        )
-        if prev_record:
-            # Convert record to ReportData
-            try:
-                prev_section_i = json.loads(prev_record.section_i_data) if prev_record.section_i_data else []
-                prev_section_ii = json.loads(prev_record.section_ii_data) if prev_record.section_ii_data else []
-                
-                from models import SectionI, SectionII, SectionIRow, ProductRow
-                
-                previous_report = ReportData(
-                    organization=report.organization,  # Use current org info
-                    report_type=prev_record.report_type,
-                    report_period=prev_record.report_period,
-                    section_i=SectionI(rows=[SectionIRow(**row) for row in prev_section_i]),
-                    section_ii=SectionII(products=[ProductRow(**prod) for prod in prev_section_ii]),
-                )
-                click.echo(f"Previous report found: {prev_record.report_period}")
-            except Exception as e:
-                click.echo(f"Warning: Could not load previous report: {e}")
+        try:
+            previous_report = db.get_previous_report_data(
+                report.organization.code,
+                report.report_type,
+                report.report_period
+            )
+            if previous_report:
+                click.echo(f"Previous report found: {previous_report.report_period}")
+        except Exception as e:
+            click.echo(f"Warning: Could not load previous report: {e}")
     
-    # Validate
-    engine = ValidationEngine(report, previous_report)
-    result = engine.validate()
+    # Validate (saved results are always complete: full mode)
+    result, validation_key = validation_cache.validate(report, previous_report, db=db)
     
     # Prepare output
     if output == 'json':
@@ -107,8 +113,7 @@ def validate(file_path: str, compare: bool, output: str):
                 click.echo(f"  {icon} [{issue.category.upper()}] {issue.field}: {issue.message}")
     
     # Save to database
-    db = DatabaseHandler()
-    report_id = db.save_report(report, result)
+    report_id = db.save_report(report, result, validation_key=validation_key)
     click.echo(f"\nSaved to database (ID: {report_id})")
 
 
@@ -117,15 +122,20 @@ def validate(file_path: str, compare: bool, output: str):
 @click.option('--type', 'report_type', help='Filter by report type (1-isth or 12-isth)')
 @click.option('--limit', default=20, help='Number of reports to show')
 @click.option('--status', help='Filter by validation status')
-def history(organization_code: str, report_type: str, limit: int, status: str):
+@click.option('--period', help='Filter by period (2025, 2025-07, 2025-Q3, 2025-H1)')
+def history(organization_code: str, report_type: str, limit: int, status: str, period: str):
     """Show report history."""
     db = DatabaseHandler()
-    reports = db.get_history(
-        org_code=organization_code,
-        report_type=report_type,
-        limit=limit,
-        status=status
-    )
+    try:
+        reports = db.get_history(
+            org_code=organization_code,
+            report_type=report_type,
+            limit=limit,
+            status=status,
+            period=period
+        )
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--period')
     
     if not reports:
         click.echo("No reports found.")
@@ -261,6 +271,148 @@ def search(query: str, limit: int):
         click.echo(f"  #{r.id} | {r.report_type} | {r.report_period} | {r.organization_name}")
 
 
+@cli.command()
+@click.argument('year')
+@click.option('--org', 'organization_code', help='Reconcile a single organization (default: all)')
+@click.option('--previous-year', is_flag=True, help='Check 1-isth previous_year column against prior-year reports instead')
+@click.option('--output', '-o', type=click.Choice(['text', 'json']), default='text', help='Output format')
+def reconcile(year: str, organization_code: str, previous_year: bool, output: str):
+    """Reconcile monthly 12-isth reports with the annual 1-isth report."""
+    key = period_key(year)
+    if key is None or key % 100 != ANNUAL_MONTH:
+        raise click.BadParameter(f"Invalid year: {year}", param_hint="'YEAR'")
+    engine = ReconciliationEngine(DatabaseHandler())
+    
+    if previous_year:
+        if organization_code:
+            results = [engine.check_previous_year(organization_code, year)]
+        else:
+            results = engine.audit_previous_year(year)
+    elif organization_code:
+        results = [engine.reconcile(organization_code, year)]
+    else:
+        results = engine.reconcile_year(year)
+    
+    totals = {'passed': 0, 'warning': 0, 'skipped': 0}
+    for result in results:
+        totals[result.status] += 1
+        
+        if output == 'json':
+            # One JSON object per line so bulk runs stream
+            click.echo(json.dumps(result.model_dump(), ensure_ascii=False))
+            continue
+        
+        coverage = f"report #{result.annual_report_id}" if previous_year else f"{len(result.monthly_periods):>2} months"
+        click.echo(f"{result.organization_code:<12} | {result.status:<8} | {coverage} | {len(result.issues)} issues")
+        for issue in result.issues:
+            if issue.category == 'warning' or organization_code:
+                click.echo(f"    [{issue.category.upper()}] {issue.field}: {issue.message}")
+    
+    if output == 'text':
+        click.echo(f"\nPassed: {totals['passed']} | Warnings: {totals['warning']} | Skipped: {totals['skipped']}")
+
+
+@cli.command()
+@click.argument('period')
+@click.option('--type', 'report_type', type=click.Choice(['1-isth', '12-isth']), help='Report type (default: from period)')
+@click.option('--metric', type=click.Choice(RANKING_METRICS), default='sales')
+@click.option('--by', type=click.Choice(RANKING_ORDERS), default='change')
+@click.option('--limit', default=20)
+def movers(period: str, report_type: str, metric: str, by: str, limit: int):
+    """Rank organizations by change against the previous period."""
+    if report_type is None:
+        report_type = '12-isth' if '-' in period else '1-isth'
+    try:
+        result = _analytics().rank_changes(period, report_type, metric=metric, by=by, limit=limit)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'PERIOD'")
+    
+    click.echo(f"\nTop {metric} changes: {result['period']} vs {result['previous_period']} ({report_type})")
+    for mover in result['movers']:
+        pct = f"{mover['change_pct']:+.1f}%" if mover['change_pct'] is not None else "n/a"
+        click.echo(f"  {mover['organization_code']:<12} | {mover['change']:>+14.2f} | {pct:>9} | {mover['organization_name'] or ''}")
+
+
+@cli.command()
+@click.argument('output', type=click.Path(dir_okay=False))
+@click.option('--table', type=click.Choice(list(EXPORT_TABLES)), default='reports', help='Reports, Section I rows or products')
+@click.option('--format', 'fmt', type=click.Choice(EXPORT_FORMATS), help='Output format (default: from file extension)')
+@click.option('--start', help='First period (2025, 2025-07, 2025-Q1)')
+@click.option('--end', help='Last period (inclusive)')
+@click.option('--type', 'report_type', type=click.Choice(['1-isth', '12-isth']))
+@click.option('--status', type=click.Choice(['passed', 'warning', 'failed']))
+@click.option('--sector', 'activity_code', help='Activity code prefix')
+def export(output: str, table: str, fmt: str, start: str, end: str, report_type: str, status: str, activity_code: str):
+    """Export reports, Section I rows or products to CSV or Parquet."""
+    # Chunks are read lazily: check the range before the output file is created
+    for value, hint in ((start, '--start'), (end, '--end')):
+        if value:
+            try:
+                period_range(value)
+            except ValueError as e:
+                raise click.BadParameter(str(e), param_hint=hint)
+    chunks = DatabaseHandler().iter_export_chunks(
+        start, end, report_type=report_type, status=status, activity_code=activity_code,
+        with_sections=table != 'reports'
+    )
+    try:
+        stream = export_stream(chunks, table, format_for_path(output, fmt))
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    
+    size = 0
+    with open(output, 'wb') as f:
+        for data in stream:
+            f.write(data)
+            size += len(data)
+    click.echo(f"Exported {table} to {output} ({size} bytes)")
+
+
+@cli.command('sync-mirror')
+def sync_mirror():
+    """Bring the analytics mirror up to date with the change log."""
+    if Config.MIRROR_PATH is None:
+        raise click.ClickException("No analytics mirror configured (Config.MIRROR_PATH)")
+    try:
+        mirror = AnalyticsMirror(DatabaseHandler().db_path, Config.MIRROR_PATH)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    try:
+        count = mirror.sync()
+    finally:
+        mirror.close()
+    click.echo(f"Mirror {mirror.mirror_path}: {count} reports refreshed.")
+
+
+@cli.command()
+@click.argument('period')
+@click.option('--type', 'report_type', type=click.Choice(['1-isth', '12-isth']), help='Report type (default: from period)')
+@click.option('--sector', 'activity_code', help='Activity code')
+@click.option('--region')
+@click.option('--limit', default=1000)
+def missing(period: str, report_type: str, activity_code: str, region: str, limit: int):
+    """List organizations that have not yet submitted a report expected for a period."""
+    if report_type is None:
+        report_type = '12-isth' if '-' in period else '1-isth'
+    try:
+        result = DatabaseHandler().get_missing_reports(
+            period, report_type, activity_code=activity_code, region=region, limit=limit
+        )
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'PERIOD'")
+    
+    for item in result['missing']:
+        click.echo(f"  {item['organization_code']:<12} | last: {item['last_period'] or '-':<8} | {item['organization_name'] or ''}")
+    click.echo(f"\n{report_type} {result['period']}: {result['missing_count']} of {result['expected']} expected reports missing")
+
+
+@cli.command('rebuild-cube')
+def rebuild_cube():
+    """Rebuild the statistics cube from all stored reports."""
+    count = DatabaseHandler().rebuild_stats_cube()
+    click.echo(f"Statistics cube rebuilt from {count} reports.")
+
+
 # ========================
 # Web API (FastAPI)
 # ========================
@@ -280,6 +432,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class _GZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves routes encoding their own responses alone.
+    
+    Older Starlette versions compress a response that already has a
+    Content-Encoding a second time; those routes bypass the middleware.
+    """
+    
+    def __init__(self, app, skip_paths: re.Pattern, **kwargs):
+        super().__init__(app, **kwargs)
+        self.skip_paths = skip_paths
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.skip_paths.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+# Gzip for dynamic responses; stored report details are compressed (and cached) in the endpoint
+app.add_middleware(
+    _GZipMiddleware,
+    skip_paths=re.compile(r'^/api/reports/\d+$'),
+    minimum_size=Config.COMPRESSION_MIN_SIZE,
+    compresslevel=Config.GZIP_LEVEL
+)
+
 
 @app.get("/")
 def root():
@@ -287,20 +465,44 @@ def root():
     return {"status": "ok", "message": "azstat-report API working"}
 
 
+# Statistics for /api/stats and /api/health (TTL + write invalidation)
+_stats_cache = VersionedTTLCache(Config.STATS_CACHE_TTL, Config.STATS_CACHE_SIZE)
+
+
+@on_write
+def _invalidate_stats(event: str, org_code: str, report_type: str, report_period: str):
+    _stats_cache.clear()
+
+
+def _cached_statistics(db: DatabaseHandler, organization_code: str = None):
+    """Get overall or organization statistics through the stats cache."""
+    db_key = str(db.db_path.resolve())
+    if organization_code:
+        key, compute = (db_key, organization_code), lambda: db.get_org_statistics(organization_code)
+    else:
+        key, compute = (db_key, None), db.get_statistics
+    return _stats_cache.get_or_compute(key, compute, db.get_data_version)
+
+
 @app.get("/api/health")
 def health_check():
     """Detailed health check."""
     db = DatabaseHandler()
-    stats = db.get_statistics()
+    stats = _cached_statistics(db)
     
     return {
         "status": "healthy",
         "api_version": "1.0.0",
         "database": "connected",
-        "total_reports": stats['total']
+        "total_reports": stats['total'],
+        "writes": write_metrics()
     }
 
 
+# In-flight uploads keyed by (content sha256, compare)
+_upload_flights = SingleFlight()
+
+
 @app.post("/api/upload")
 async def upload_report(
     file: UploadFile = File(...),
@@ -311,6 +513,9 @@ async def upload_report(
     
     - file: HTML fayl
     - compare: Əvvəlki dövr ilə müqayisə
+    
+    Bazaya yazılan nəticə həmişə tam (full) validasiyadır; sürətli rejimlər
+    yalnız /api/validate üçündür.
     """
     # Fayl tipi yoxlaması
     if not file.filename.endswith(('.html', '.htm')):
@@ -318,46 +523,43 @@ async def upload_report(
     
     # Fayl oxumaq
     content = await file.read()
-    html_content = content.decode('utf-8')
     
+    # Eyni vaxtda göndərilən eyni fayllar bir dəfə emal olunur
+    key = (hashlib.sha256(content).hexdigest(), compare)
+    return await _upload_flights.do(key, lambda: run_in_threadpool(_process_upload, content, compare))
+
+
+def _parse_upload(content: bytes) -> ReportData:
+    """Decode and parse an uploaded HTML report (400 if the file cannot be read)."""
+    try:
+        return AzstatParser(content.decode('utf-8')).parse()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid report file: {e}")
+
+
+def _process_upload(content: bytes, compare: bool) -> Dict[str, Any]:
+    """Parse, validate (full mode) and save an uploaded report."""
     # Parse
-    parser = AzstatParser(html_content)
-    report = parser.parse()
+    report = _parse_upload(content)
     
     # Əvvəlki hesabatı tap (müqayisə üçün)
+    db = DatabaseHandler()
     previous_report = None
     if compare:
-        db = DatabaseHandler()
-        prev_record = db.get_latest_report(
-            report.organization.code,
-            report.report_type,
-            report.report_period
-        )
-        if prev_record:
-            # Convert record to ReportData
-            try:
-                prev_section_i = json.loads(prev_record.section_i_data) if prev_record.section_i_data else []
-                prev_section_ii = json.loads(prev_record.section_ii_data) if prev_record.section_ii_data else []
-                
-                from models import SectionI, SectionII, SectionIRow, ProductRow
-                
-                previous_report = ReportData(
-                    organization=report.organization,
-                    report_type=prev_record.report_type,
-                    report_period=prev_record.report_period,
-                    section_i=SectionI(rows=[SectionIRow(**row) for row in prev_section_i]),
-                    section_ii=SectionII(products=[ProductRow(**prod) for prod in prev_section_ii]),
-                )
-            except Exception:
-                pass  # Skip comparison if parse fails
+        try:
+            previous_report = db.get_previous_report_data(
+                report.organization.code,
+                report.report_type,
+                report.report_period
+            )
+        except Exception:
+            pass  # Skip comparison if parse fails
     
     # Validate
-    engine = ValidationEngine(report, previous_report)
-    result = engine.validate()
+    result, validation_key = validation_cache.validate(report, previous_report, db=db)
     
     # Save
-    db = DatabaseHandler()
-    report_id = db.save_report(report, result)
+    report_id = db.save_report(report, result, validation_key=validation_key)
     
     return {
         "report_id": report_id,
@@ -377,26 +579,174 @@ async def upload_report(
     }
 
 
+@app.post("/api/validate")
+async def validate_report(
+    file: UploadFile = File(...),
+    mode: str = Query('counts_only', pattern='^(full|fail_fast|counts_only)$', description="Validation mode")
+):
+    """
+    Yükləmədən əvvəl sürətli yoxlama (bazaya yazılmır).
+    
+    - file: HTML fayl
+    - mode: Validasiya rejimi (default: counts_only)
+    """
+    if not file.filename.endswith(('.html', '.htm')):
+        raise HTTPException(status_code=400, detail="Only HTML files allowed")
+    
+    content = await file.read()
+    report = _parse_upload(content)
+    result, _ = validation_cache.validate(report, mode=mode, db=DatabaseHandler())
+    
+    return {
+        "status": result.status,
+        "blocked": result.status == 'failed',
+        "organization_code": report.organization.code,
+        "report_type": report.report_type,
+        "report_period": report.report_period,
+        "summary": {
+            "errors": result.error_count,
+            "warnings": result.warning_count,
+            "infos": result.info_count
+        },
+        "issues": [issue.model_dump() for issue in result.issues]
+    }
+
+
+# Detail payload layout; bumped when the same stored report renders differently
+# (2: Section II products joined from the catalog)
+DETAIL_FORMAT = 2
+
+# (report_id, version) -> encoded detail JSON
+_detail_cache = LRUCache(Config.DETAIL_CACHE_SIZE)
+# (report_id, version, encoding) -> compressed detail JSON
+_compressed_cache = LRUCache(Config.COMPRESSED_CACHE_SIZE)
+
+
 @app.get("/api/reports/{report_id}")
-def get_report(report_id: int):
+def get_report(
+    report_id: int,
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None)
+):
     """Hesabat detallarını götürmək."""
     db = DatabaseHandler()
-    report = db.get_report(report_id)
-    if not report:
+    version = db.get_report_version(report_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Report not found")
     
-    return {
-        "id": report.id,
-        "organization_code": report.organization_code,
-        "organization_name": report.organization_name,
-        "report_type": report.report_type,
-        "report_period": report.report_period,
-        "validation_status": report.validation_status,
-        "uploaded_at": report.uploaded_at.isoformat() if report.uploaded_at else None,
-        "section_i_data": json.loads(report.section_i_data) if report.section_i_data else [],
-        "section_ii_data": json.loads(report.section_ii_data) if report.section_ii_data else [],
-        "validation_results": json.loads(report.validation_results) if report.validation_results else {}
+    payload = _detail_cache.get((report_id, version))
+    if payload is None:
+        row = db.get_report_row(report_id)
+        if not row:
+            raise HTTPException(status_code=404, detail="Report not found")
+        payload = _report_detail_payload(row)
+        # Key by the version actually encoded (row may be newer than `version`)
+        version = row['version_token']
+        _detail_cache.set((report_id, version), payload)
+    
+    # One representation (and ETag) per content encoding; small payloads are sent as is
+    encoding = negotiate_encoding(accept_encoding)
+    if len(payload) < Config.COMPRESSION_MIN_SIZE:
+        encoding = None
+    headers = {
+        "ETag": _report_etag(report_id, version, encoding),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
     }
+    if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    if encoding:
+        body = _compressed_cache.get((report_id, version, encoding))
+        if body is None:
+            body = compress(payload, encoding)
+            _compressed_cache.set((report_id, version, encoding), body)
+        headers["Content-Encoding"] = encoding
+        payload = body
+    
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+
+def _report_etag(report_id: int, version: str, encoding: Optional[str] = None) -> str:
+    """Strong ETag for a stored report version (one per content encoding)."""
+    digest = hashlib.sha1(f"{DETAIL_FORMAT}:{report_id}:{version}".encode('utf-8')).hexdigest()[:20]
+    return f'"{digest}-{encoding}"' if encoding else f'"{digest}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check If-None-Match against the ETag of the selected representation."""
+    if if_none_match.strip() == '*':
+        return True
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def _report_detail_payload(row: Dict[str, Any]) -> bytes:
+    """Build report detail JSON from stored columns, splicing the JSON blobs in without re-parsing."""
+    uploaded_at = row['uploaded_at']
+    header = json.dumps({
+        "id": row['id'],
+        "organization_code": row['organization_code'],
+        "organization_name": row['organization_name'],
+        "report_type": row['report_type'],
+        "report_period": row['report_period'],
+        "validation_status": row['validation_status'],
+        "version": row['version'],
+        "uploaded_at": datetime.fromisoformat(uploaded_at).isoformat() if uploaded_at else None
+    }, ensure_ascii=False)
+    
+    parts = [header[:-1]]
+    for name, empty in (('section_i_data', '[]'), ('section_ii_data', '[]'), ('validation_results', '{}')):
+        parts.append(f', "{name}": {row[name] or empty}')
+    parts.append('}')
+    return ''.join(parts).encode('utf-8')
+
+
+@app.get("/api/reports/{report_id}/versions")
+def list_report_versions(report_id: int):
+    """Hesabatın versiyalarının siyahısı (ən yenisi birinci)."""
+    db = DatabaseHandler()
+    versions = db.list_report_versions(report_id)
+    if not versions:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return {"report_id": report_id, "versions": versions}
+
+
+@app.get("/api/reports/{report_id}/versions/diff")
+def diff_report_versions(
+    report_id: int,
+    from_version: Optional[int] = Query(None, ge=1, description="Older version (default: previous)"),
+    to_version: Optional[int] = Query(None, ge=1, description="Newer version (default: current)")
+):
+    """İki versiya arasındakı fərqlər."""
+    db = DatabaseHandler()
+    if from_version is None:
+        versions = db.list_report_versions(report_id)
+        if not versions:
+            raise HTTPException(status_code=404, detail="Report not found")
+        newer = to_version or versions[0]['version']
+        if newer <= 1:
+            raise HTTPException(status_code=400, detail="No previous version")
+        from_version = newer - 1
+    
+    diff = db.diff_report_versions(report_id, from_version, to_version)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return diff
+
+
+@app.get("/api/reports/{report_id}/versions/{version}")
+def get_report_at_version(report_id: int, version: int):
+    """Hesabatın müəyyən versiyası."""
+    document = DatabaseHandler().get_report_document(report_id, version)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return document
 
 
 @app.get("/api/reports")
@@ -404,16 +754,21 @@ def list_reports(
     limit: int = Query(10, ge=1, le=100),
     organization_code: str = None,
     report_type: str = None,
-    status: str = None
+    status: str = None,
+    period: Optional[str] = Query(None, description="Period filter: 2025, 2025-07, 2025-Q3, 2025-H1")
 ):
     """Hesabat siyahısı."""
     db = DatabaseHandler()
-    reports = db.get_history(
-        org_code=organization_code,
-        report_type=report_type,
-        limit=limit,
-        status=status
-    )
+    try:
+        reports = db.get_history(
+            org_code=organization_code,
+            report_type=report_type,
+            limit=limit,
+            status=status,
+            period=period
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
         "reports": [
@@ -446,16 +801,259 @@ def compare_reports(
     return result
 
 
+@app.get("/api/reconcile")
+def reconcile_reports(
+    organization_code: str = Query(..., description="Organization code"),
+    year: str = Query(..., pattern=r'^\d{4}$', description="Report year"),
+    previous_year: bool = Query(False, description="Check previous_year column against prior-year report")
+):
+    """Aylıq (12-isth) və illik (1-isth) hesabatların uzlaşdırılması."""
+    engine = ReconciliationEngine(DatabaseHandler())
+    if previous_year:
+        return engine.check_previous_year(organization_code, year).model_dump()
+    return engine.reconcile(organization_code, year).model_dump()
+
+
 @app.get("/api/stats")
 def get_statistics(organization_code: str = None):
     """Ümumi statistika."""
     db = DatabaseHandler()
+    return _cached_statistics(db, organization_code)
+
+
+@app.get("/api/stats/breakdown")
+def get_statistics_breakdown(
+    by: str = Query('activity_code', pattern='^(activity_code|region|property_type|organization_type)$'),
+    report_type: str = None,
+    period: Optional[str] = Query(None, description="Period filter: 2025, 2025-07, 2025-Q3, 2025-H1")
+):
+    """Fəaliyyət növü və ya regiona görə statistika."""
+    try:
+        groups = DatabaseHandler().get_breakdown(by, report_type=report_type, period=period)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"by": by, "groups": groups}
+
+
+@app.get("/api/analytics/cube")
+def get_statistics_cube(
+    dims: str = Query('', description="Comma-separated dimensions: report_type, period, activity_code, region"),
+    report_type: str = None,
+    period: Optional[str] = Query(None, description="Period filter: 2025, 2025-07, 2025-Q3, 2025-H1"),
+    activity_code: str = None,
+    region: str = None
+):
+    """Dövr, fəaliyyət növü və region üzrə ümumiləşdirilmiş statistika."""
+    filters = {'report_type': report_type, 'period': period, 'activity_code': activity_code, 'region': region}
+    try:
+        dimensions = parse_dimensions(dims)
+        cells = _analytics().query_cube(dimensions, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"dims": dimensions, "cells": cells}
+
+
+@app.get("/api/organizations/{organization_code}")
+def get_organization(organization_code: str):
+    """Müəssisə məlumatları."""
+    organization = DatabaseHandler().get_organization(organization_code)
+    if organization is None:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    return organization.model_dump()
+
+
+@app.get("/api/products")
+def search_products(
+    q: str = Query("", description="Product code prefix or name"),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Məhsul kataloqunda axtarış."""
+    return {"products": DatabaseHandler().search_products(q, limit=limit)}
+
+
+@app.get("/api/products/{product_code}/reports")
+def get_product_reports(
+    product_code: str,
+    report_type: Optional[str] = Query(None, pattern='^(1|12)-isth$'),
+    period: Optional[str] = Query(None, description="Period filter: 2025, 2025-07, 2025-Q3, 2025-H1"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Məhsulun hesabatlar üzrə II bölmə göstəriciləri (son dövrlər əvvəl)."""
+    try:
+        reports = DatabaseHandler().get_product_reports(
+            product_code, report_type=report_type, period=period, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if reports is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return {"product_code": product_code, "reports": reports}
+
+
+@app.get("/api/export")
+def export_reports(
+    table: str = Query('reports', pattern='^(reports|section_i|products)$'),
+    format: str = Query('csv', pattern='^(csv|parquet)$'),
+    start: Optional[str] = Query(None, description="First period: 2025, 2025-07, 2025-Q1"),
+    end: Optional[str] = Query(None, description="Last period (inclusive)"),
+    report_type: Optional[str] = Query(None, pattern='^(1|12)-isth$'),
+    status: Optional[str] = None,
+    activity_code: Optional[str] = Query(None, description="Activity code prefix")
+):
+    """Hesabatların, Bölmə I sətirlərinin və ya məhsulların CSV/Parquet ixracı (axınla)."""
+    try:
+        for spec in (start, end):
+            if spec:
+                period_range(spec)
+        chunks = DatabaseHandler().iter_export_chunks(
+            start, end, report_type=report_type, status=status, activity_code=activity_code,
+            with_sections=table != 'reports'
+        )
+        stream = export_stream(chunks, table, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    
+    return StreamingResponse(
+        stream,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'}
+    )
+
+
+@app.get("/api/analytics/movers")
+def get_top_movers(
+    period: str = Query(..., description="Report period: 2025 or 2025-07"),
+    report_type: Optional[str] = Query(None, pattern='^(1|12)-isth$'),
+    metric: str = Query('sales', pattern='^(sales|exports|product_sales)$'),
+    by: str = Query('change', pattern='^(change|change_pct)$'),
+    limit: int = Query(20, ge=1, le=500)
+):
+    """Əvvəlki dövrə nəzərən ən çox dəyişən müəssisələr."""
+    if report_type is None:
+        report_type = '12-isth' if '-' in period else '1-isth'
+    try:
+        return _analytics().rank_changes(period, report_type, metric=metric, by=by, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/orgs/{organization_code}/timeseries")
+def get_organization_timeseries(
+    organization_code: str,
+    report_type: str = Query('12-isth', pattern='^(1|12)-isth$'),
+    rows: str = Query('', description="Section I row codes: 1,8"),
+    products: str = Query('', description="Product codes"),
+    fields: str = Query('produced,sold_value', description="Product fields"),
+    max_points: int = Query(Config.TIMESERIES_MAX_POINTS, ge=1, le=1000),
+    format: str = Query('json', pattern='^(json|arrow)$')
+):
+    """Müəssisənin bütün dövrlər üzrə göstəriciləri (sütunlu formatda)."""
+    product_fields = parse_codes(fields)
+    unknown = [field for field in product_fields if field not in PRODUCT_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown product field: {', '.join(unknown)}")
+    
+    db = DatabaseHandler()
+    if db.get_organization(organization_code) is None:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    series = build_timeseries(
+        db.iter_org_sections(organization_code, report_type),
+        parse_codes(rows), parse_codes(products), product_fields, max_points
+    )
     
-    if organization_code:
-        stats = db.get_org_statistics(organization_code)
-        return stats
-    else:
-        return db.get_statistics()
+    if format == 'arrow':
+        try:
+            return Response(content=timeseries_to_arrow(series), media_type=ARROW_MEDIA_TYPE)
+        except RuntimeError as e:
+            raise HTTPException(status_code=406, detail=str(e))
+    return {"organization_code": organization_code, "report_type": report_type, **series}
+
+
+@app.get("/api/orgs/{organization_code}/compare")
+def compare_organization_periods(
+    organization_code: str,
+    report_type: str = Query('12-isth', pattern='^(1|12)-isth$'),
+    start: Optional[str] = Query(None, description="First period: 2025-01, 2025-Q1, 2021"),
+    end: Optional[str] = Query(None, description="Last period (inclusive)")
+):
+    """Müəssisənin bir neçə dövr üzrə müqayisəsi."""
+    db = DatabaseHandler()
+    if db.get_organization(organization_code) is None:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    try:
+        matrix = db.compare_periods(organization_code, report_type, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"organization_code": organization_code, "report_type": report_type, **matrix}
+
+
+@app.get("/api/obligations/missing")
+def get_missing_reports(
+    period: str = Query(..., description="Report period: 2025 or 2025-07"),
+    report_type: Optional[str] = Query(None, pattern='^(1|12)-isth$'),
+    activity_code: Optional[str] = None,
+    region: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=100000)
+):
+    """Dövr üçün hesabat təqdim etməli olub, hələ etməyən müəssisələr."""
+    if report_type is None:
+        report_type = '12-isth' if '-' in period else '1-isth'
+    try:
+        return DatabaseHandler().get_missing_reports(
+            period, report_type, activity_code=activity_code, region=region, limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/api/issues")
+def list_validation_issues(
+    rule_id: Optional[str] = None,
+    field: Optional[str] = Query(None, description="Field, '*' for the code: section_ii.*.produced"),
+    category: Optional[str] = Query(None, pattern='^(error|warning|info)$'),
+    severity: Optional[str] = None,
+    report_type: Optional[str] = Query(None, pattern='^(1|12)-isth$'),
+    period: Optional[str] = Query(None, description="Period filter: 2025, 2025-07, 2025-Q3, 2025-H1"),
+    limit: int = Query(50, ge=1, le=500),
+    before_id: Optional[int] = Query(None, description="Last id of the previous page")
+):
+    """Validasiya xətaları (səhifələnmiş, ən yenilər əvvəl)."""
+    filters = {
+        'rule_id': rule_id, 'field': field, 'category': category,
+        'severity': severity, 'report_type': report_type, 'period': period,
+    }
+    try:
+        issues = DatabaseHandler().list_issues(filters, limit=limit, before_id=before_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "issues": issues,
+        "next_before_id": issues[-1]["id"] if len(issues) == limit else None
+    }
+
+
+@app.get("/api/issues/summary")
+def get_validation_issue_summary(
+    by: str = Query('rule_id', pattern='^(rule_id|field|period)$'),
+    rule_id: Optional[str] = None,
+    field: Optional[str] = Query(None, description="Field, '*' for the code: section_ii.*.produced"),
+    category: Optional[str] = Query(None, pattern='^(error|warning|info)$'),
+    severity: Optional[str] = None,
+    report_type: Optional[str] = Query(None, pattern='^(1|12)-isth$'),
+    period: Optional[str] = Query(None, description="Period filter: 2025, 2025-07, 2025-Q3, 2025-H1")
+):
+    """Validasiya xətalarının qayda, sahə və ya dövr üzrə sayı."""
+    filters = {
+        'rule_id': rule_id, 'field': field, 'category': category,
+        'severity': severity, 'report_type': report_type, 'period': period,
+    }
+    try:
+        groups = DatabaseHandler().issue_summary(by, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"by": by, "groups": groups}
 
 
 @app.get("/api/search")
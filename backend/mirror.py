@@ -0,0 +1,236 @@
+# DuckDB analytics mirror for azstat-report
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+from periods import period_range, period_label
+from analytics import CUBE_DIMENSIONS, CUBE_MEASURES, top_movers, ranking_periods
+from writer import get_writer
+
+try:
+    import duckdb
+except ImportError:  # Optional dependency
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+
+# Mirrored report facts: reports joined with organizations and report_metrics
+_SOURCE_QUERY = '''
+    SELECT r.id, r.organization_code, o.name, r.report_type, r.report_period, r.period_key,
+           r.validation_status, COALESCE(o.activity_code, ''), COALESCE(o.region, ''),
+           m.sales, m.exports, m.product_sales
+    FROM reports r
+    LEFT JOIN organizations o ON o.id = r.org_id
+    LEFT JOIN report_metrics m ON m.report_id = r.id
+'''
+
+
+class AnalyticsMirror:
+    """Local DuckDB copy of report facts for analytics queries.
+    
+    The mirror is brought up to date from the SQLite change_log (written by
+    save_report, delete_report and organization attribute changes) before
+    queries, at most once per Config.MIRROR_SYNC_INTERVAL. A new mirror
+    file, a logged cube rebuild, or a mirror behind the log's
+    Config.CHANGE_LOG_MAX_ROWS cap is loaded in full. Only short reads
+    touch the SQLite file, so analytic scans do not hold its locks.
+    
+    One mirror per database: synced log entries are pruned. DuckDB lets a
+    single process open the file read-write, so one process owns the mirror;
+    opening it while another process holds it raises RuntimeError.
+    """
+    
+    def __init__(self, db_path: Path, mirror_path: Path, sync_interval: float = Config.MIRROR_SYNC_INTERVAL):
+        if duckdb is None:
+            raise RuntimeError("Analytics mirror requires the duckdb package")
+        self.db_path = Path(db_path)
+        self.mirror_path = Path(mirror_path)
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._synced_at: Optional[float] = None
+        
+        self.mirror_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._conn = duckdb.connect(str(self.mirror_path))
+        except duckdb.IOException as e:
+            raise RuntimeError(f"Analytics mirror {self.mirror_path} is in use by another process: {e}") from e
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS reports (
+                report_id BIGINT PRIMARY KEY,
+                organization_code VARCHAR,
+                organization_name VARCHAR,
+                report_type VARCHAR,
+                report_period VARCHAR,
+                period_key INTEGER,
+                validation_status VARCHAR,
+                activity_code VARCHAR,
+                region VARCHAR,
+                sales DOUBLE,
+                exports DOUBLE,
+                product_sales DOUBLE
+            )
+        ''')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS sync_state (last_seq BIGINT NOT NULL)')
+    
+    def sync(self) -> int:
+        """Apply changes logged since the last sync; returns the number of reports refreshed."""
+        with self._lock:
+            return self._sync()
+    
+    def _sync(self) -> int:
+        state = self._conn.execute('SELECT last_seq FROM sync_state').fetchone()
+        source = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            # One read transaction: the log position and the rows are the same snapshot
+            source.execute('BEGIN')
+            last_seq = source.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log').fetchone()[0]
+            if state is not None and last_seq <= state[0]:
+                return 0
+            log = (state[0] if state else 0, last_seq)
+            # Entries pruned by the change log cap are lost; a cube rebuild may
+            # have changed any report's metrics. Either way reload in full.
+            if state is None or source.execute(
+                "SELECT (SELECT MIN(seq) FROM change_log) > ? + 1 "
+                "OR EXISTS (SELECT 1 FROM change_log WHERE seq > ? AND seq <= ? AND op = 'rebuild')",
+                (state[0], *log)
+            ).fetchone()[0]:
+                cursor = source.execute(_SOURCE_QUERY)
+                changed = None
+            else:
+                changed = [row[0] for row in source.execute(
+                    'SELECT DISTINCT report_id FROM change_log WHERE seq > ? AND seq <= ?', log
+                )]
+                cursor = source.execute(
+                    _SOURCE_QUERY + ' WHERE r.id IN (SELECT report_id FROM change_log WHERE seq > ? AND seq <= ?)',
+                    log
+                )
+            
+            self._conn.execute('BEGIN TRANSACTION')
+            try:
+                if changed is None:
+                    self._conn.execute('DELETE FROM reports')
+                elif changed:
+                    self._conn.execute('CREATE OR REPLACE TEMP TABLE changed_ids (id BIGINT)')
+                    self._conn.executemany('INSERT INTO changed_ids VALUES (?)', [(i,) for i in changed])
+                    self._conn.execute('DELETE FROM reports WHERE report_id IN (SELECT id FROM changed_ids)')
+                count = 0
+                while True:
+                    rows = cursor.fetchmany(Config.EXPORT_CHUNK_SIZE)
+                    if not rows:
+                        break
+                    self._conn.executemany('INSERT INTO reports VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                    count += len(rows)
+                self._conn.execute('DELETE FROM sync_state')
+                self._conn.execute('INSERT INTO sync_state VALUES (?)', [last_seq])
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        finally:
+            source.close()
+        
+        if last_seq:
+            get_writer(self.db_path).submit(
+                lambda conn: conn.execute('DELETE FROM change_log WHERE seq <= ?', (last_seq,))
+            )
+        return count if changed is None else len(changed)
+    
+    def _refresh(self):
+        now = time.monotonic()
+        if self._synced_at is None or now - self._synced_at >= self.sync_interval:
+            self._sync()
+            self._synced_at = now
+    
+    def query_cube(self, dimensions: List[str], filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Same result as DatabaseHandler.query_cube, computed from the mirror."""
+        filters = filters or {}
+        columns = [CUBE_DIMENSIONS[name] for name in dimensions]
+        measures = ['COUNT(*) AS reports'] + [f'COALESCE(SUM({m}), 0) AS {m}' for m in CUBE_MEASURES[1:]]
+        query = 'SELECT ' + ', '.join(columns + measures) + ' FROM reports WHERE period_key IS NOT NULL'
+        params: List[Any] = []
+        for name in ('report_type', 'activity_code', 'region'):
+            if filters.get(name) is not None:
+                query += f' AND {name} = ?'
+                params.append(filters[name])
+        if filters.get('period'):
+            query += ' AND period_key >= ? AND period_key < ?'
+            params.extend(period_range(filters['period']))
+        if columns:
+            query += f' GROUP BY {", ".join(columns)} ORDER BY {", ".join(columns)}'
+        
+        with self._lock:
+            self._refresh()
+            rows = self._conn.execute(query, params).fetchall()
+        cells = []
+        for row in rows:
+            cell = dict(zip(dimensions, row))
+            if 'period' in cell:
+                cell['period'] = period_label(cell['period'])
+            cell.update(zip(CUBE_MEASURES, row[len(columns):]))
+            cells.append(cell)
+        return cells
+    
+    def rank_changes(
+        self,
+        period: str,
+        report_type: str,
+        metric: str = 'sales',
+        by: str = 'change',
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """Same result as DatabaseHandler.rank_changes, computed from the mirror."""
+        current, previous = ranking_periods(period, metric, by)
+        with self._lock:
+            self._refresh()
+            pairs = self._conn.execute(f'''
+                SELECT cur.organization_code, cur.organization_name, cur.{metric}, prev.{metric}
+                FROM reports cur
+                JOIN reports prev ON prev.organization_code = cur.organization_code
+                                 AND prev.report_type = cur.report_type AND prev.period_key = ?
+                WHERE cur.report_type = ? AND cur.period_key = ?
+                  AND cur.{metric} IS NOT NULL AND prev.{metric} IS NOT NULL
+            ''', [previous, report_type, current]).fetchall()
+        return {
+            'period': period_label(current),
+            'previous_period': period_label(previous),
+            'report_type': report_type,
+            'metric': metric,
+            'by': by,
+            'movers': top_movers(pairs, limit, by),
+        }
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# (resolved database path, mirror path) -> mirror, None if it could not be opened
+_mirrors: Dict[Tuple[str, str], Optional[AnalyticsMirror]] = {}
+_mirrors_lock = threading.Lock()
+
+
+def get_mirror(db_path: Path = None, mirror_path: Path = None) -> Optional[AnalyticsMirror]:
+    """Get (or open) the analytics mirror for a database; None to query SQLite directly.
+    
+    None if Config.MIRROR_PATH is not set, or if the mirror cannot be opened
+    (duckdb not installed, file held by another worker process). Opening is
+    tried once per database and mirror path; a failure is logged as a warning.
+    """
+    mirror_path = mirror_path or Config.MIRROR_PATH
+    if mirror_path is None:
+        return None
+    key = (str(Path(db_path or Config.DB_PATH).resolve()), str(Path(mirror_path).resolve()))
+    with _mirrors_lock:
+        if key not in _mirrors:
+            try:
+                _mirrors[key] = AnalyticsMirror(Path(key[0]), Path(key[1]))
+            except RuntimeError as e:
+                logger.warning("%s; analytics queries use SQLite", e)
+                _mirrors[key] = None
+        return _mirrors[key]
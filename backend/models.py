@@ -1,10 +1,14 @@
 # Pydantic models for azstat-report
 
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Optional, List, Dict, Callable
 from datetime import datetime
 
 
+# Large JSON text columns of ReportRecord that may be fetched lazily
+REPORT_BLOB_FIELDS = ('section_i_data', 'section_ii_data', 'validation_results')
+
+
 class OrganizationInfo(BaseModel):
     """Organization info from form header."""
     code: str = ""                      # VÖEN
@@ -53,7 +57,7 @@ class ReportData(BaseModel):
     report_period: str = ""            # '2025' or '2025-12'
     section_i: SectionI
     section_ii: SectionII
-    uploaded_at: datetime = datetime.now()
+    uploaded_at: datetime = Field(default_factory=datetime.now)
 
 
 class ValidationIssue(BaseModel):
@@ -62,6 +66,7 @@ class ValidationIssue(BaseModel):
     field: str = ""
     message: str = ""
     severity: str = "anomaly"          # 'blocking', 'logical', 'consistency', 'anomaly'
+    rule_id: str = ""                  # Check that raised it, e.g. 'negative_product_value'
 
 
 class ValidationResult(BaseModel):
@@ -73,6 +78,16 @@ class ValidationResult(BaseModel):
     issues: List[ValidationIssue] = []
 
 
+class ReconciliationResult(BaseModel):
+    """Monthly (12-isth) vs annual (1-isth) reconciliation result."""
+    organization_code: str = ""
+    year: str = ""
+    annual_report_id: Optional[int] = None
+    monthly_periods: List[str] = []
+    status: str = "passed"             # 'passed', 'warning', 'skipped'
+    issues: List[ValidationIssue] = []
+
+
 class ReportRecord(BaseModel):
     """Full report record for database."""
     id: Optional[int] = None
@@ -85,3 +100,43 @@ class ReportRecord(BaseModel):
     validation_results: str = ""       # JSON string
     validation_status: str = ""
     uploaded_at: datetime = None
+    
+    # Fetches all blob fields at once: () -> {field: json_text}
+    _blob_loader: Optional[Callable[[], Dict[str, Optional[str]]]] = PrivateAttr(default=None)
+    
+    @classmethod
+    def lazy(cls, blob_loader: Callable[[], Dict[str, Optional[str]]], **header) -> "ReportRecord":
+        """Build record whose JSON blob fields are fetched on first access."""
+        record = cls.model_construct(**header)
+        for name in REPORT_BLOB_FIELDS:
+            record.__dict__.pop(name, None)
+        record._blob_loader = blob_loader
+        return record
+    
+    def __getattr__(self, name: str):
+        if name in REPORT_BLOB_FIELDS:
+            self._load_blobs()
+            return self.__dict__[name]
+        return super().__getattr__(name)
+    
+    def _load_blobs(self):
+        """Fetch blob fields that have not been loaded yet."""
+        if all(name in self.__dict__ for name in REPORT_BLOB_FIELDS):
+            return
+        loader = self._blob_loader
+        blobs = loader() if loader else {}
+        # Rebuild in declaration order so serialized field order is unchanged
+        values = {
+            name: self.__dict__[name] if name in self.__dict__ else (blobs.get(name) or "")
+            for name in type(self).model_fields
+        }
+        self.__dict__.clear()
+        self.__dict__.update(values)
+    
+    def model_dump(self, **kwargs):
+        self._load_blobs()
+        return super().model_dump(**kwargs)
+    
+    def model_dump_json(self, **kwargs):
+        self._load_blobs()
+        return super().model_dump_json(**kwargs)
@@ -7,6 +7,7 @@ from models import (
     ProductRow, SectionII, ReportData
 )
 from config import Config
+from products import split_product_label
 
 
 class AzstatParser:
@@ -308,22 +309,22 @@ class AzstatParser:
             product = ProductRow()
             found = False
             
-            # Product code input
+            # Product code input (autocomplete value)
             code_input = self.soup.find('input', {
                 'name': f'{table_prefix}:{row_index}:{col_prefix}'
             })
             
-            # Product name (might be in autocomplete input)
+            # Autocomplete label ('<code> - <name>'), split once into code and name
             name_input = self.soup.find('input', {
                 'name': f'{table_prefix}:{row_index}:{col_prefix}_input'
             })
             
             if code_input or name_input:
                 found = True
-                if code_input:
-                    product.product_code = code_input.get('value', '')
-                if name_input:
-                    product.product_name = name_input.get('value', '')
+                product.product_code, product.product_name = split_product_label(
+                    code_input.get('value', '') if code_input else '',
+                    name_input.get('value', '') if name_input else ''
+                )
             
             # If we found a product row, extract other fields
             if found:
@@ -0,0 +1,77 @@
+# Report period keys for azstat-report
+
+import re
+from typing import Optional, Tuple
+
+
+# Annual (1-isth) reports use month 0: 2025 -> 202500, 2025-07 -> 202507
+ANNUAL_MONTH = 0
+
+_PERIOD_RE = re.compile(r'^(\d{4})(?:-(\d{2}))?$')
+_RANGE_RE = re.compile(r'^(\d{4})(?:-(?:(\d{2})|[Qq]([1-4])|[Hh]([12])))?$')
+
+
+def period_key(period: Optional[str]) -> Optional[int]:
+    """Integer sort key for a report period ('2025' or '2025-12'), None if invalid."""
+    match = _PERIOD_RE.match((period or '').strip())
+    if not match:
+        return None
+    year, month = int(match.group(1)), match.group(2)
+    if month is None:
+        return year * 100 + ANNUAL_MONTH
+    month = int(month)
+    return year * 100 + month if 1 <= month <= 12 else None
+
+
+def period_range(spec: str) -> Tuple[int, int]:
+    """Half-open period key range for '2025', '2025-07', '2025-Q3' or '2025-H1'.
+    
+    A year covers the annual report and all months; quarters, halves and
+    months cover monthly reports only.
+    """
+    match = _RANGE_RE.match((spec or '').strip())
+    if not match:
+        raise ValueError(f"Invalid period: {spec}")
+    year, month, quarter, half = match.groups()
+    base = int(year) * 100
+    if month:
+        if not 1 <= int(month) <= 12:
+            raise ValueError(f"Invalid period: {spec}")
+        return base + int(month), base + int(month) + 1
+    if quarter:
+        first = (int(quarter) - 1) * 3 + 1
+        return base + first, base + first + 3
+    if half:
+        first = (int(half) - 1) * 6 + 1
+        return base + first, base + first + 6
+    return base + ANNUAL_MONTH, base + 100
+
+
+def period_label(key: Optional[int]) -> Optional[str]:
+    """Period key back to a report period string (202500 -> '2025', 202507 -> '2025-07')."""
+    if key is None:
+        return None
+    year, month = divmod(key, 100)
+    return f"{year:04d}" if month == ANNUAL_MONTH else f"{year:04d}-{month:02d}"
+
+
+def previous_period_key(key: int) -> int:
+    """Key of the preceding period of the same kind (2025 -> 2024, 2025-01 -> 2024-12)."""
+    year, month = divmod(key, 100)
+    if month == ANNUAL_MONTH:
+        return (year - 1) * 100 + ANNUAL_MONTH
+    return (year - 1) * 100 + 12 if month == 1 else key - 1
+
+
+def previous_period(period: Optional[str]) -> Optional[str]:
+    """Preceding report period ('2025' -> '2024', '2025-01' -> '2024-12'), None if invalid."""
+    key = period_key(period)
+    return period_label(previous_period_key(key)) if key is not None else None
+
+
+def next_period_key(key: int) -> int:
+    """Key of the following period of the same kind (2025 -> 2026, 2025-12 -> 2026-01)."""
+    year, month = divmod(key, 100)
+    if month == ANNUAL_MONTH:
+        return (year + 1) * 100 + ANNUAL_MONTH
+    return (year + 1) * 100 + 1 if month == 12 else key + 1
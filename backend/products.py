@@ -0,0 +1,42 @@
+# Product catalog helpers for azstat-report
+
+import sys
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+# Autocomplete labels are "<code> - <name>"
+LABEL_SEPARATOR = ' - '
+
+# Stored Section II rows reference the catalog instead of repeating these
+CATALOG_FIELDS = ('product_code', 'product_name')
+
+
+def split_product_label(value: str, label: str) -> Tuple[str, str]:
+    """Product code and name from an autocomplete's value and label inputs.
+    
+    ('016110430', '016110430 - A seksiyası.Torpaqların suvarılması') ->
+    ('016110430', 'A seksiyası.Torpaqların suvarılması'). Either input may
+    hold the full label; the value input wins for the code. Both strings
+    are interned, so repeated products share one copy.
+    """
+    code, separator, name = (value or '').partition(LABEL_SEPARATOR)
+    code, name = code.strip(), name.strip()
+    label = (label or '').strip()
+    head, separator, tail = label.partition(LABEL_SEPARATOR)
+    if separator:
+        code = code or head.strip()
+        name = name or tail.strip()
+    elif label != code:
+        name = name or label
+    return sys.intern(code), sys.intern(name)
+
+
+def compact_products(products: Iterable[Dict[str, Any]], ids: Dict[Tuple[str, str], int]) -> List[Dict[str, Any]]:
+    """Product dicts -> stored rows with product_id in place of code and name."""
+    return [
+        {
+            'product_id': ids[(product.get('product_code', ''), product.get('product_name', ''))],
+            **{field: value for field, value in product.items() if field not in CATALOG_FIELDS}
+        }
+        for product in products
+    ]
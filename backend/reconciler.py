@@ -0,0 +1,228 @@
+# Cross-form reconciliation for azstat-report
+
+from itertools import groupby
+from typing import List, Optional, Dict, Iterator
+
+from models import ReportRecord, ReconciliationResult, ValidationIssue
+from database import DatabaseHandler, decode_section_i, _load_json
+from validator import previous_year_drift, previous_year_issue
+from config import Config
+from periods import previous_period
+
+
+# 1-isth Section I row -> matching 12-isth Section I row
+ANNUAL_TO_MONTHLY_ROWS = {
+    "1": "1",        # Total sales
+    "1.1": "1.1",    # Own production sales
+    "8": "1.2",      # Exports
+}
+
+# Product fields that are flows (monthly values add up to the annual value)
+PRODUCT_FLOW_FIELDS = ('produced', 'internal_use', 'sold_quantity', 'sold_value', 'import_value')
+
+MONTHS = [f"{month:02d}" for month in range(1, 13)]
+
+
+class ReconciliationEngine:
+    """Reconciles monthly 12-isth reports against the annual 1-isth report."""
+    
+    def __init__(self, db: DatabaseHandler):
+        self.db = db
+    
+    def reconcile(self, org_code: str, year: str) -> ReconciliationResult:
+        """Reconcile one organization for a year."""
+        records = self.db.get_year_reports(org_code, year)
+        return self.compare(org_code, year, records)
+    
+    def reconcile_year(self, year: str) -> Iterator[ReconciliationResult]:
+        """Reconcile every organization for a year (streaming, one pass)."""
+        records = self.db.iter_year_reports(year)
+        for org_code, org_records in groupby(records, key=lambda r: r.organization_code):
+            yield self.compare(org_code, year, list(org_records))
+    
+    def check_previous_year(self, org_code: str, year: str) -> ReconciliationResult:
+        """Check 1-isth previous_year column against the stored prior-year report."""
+        current = self.db.get_report_by_key(org_code, '1-isth', year)
+        prior = self.db.get_report_by_key(org_code, '1-isth', previous_period(year)) if current else None
+        if not current or not prior:
+            return ReconciliationResult(
+                organization_code=org_code,
+                year=year,
+                annual_report_id=current.id if current else None,
+                status='skipped',
+                issues=[ValidationIssue(
+                    category='info',
+                    field='section_i',
+                    message='İllik hesabat tapılmadı' if not current else 'Keçən ilin hesabatı tapılmadı',
+                    severity='consistency',
+                    rule_id='reconciliation_missing_report'
+                )]
+            )
+        return self._previous_year_result(org_code, year, current.id, current.section_i_data, prior.section_i_data)
+    
+    def audit_previous_year(self, year: str) -> Iterator[ReconciliationResult]:
+        """Check previous_year column of every 1-isth report for a year (single join pass)."""
+        for pair in self.db.iter_previous_year_pairs(year):
+            yield self._previous_year_result(
+                pair['organization_code'], year, pair['report_id'],
+                pair['section_i_data'], pair['prior_section_i_data']
+            )
+    
+    def _previous_year_result(
+        self,
+        org_code: str,
+        year: str,
+        report_id: int,
+        section_i_data: str,
+        prior_section_i_data: str
+    ) -> ReconciliationResult:
+        """Build previous_year drift result from stored Section I JSON."""
+        rows = decode_section_i(section_i_data)
+        prior_rows = {row.row_code: row for row in decode_section_i(prior_section_i_data)}
+        issues = [previous_year_issue(row, value) for row, value in previous_year_drift(rows, prior_rows)]
+        return ReconciliationResult(
+            organization_code=org_code,
+            year=year,
+            annual_report_id=report_id,
+            status='warning' if issues else 'passed',
+            issues=issues
+        )
+    
+    def compare(self, org_code: str, year: str, records: List[ReportRecord]) -> ReconciliationResult:
+        """Compare monthly report sums with the annual report."""
+        annual = next((r for r in records if r.report_type == '1-isth' and r.report_period == year), None)
+        monthly = [r for r in records if r.report_type == '12-isth']
+        
+        result = ReconciliationResult(
+            organization_code=org_code,
+            year=year,
+            annual_report_id=annual.id if annual else None,
+            monthly_periods=[r.report_period for r in monthly],
+        )
+        
+        if not annual or not monthly:
+            result.status = 'skipped'
+            result.issues.append(ValidationIssue(
+                category='info',
+                field='reconciliation',
+                message='İllik hesabat tapılmadı' if not annual else 'Aylıq hesabatlar tapılmadı',
+                severity='consistency',
+                rule_id='reconciliation_missing_report'
+            ))
+            return result
+        
+        found_months = {r.report_period.split('-', 1)[-1] for r in monthly}
+        missing_months = [m for m in MONTHS if m not in found_months]
+        if missing_months:
+            # Partial sums would always differ from the annual value
+            result.status = 'skipped'
+            result.issues.append(ValidationIssue(
+                category='info',
+                field='reconciliation',
+                message=f'Aylıq hesabatlar natamamdır, çatışmayan aylar: {", ".join(missing_months)}',
+                severity='consistency',
+                rule_id='reconciliation_incomplete_months'
+            ))
+            return result
+        
+        self._compare_section_i(annual, monthly, result)
+        self._compare_products(annual, monthly, result)
+        
+        if any(i.category == 'warning' for i in result.issues):
+            result.status = 'warning'
+        return result
+    
+    def _compare_section_i(self, annual: ReportRecord, monthly: List[ReportRecord], result: ReconciliationResult):
+        """Compare Section I annual rows with summed monthly rows."""
+        annual_rows = {row['row_code']: row for row in _load_json(annual.section_i_data)}
+        
+        monthly_totals: Dict[str, float] = {}
+        for record in monthly:
+            for row in _load_json(record.section_i_data):
+                code = row['row_code']
+                monthly_totals[code] = monthly_totals.get(code, 0.0) + row.get('current_year', 0.0)
+        
+        for annual_code, monthly_code in ANNUAL_TO_MONTHLY_ROWS.items():
+            annual_row = annual_rows.get(annual_code)
+            if annual_row is None or monthly_code not in monthly_totals:
+                continue
+            
+            annual_value = annual_row.get('current_year', 0.0)
+            monthly_value = monthly_totals[monthly_code]
+            if _differs(annual_value, monthly_value):
+                result.issues.append(ValidationIssue(
+                    category='warning',
+                    field=f'section_i.{annual_code}',
+                    message=f'Aylıq hesabatların cəmi ({monthly_value:.2f}, sətir {monthly_code}) illik dəyərlə ({annual_value}) uyğun deyil',
+                    severity='consistency',
+                    rule_id='reconciliation_total_mismatch'
+                ))
+    
+    def _compare_products(self, annual: ReportRecord, monthly: List[ReportRecord], result: ReconciliationResult):
+        """Compare Section II annual products with summed monthly products."""
+        annual_products: Dict[str, dict] = {}
+        for product in _load_json(annual.section_ii_data):
+            if product.get('product_code'):
+                annual_products.setdefault(product['product_code'], product)
+        
+        monthly_totals: Dict[str, Dict[str, float]] = {}
+        december_stock: Dict[str, float] = {}
+        for record in monthly:
+            is_december = record.report_period.endswith('-12')
+            for product in _load_json(record.section_ii_data):
+                code = product.get('product_code')
+                if not code:
+                    continue
+                totals = monthly_totals.setdefault(code, dict.fromkeys(PRODUCT_FLOW_FIELDS, 0.0))
+                for field in PRODUCT_FLOW_FIELDS:
+                    totals[field] += product.get(field, 0.0)
+                if is_december:
+                    december_stock[code] = product.get('year_end_stock', 0.0)
+        
+        for code, annual_product in annual_products.items():
+            totals = monthly_totals.get(code)
+            if totals is None:
+                result.issues.append(ValidationIssue(
+                    category='info',
+                    field=f'section_ii.{code}',
+                    message=f'Məhsul illik hesabatda var, aylıq hesabatlarda yoxdur: {annual_product.get("product_name") or code}',
+                    severity='consistency',
+                    rule_id='reconciliation_product_missing_monthly'
+                ))
+                continue
+            
+            for field in PRODUCT_FLOW_FIELDS:
+                annual_value = annual_product.get(field, 0.0)
+                if _differs(annual_value, totals[field]):
+                    result.issues.append(ValidationIssue(
+                        category='warning',
+                        field=f'section_ii.{code}.{field}',
+                        message=f'Aylıq hesabatların cəmi ({totals[field]:.2f}) illik dəyərlə ({annual_value}) uyğun deyil',
+                        severity='consistency',
+                        rule_id='reconciliation_product_total_mismatch'
+                    ))
+            
+            annual_stock = annual_product.get('year_end_stock', 0.0)
+            if code in december_stock and _differs(annual_stock, december_stock[code]):
+                result.issues.append(ValidationIssue(
+                    category='warning',
+                    field=f'section_ii.{code}.year_end_stock',
+                    message=f'Dekabr ayının anbar qalığı ({december_stock[code]}) illik qalıqla ({annual_stock}) uyğun deyil',
+                    severity='consistency',
+                    rule_id='reconciliation_stock_mismatch'
+                ))
+        
+        for code in [c for c in monthly_totals if c not in annual_products]:
+            result.issues.append(ValidationIssue(
+                category='info',
+                field=f'section_ii.{code}',
+                message='Məhsul aylıq hesabatlarda var, illik hesabatda yoxdur',
+                severity='consistency',
+                rule_id='reconciliation_product_missing_annual'
+            ))
+
+
+def _differs(expected: float, actual: float) -> bool:
+    """Check if two values differ beyond the reconciliation tolerance."""
+    tolerance = max(1.0, abs(expected) * Config.RECONCILIATION_TOLERANCE)
+    return abs(expected - actual) > tolerance
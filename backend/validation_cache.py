@@ -0,0 +1,74 @@
+# Validation result cache for azstat-report
+
+import hashlib
+from typing import Optional, Tuple
+
+from models import ReportData, ValidationResult
+from validator import ValidationEngine, RULESET_VERSION
+from cache import LRUCache, report_digest
+from database import DatabaseHandler, on_write
+from config import Config
+
+
+class ValidationCache:
+    """Memoization layer in front of ValidationEngine.validate.
+
+    Results are keyed by the report content digest, the baseline (previous
+    report) digest, the rule-set version and the validation mode. Lookups go
+    to the in-memory LRU first, then to the key stored with the report row.
+    A new baseline upload produces a new digest, so stale results are never
+    served; memory entries built on a replaced baseline are also evicted.
+    """
+
+    def __init__(self, max_size: int = Config.VALIDATION_CACHE_SIZE):
+        # key -> (baseline (org, type, period) or None, ValidationResult)
+        self._memory = LRUCache(max_size)
+
+    @staticmethod
+    def make_key(content_digest: str, baseline_digest: Optional[str], mode: str) -> str:
+        """Build validation cache key."""
+        raw = f"{RULESET_VERSION}:{mode}:{content_digest}:{baseline_digest or ''}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def validate(
+        self,
+        report: ReportData,
+        previous_report: ReportData = None,
+        mode: str = 'full',
+        db: DatabaseHandler = None
+    ) -> Tuple[ValidationResult, str]:
+        """Validate report (or return cached result). Returns (result, key)."""
+        baseline_digest = report_digest(previous_report) if previous_report else None
+        key = self.make_key(report_digest(report), baseline_digest, mode)
+
+        entry = self._memory.get(key)
+        if entry:
+            return entry[1], key
+
+        result = db.get_cached_validation(key) if db else None
+        if result is None:
+            result = ValidationEngine(report, previous_report).validate(mode=mode)
+
+        baseline = None
+        if previous_report:
+            baseline = (report.organization.code, previous_report.report_type, previous_report.report_period)
+        self._memory.set(key, (baseline, result))
+        return result, key
+
+    def invalidate_baseline(self, org_code: str, report_type: str, report_period: str) -> int:
+        """Drop in-memory results computed against the given baseline period."""
+        baseline = (org_code, report_type, report_period)
+        return self._memory.invalidate(lambda key, entry: entry[0] == baseline)
+
+    def clear(self):
+        """Drop all in-memory results."""
+        self._memory.clear()
+
+
+# Singleton cache instance
+validation_cache = ValidationCache()
+
+
+@on_write
+def _invalidate_replaced_baseline(event: str, org_code: str, report_type: str, report_period: str):
+    validation_cache.invalidate_baseline(org_code, report_type, report_period)
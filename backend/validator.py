@@ -1,11 +1,49 @@
 # Validation Engine for azstat-report
 
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Iterable, Iterator, Tuple
 from models import (
     ReportData, ValidationResult, ValidationIssue,
     SectionIRow, ProductRow
 )
 from config import Config
+from periods import previous_period
+
+
+# Bump whenever checks or messages change (invalidates cached validation results)
+RULESET_VERSION = "4"
+
+# 'full' builds every issue, 'fail_fast' stops at the first blocking error,
+# 'counts_only' tallies categories without building issue objects/messages
+VALIDATION_MODES = ('full', 'fail_fast', 'counts_only')
+
+
+def previous_year_drift(
+    rows: Iterable[SectionIRow],
+    prior_rows: Dict[str, SectionIRow]
+) -> Iterator[Tuple[SectionIRow, float]]:
+    """Yield (row, prior value) where 1-isth previous_year disagrees with the prior-year report."""
+    for row in rows:
+        prior = prior_rows.get(row.row_code)
+        if prior is None:
+            continue
+        tolerance = max(1.0, abs(prior.current_year) * Config.PREVIOUS_YEAR_TOLERANCE)
+        if abs(row.previous_year - prior.current_year) > tolerance:
+            yield row, prior.current_year
+
+
+def previous_year_issue(row: SectionIRow, prior_value: float) -> ValidationIssue:
+    """Build issue for previous_year column drift."""
+    return ValidationIssue(
+        category='warning',
+        field=f'section_i.{row.row_code}.previous_year',
+        message=f'Əvvəlki il sütunu ({row.previous_year}) keçən ilin hesabatı ilə ({prior_value}) uyğun deyil',
+        severity='consistency',
+        rule_id='previous_year_drift'
+    )
+
+
+class _StopValidation(Exception):
+    """Raised internally to abort the remaining checks (fail_fast mode)."""
 
 
 class ValidationEngine:
@@ -15,105 +53,143 @@ class ValidationEngine:
         self.report = report
         self.previous_report = previous_report
         self.issues: List[ValidationIssue] = []
+        self.mode = 'full'
+        self._counts: Dict[str, int] = {'error': 0, 'warning': 0, 'info': 0}
+        self._current_products: Dict[str, ProductRow] = {}
+        self._previous_products: Dict[str, ProductRow] = {}
     
-    def validate(self) -> ValidationResult:
-        """Run all validation checks."""
+    def validate(self, mode: str = 'full') -> ValidationResult:
+        """Run validation checks.
+        
+        mode: 'full' (default), 'fail_fast' or 'counts_only'.
+        """
+        if mode not in VALIDATION_MODES:
+            raise ValueError(f"Unknown validation mode: {mode}")
+        
+        self.mode = mode
         self.issues = []
+        self._counts = {'error': 0, 'warning': 0, 'info': 0}
+        self._current_products = self._index_products(self.report)
+        self._previous_products = self._index_products(self.previous_report)
         
-        self._check_errors()
-        self._check_logical_warnings()
-        self._check_consistency_warnings()
-        self._check_anomalies()
+        try:
+            self._check_errors()
+            self._check_logical_warnings()
+            self._check_consistency_warnings()
+            self._check_anomalies()
+        except _StopValidation:
+            pass
         
         status = self._determine_status()
         return ValidationResult(
             status=status,
-            error_count=len([i for i in self.issues if i.category == 'error']),
-            warning_count=len([i for i in self.issues if i.category == 'warning']),
-            info_count=len([i for i in self.issues if i.category == 'info']),
+            error_count=self._counts['error'],
+            warning_count=self._counts['warning'],
+            info_count=self._counts['info'],
             issues=self.issues
         )
     
+    def _count(self, category: str) -> bool:
+        """Tally an issue; return True if the issue object should be built."""
+        self._counts[category] += 1
+        return self.mode != 'counts_only'
+    
+    def _add(self, issue: ValidationIssue):
+        """Record an issue (stops validation on blocking error in fail_fast mode)."""
+        self.issues.append(issue)
+        if self.mode == 'fail_fast' and issue.category == 'error':
+            raise _StopValidation()
+    
     def _check_errors(self):
         """ERROR: Blocking errors - report cannot be submitted."""
         # 1. Negative values check
         for row in self.report.section_i.rows:
-            if row.current_year < 0:
-                self.issues.append(ValidationIssue(
+            if row.current_year < 0 and self._count('error'):
+                self._add(ValidationIssue(
                     category='error',
                     field=f'section_i.{row.row_code}.current_year',
                     message=f'Mənfi dəyər: {row.current_year}',
-                    severity='blocking'
+                    severity='blocking',
+                    rule_id='negative_value'
                 ))
-            if row.previous_year < 0:
-                self.issues.append(ValidationIssue(
+            if row.previous_year < 0 and self._count('error'):
+                self._add(ValidationIssue(
                     category='error',
                     field=f'section_i.{row.row_code}.previous_year',
                     message=f'Mənfi dəyər (əvvəlki il): {row.previous_year}',
-                    severity='blocking'
+                    severity='blocking',
+                    rule_id='negative_value'
                 ))
         
         # 2. Check organization code
-        if not self.report.organization.code:
-            self.issues.append(ValidationIssue(
+        if not self.report.organization.code and self._count('error'):
+            self._add(ValidationIssue(
                 category='error',
                 field='organization.code',
                 message='Təşkilat kodu boşdur',
-                severity='blocking'
+                severity='blocking',
+                rule_id='missing_organization_code'
             ))
         
         # 3. Check report type
-        if not self.report.report_type or self.report.report_type == 'unknown':
-            self.issues.append(ValidationIssue(
+        if (not self.report.report_type or self.report.report_type == 'unknown') and self._count('error'):
+            self._add(ValidationIssue(
                 category='error',
                 field='report_type',
                 message='Hesabat növü təyin edilə bilmir',
-                severity='blocking'
+                severity='blocking',
+                rule_id='unknown_report_type'
             ))
         
         # 4. Product table validation - negative values
         for product in self.report.section_ii.products:
-            if product.produced < 0:
-                self.issues.append(ValidationIssue(
+            if product.produced < 0 and self._count('error'):
+                self._add(ValidationIssue(
                     category='error',
                     field=f'section_ii.{product.product_code}.produced',
                     message=f'Mənfi istehsal: {product.produced}',
-                    severity='blocking'
+                    severity='blocking',
+                    rule_id='negative_product_value'
                 ))
-            if product.internal_use < 0:
-                self.issues.append(ValidationIssue(
+            if product.internal_use < 0 and self._count('error'):
+                self._add(ValidationIssue(
                     category='error',
                     field=f'section_ii.{product.product_code}.internal_use',
                     message=f'Mənfi daxili istifadə: {product.internal_use}',
-                    severity='blocking'
+                    severity='blocking',
+                    rule_id='negative_product_value'
                 ))
-            if product.sold_quantity < 0:
-                self.issues.append(ValidationIssue(
+            if product.sold_quantity < 0 and self._count('error'):
+                self._add(ValidationIssue(
                     category='error',
                     field=f'section_ii.{product.product_code}.sold_quantity',
                     message=f'Mənfi satış miqdarı: {product.sold_quantity}',
-                    severity='blocking'
+                    severity='blocking',
+                    rule_id='negative_product_value'
                 ))
-            if product.sold_value < 0:
-                self.issues.append(ValidationIssue(
+            if product.sold_value < 0 and self._count('error'):
+                self._add(ValidationIssue(
                     category='error',
                     field=f'section_ii.{product.product_code}.sold_value',
                     message=f'Mənfi satış dəyəri: {product.sold_value}',
-                    severity='blocking'
+                    severity='blocking',
+                    rule_id='negative_product_value'
                 ))
-            if product.year_end_stock < 0:
-                self.issues.append(ValidationIssue(
+            if product.year_end_stock < 0 and self._count('error'):
+                self._add(ValidationIssue(
                     category='error',
                     field=f'section_ii.{product.product_code}.year_end_stock',
                     message=f'Mənfi anbar qalığı: {product.year_end_stock}',
-                    severity='blocking'
+                    severity='blocking',
+                    rule_id='negative_product_value'
                 ))
-            if product.import_value < 0:
-                self.issues.append(ValidationIssue(
+            if product.import_value < 0 and self._count('error'):
+                self._add(ValidationIssue(
                     category='error',
                     field=f'section_ii.{product.product_code}.import_value',
                     message=f'Mənfi idxal dəyəri: {product.import_value}',
-                    severity='blocking'
+                    severity='blocking',
+                    rule_id='negative_product_value'
                 ))
     
     def _check_logical_warnings(self):
@@ -123,37 +199,59 @@ class ValidationEngine:
         row_1_1 = self._get_row_by_code("1.1")
         
         if row_1 and row_1_1:
-            if row_1.current_year < row_1_1.current_year:
-                self.issues.append(ValidationIssue(
+            if row_1.current_year < row_1_1.current_year and self._count('warning'):
+                self._add(ValidationIssue(
                     category='warning',
                     field='section_i.1',
                     message=f'Ümumi satış ({row_1.current_year}) < Öz istehsal satışı ({row_1_1.current_year})',
-                    severity='logical'
+                    severity='logical',
+                    rule_id='sales_below_own_production'
                 ))
         
         # 2. Internal use check: Internal Use should not exceed Production
         for product in self.report.section_ii.products:
-            if product.produced > 0 and product.internal_use > product.produced:
-                self.issues.append(ValidationIssue(
+            if product.produced > 0 and product.internal_use > product.produced and self._count('warning'):
+                self._add(ValidationIssue(
                     category='warning',
                     field=f'section_ii.{product.product_code}.internal_use',
                     message=f'Daxili istifadə ({product.internal_use}) > İstehsal ({product.produced})',
-                    severity='logical'
+                    severity='logical',
+                    rule_id='internal_use_exceeds_production'
                 ))
         
         # 3. Inventory continuity check
-        # Stock at end = Stock at beginning + Production - Sold
-        # We don't have beginning stock in current form, so skip for now
+        # Stock at end = Stock at beginning + Production - Sold - Internal use
+        # Beginning stock is the previous period's year-end stock
+        if self._previous_products and self._is_consecutive_period():
+            for product in self.report.section_ii.products:
+                beginning_stock = self._get_previous_stock(product.product_code)
+                if beginning_stock is None:
+                    continue
+                
+                expected_stock = (
+                    beginning_stock + product.produced
+                    - product.sold_quantity - product.internal_use
+                )
+                tolerance = max(1.0, abs(expected_stock) * Config.STOCK_BALANCE_TOLERANCE)
+                if abs(product.year_end_stock - expected_stock) > tolerance and self._count('warning'):
+                    self._add(ValidationIssue(
+                        category='warning',
+                        field=f'section_ii.{product.product_code}.year_end_stock',
+                        message=f'Anbar qalığı ({product.year_end_stock}) balansa uyğun deyil: ilkin qalıq ({beginning_stock}) + istehsal ({product.produced}) - satış ({product.sold_quantity}) - daxili istifadə ({product.internal_use}) = {expected_stock:.2f}',
+                        severity='logical',
+                        rule_id='stock_balance'
+                    ))
         
         # 4. Sold + Stock should not exceed Production + Beginning Stock
         # Without beginning stock data, we can only check if Sold > Production + 10% buffer
         for product in self.report.section_ii.products:
-            if product.produced > 0 and product.sold_quantity > product.produced * 1.1:
-                self.issues.append(ValidationIssue(
+            if product.produced > 0 and product.sold_quantity > product.produced * 1.1 and self._count('warning'):
+                self._add(ValidationIssue(
                     category='warning',
                     field=f'section_ii.{product.product_code}.sold_quantity',
                     message=f'Satış miqdarı ({product.sold_quantity}) istehsalı ({product.produced}) 10%-dən çox üstələyir',
-                    severity='logical'
+                    severity='logical',
+                    rule_id='sold_exceeds_production'
                 ))
     
     def _check_consistency_warnings(self):
@@ -166,12 +264,13 @@ class ValidationEngine:
         if row_2_1 and row_2_2:
             # Row 2 should be approximately Row 2.2 - Row 2.1
             expected_2 = row_2_2.current_year - row_2_1.current_year
-            if row_2 and abs(row_2.current_year - expected_2) > 1:
-                self.issues.append(ValidationIssue(
+            if row_2 and abs(row_2.current_year - expected_2) > 1 and self._count('warning'):
+                self._add(ValidationIssue(
                     category='warning',
                     field='section_i.2',
                     message=f'Satış üçün hazır məhsul qalığı ({row_2.current_year}) ilkin ({row_2_1.current_year}) və son ({row_2_2.current_year}) fərqi ilə uyğun deyil',
-                    severity='consistency'
+                    severity='consistency',
+                    rule_id='finished_goods_balance'
                 ))
         
         # 2. Section II: Sold + Stock <= Production + Beginning Stock
@@ -180,15 +279,28 @@ class ValidationEngine:
             if product.sold_quantity > 0 and product.year_end_stock > 0:
                 total_used = product.sold_quantity + product.year_end_stock
                 # Allow some buffer for production during period
-                if total_used > product.produced * 1.5 and product.produced > 0:
-                    self.issues.append(ValidationIssue(
+                if total_used > product.produced * 1.5 and product.produced > 0 and self._count('warning'):
+                    self._add(ValidationIssue(
                         category='warning',
                         field=f'section_ii.{product.product_code}',
                         message=f'Satış ({product.sold_quantity}) + Anbar ({product.year_end_stock}) istehsalı ({product.produced}) çox üstələyir',
-                        severity='consistency'
+                        severity='consistency',
+                        rule_id='sold_and_stock_exceed_production'
                     ))
         
-        # 3. Export without import check (soft)
+        # 3. 1-isth previous_year column should match the prior-year report
+        if (
+            self.report.report_type == '1-isth'
+            and self.previous_report
+            and self.previous_report.report_type == '1-isth'
+            and self._is_consecutive_period()
+        ):
+            prior_rows = {row.row_code: row for row in self.previous_report.section_i.rows}
+            for row, prior_value in previous_year_drift(self.report.section_i.rows, prior_rows):
+                if self._count('warning'):
+                    self._add(previous_year_issue(row, prior_value))
+        
+        # 4. Export without import check (soft)
         if self.report.report_type == '1-isth':
             row_6 = self._get_row_by_code("6")  # Import
             row_8 = self._get_row_by_code("8")  # Export
@@ -211,65 +323,62 @@ class ValidationEngine:
                     if change > Config.ANOMALY_THRESHOLD:
                         pct = change * 100
                         direction = "artım" if current_revenue.current_year > previous_revenue.current_year else "azalma"
-                        self.issues.append(ValidationIssue(
-                            category='info',
-                            field='section_i.1',
-                            message=f'Gəlir dəyişikliyi: {pct:.1f}% {direction} (əvvəlki dövr: {previous_revenue.current_year})',
-                            severity='anomaly'
-                        ))
+                        if self._count('info'):
+                            self._add(ValidationIssue(
+                                category='info',
+                                field='section_i.1',
+                                message=f'Gəlir dəyişikliyi: {pct:.1f}% {direction} (əvvəlki dövr: {previous_revenue.current_year})',
+                                severity='anomaly',
+                                rule_id='revenue_change'
+                            ))
         
         # 2. Zero values where there were values before
         if self.previous_report:
             for row in self.report.section_i.rows:
                 prev_row = self._get_row_by_code_from_report(row.row_code, self.previous_report)
-                if prev_row and prev_row.current_year > 1000 and row.current_year == 0:
-                    self.issues.append(ValidationIssue(
+                if prev_row and prev_row.current_year > 1000 and row.current_year == 0 and self._count('info'):
+                    self._add(ValidationIssue(
                         category='info',
                         field=f'section_i.{row.row_code}',
                         message=f'Əvvəlki dövrdə dəyər var idi ({prev_row.current_year}), indi 0-dır',
-                        severity='anomaly'
+                        severity='anomaly',
+                        rule_id='value_dropped_to_zero'
                     ))
         
         # 3. New products added
         if self.previous_report:
-            current_codes = set(p.product_code for p in self.report.section_ii.products if p.product_code)
-            prev_codes = set(p.product_code for p in self.previous_report.section_ii.products if p.product_code)
-            new_codes = current_codes - prev_codes
+            new_codes = [code for code in self._current_products if code not in self._previous_products]
             
-            if new_codes:
-                product_names = []
-                for code in list(new_codes)[:3]:  # Show max 3
-                    for p in self.report.section_ii.products:
-                        if p.product_code == code:
-                            product_names.append(p.product_name or code)
-                            break
+            if new_codes and self._count('info'):
+                product_names = [
+                    self._current_products[code].product_name or code
+                    for code in new_codes[:3]  # Show max 3
+                ]
                 
-                self.issues.append(ValidationIssue(
+                self._add(ValidationIssue(
                     category='info',
                     field='section_ii',
                     message=f'Yeni məhsullar əlavə olunub: {", ".join(product_names)}',
-                    severity='anomaly'
+                    severity='anomaly',
+                    rule_id='products_added'
                 ))
         
         # 4. Products removed
         if self.previous_report:
-            current_codes = set(p.product_code for p in self.report.section_ii.products if p.product_code)
-            prev_codes = set(p.product_code for p in self.previous_report.section_ii.products if p.product_code)
-            removed_codes = prev_codes - current_codes
+            removed_codes = [code for code in self._previous_products if code not in self._current_products]
             
-            if removed_codes:
-                product_names = []
-                for code in list(removed_codes)[:3]:
-                    for p in self.previous_report.section_ii.products:
-                        if p.product_code == code:
-                            product_names.append(p.product_name or code)
-                            break
+            if removed_codes and self._count('info'):
+                product_names = [
+                    self._previous_products[code].product_name or code
+                    for code in removed_codes[:3]
+                ]
                 
-                self.issues.append(ValidationIssue(
+                self._add(ValidationIssue(
                     category='info',
                     field='section_ii',
                     message=f'Məhsullar silinib: {", ".join(product_names)}',
-                    severity='anomaly'
+                    severity='anomaly',
+                    rule_id='products_removed'
                 ))
         
         # 5. Large single product dominance
@@ -277,22 +386,21 @@ class ValidationEngine:
         if total_revenue > 0:
             for product in self.report.section_ii.products:
                 if product.sold_value > total_revenue * 0.8:
-                    self.issues.append(ValidationIssue(
-                        category='info',
-                        field=f'section_ii.{product.product_code}',
-                        message=f'Məhsul ümumi satışın 80%-dən çoxunu təşkil edir ({product.sold_value / total_revenue * 100:.1f}%)',
-                        severity='anomaly'
-                    ))
+                    if self._count('info'):
+                        self._add(ValidationIssue(
+                            category='info',
+                            field=f'section_ii.{product.product_code}',
+                            message=f'Məhsul ümumi satışın 80%-dən çoxunu təşkil edir ({product.sold_value / total_revenue * 100:.1f}%)',
+                            severity='anomaly',
+                            rule_id='product_dominance'
+                        ))
                     break
     
     def _determine_status(self) -> str:
         """Determine overall validation status."""
-        has_errors = any(i.category == 'error' for i in self.issues)
-        has_warnings = any(i.category == 'warning' for i in self.issues)
-        
-        if has_errors:
+        if self._counts['error']:
             return 'failed'
-        elif has_warnings:
+        elif self._counts['warning']:
             return 'warning'
         else:
             return 'passed'
@@ -311,13 +419,26 @@ class ValidationEngine:
                 return row
         return None
     
-    def _get_previous_stock(self, product_code: str) -> float:
-        """Get previous year end stock for product."""
-        if self.previous_report:
-            for product in self.previous_report.section_ii.products:
-                if product.product_code == product_code:
-                    return product.year_end_stock
-        return 0.0
+    def _get_previous_stock(self, product_code: str) -> Optional[float]:
+        """Get previous year end stock for product (None if product is new)."""
+        product = self._previous_products.get(product_code) if product_code else None
+        return product.year_end_stock if product else None
+    
+    @staticmethod
+    def _index_products(report: Optional[ReportData]) -> Dict[str, ProductRow]:
+        """Build product code -> product index (first occurrence wins)."""
+        index: Dict[str, ProductRow] = {}
+        if report:
+            for product in report.section_ii.products:
+                if product.product_code and product.product_code not in index:
+                    index[product.product_code] = product
+        return index
+    
+    def _is_consecutive_period(self) -> bool:
+        """Check that previous report covers the period right before the current one."""
+        if not self.previous_report:
+            return False
+        return self.previous_report.report_period == previous_period(self.report.report_period)
     
     def _get_total_revenue(self, report: ReportData = None) -> float:
         """Get total revenue from Section I."""
@@ -0,0 +1,107 @@
+# Report version deltas for azstat-report
+
+from typing import List, Dict, Any
+
+
+# Versioned list fields -> key field of their rows
+VERSIONED_LISTS = {
+    'section_i': 'row_code',
+    'section_ii': 'product_code',
+}
+
+# Versioned scalar fields (stored whole when changed)
+VERSIONED_FIELDS = ('organization_name', 'validation_results')
+
+
+def row_keys(rows: List[Dict[str, Any]], key_field: str) -> List[str]:
+    """Stable row keys: code plus occurrence number (codes may repeat or be empty)."""
+    seen: Dict[str, int] = {}
+    keys = []
+    for row in rows:
+        code = str(row.get(key_field) or '')
+        seen[code] = seen.get(code, 0) + 1
+        keys.append(f"{code}#{seen[code]}")
+    return keys
+
+
+def make_delta(newer: Dict[str, Any], older: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a delta that turns the newer document back into the older one.
+    
+    Documents have the VERSIONED_LISTS and VERSIONED_FIELDS keys. Only rows
+    that differ are stored (whole rows), plus the older row order when it
+    is not the newer order.
+    """
+    delta: Dict[str, Any] = {}
+    for name in VERSIONED_FIELDS:
+        if newer.get(name) != older.get(name):
+            delta[name] = older.get(name)
+    
+    for name, key_field in VERSIONED_LISTS.items():
+        newer_rows = dict(zip(row_keys(newer.get(name, []), key_field), newer.get(name, [])))
+        older_rows = older.get(name, [])
+        older_keys = row_keys(older_rows, key_field)
+        
+        changed = {
+            key: row for key, row in zip(older_keys, older_rows)
+            if newer_rows.get(key) != row
+        }
+        list_delta: Dict[str, Any] = {}
+        if changed:
+            list_delta['rows'] = changed
+        if older_keys != list(newer_rows):
+            list_delta['order'] = older_keys
+        if list_delta:
+            delta[name] = list_delta
+    return delta
+
+
+def apply_delta(newer: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the older document from the newer one and its delta."""
+    older = dict(newer)
+    for name in VERSIONED_FIELDS:
+        if name in delta:
+            older[name] = delta[name]
+    
+    for name, key_field in VERSIONED_LISTS.items():
+        list_delta = delta.get(name)
+        if not list_delta:
+            continue
+        newer_rows = dict(zip(row_keys(newer.get(name, []), key_field), newer.get(name, [])))
+        changed = list_delta.get('rows', {})
+        order = list_delta.get('order', list(newer_rows))
+        older[name] = [changed[key] if key in changed else newer_rows[key] for key in order]
+    return older
+
+
+def diff_documents(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+    """Field-level differences between two documents (older -> newer)."""
+    diff: Dict[str, Any] = {}
+    for name in VERSIONED_FIELDS:
+        if older.get(name) != newer.get(name):
+            diff[name] = {'from': older.get(name), 'to': newer.get(name)}
+    
+    for name, key_field in VERSIONED_LISTS.items():
+        older_rows = dict(zip(row_keys(older.get(name, []), key_field), older.get(name, [])))
+        newer_rows = dict(zip(row_keys(newer.get(name, []), key_field), newer.get(name, [])))
+        
+        changed = []
+        for key in [key for key in older_rows if key in newer_rows]:
+            fields = _changed_fields(older_rows[key], newer_rows[key])
+            if fields:
+                changed.append({'key': key, key_field: older_rows[key].get(key_field), 'fields': fields})
+        
+        diff[name] = {
+            'added': [newer_rows[key] for key in newer_rows if key not in older_rows],
+            'removed': [older_rows[key] for key in older_rows if key not in newer_rows],
+            'changed': changed,
+        }
+    return diff
+
+
+def _changed_fields(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    return {
+        field: {'from': older.get(field), 'to': newer.get(field)}
+        for field in sorted(older.keys() | newer.keys())
+        if older.get(field) != newer.get(field)
+    }
+
@@ -0,0 +1,164 @@
+# Single-writer queue for azstat-report
+
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from config import Config
+
+
+# A write job runs inside the writer's open transaction and returns the caller's result
+WriteJob = Callable[[sqlite3.Connection], Any]
+
+_STOP = object()
+
+
+class WriteQueue:
+    """Dedicated writer thread that applies queued write jobs in group commits.
+    
+    Jobs waiting in the queue are collected for up to max_delay seconds (or
+    max_batch jobs) and run in one transaction, each under its own savepoint,
+    so a failing job is rolled back alone. Every caller gets a Future that
+    resolves after the whole batch is committed.
+    """
+    
+    def __init__(
+        self,
+        db_path: Path,
+        max_batch: int = Config.WRITE_BATCH_SIZE,
+        max_delay: float = Config.WRITE_BATCH_DELAY
+    ):
+        self.db_path = Path(db_path)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.Queue" = queue.Queue()
+        self._stats = {'jobs': 0, 'batches': 0, 'largest_batch': 0}
+        self._thread = threading.Thread(target=self._run, name=f"sqlite-writer:{self.db_path.name}", daemon=True)
+        self._thread.start()
+    
+    def submit(self, job: WriteJob) -> Future:
+        """Queue a write job."""
+        future: Future = Future()
+        self._queue.put((job, future))
+        return future
+    
+    def run(self, job: WriteJob) -> Any:
+        """Queue a write job and wait for its committed result.
+        
+        After Config.WRITE_TIMEOUT a job the writer has not started is
+        cancelled (it will not run) and TimeoutError is raised, so a timeout
+        always means nothing was written. A job already running is waited
+        for and its real outcome returned.
+        """
+        future = self.submit(job)
+        try:
+            return future.result(timeout=Config.WRITE_TIMEOUT)
+        except TimeoutError:
+            if future.cancel():
+                raise
+            return future.result()
+    
+    def stats(self) -> Dict[str, int]:
+        """Jobs and batches committed by this writer."""
+        return dict(self._stats)
+    
+    def close(self):
+        """Commit pending jobs and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+    
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        try:
+            while True:
+                batch, stop = self._collect()
+                if batch:
+                    self._commit(conn, batch)
+                if stop:
+                    return
+        finally:
+            conn.close()
+    
+    def _collect(self) -> Tuple[List[Tuple[WriteJob, Future]], bool]:
+        """Wait for a job, then gather more until the batch is full or the delay has passed."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+    
+    def _commit(self, conn: sqlite3.Connection, batch: List[Tuple[WriteJob, Future]]):
+        """Run a batch in one transaction and resolve its futures."""
+        outcomes = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for job, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute('SAVEPOINT job')
+                try:
+                    result = job(conn)
+                except Exception as exc:
+                    conn.execute('ROLLBACK TO job')
+                    conn.execute('RELEASE job')
+                    outcomes.append((future, None, exc))
+                else:
+                    conn.execute('RELEASE job')
+                    outcomes.append((future, result, None))
+            conn.execute('COMMIT')
+        except Exception as exc:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for job, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        
+        self._stats['jobs'] += len(outcomes)
+        self._stats['batches'] += 1
+        self._stats['largest_batch'] = max(self._stats['largest_batch'], len(outcomes))
+        for future, result, exc in outcomes:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+
+# Resolved database path -> writer
+_writers: Dict[str, WriteQueue] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path: Path) -> WriteQueue:
+    """Get (or start) the writer for a database file."""
+    key = str(Path(db_path).resolve())
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = _writers[key] = WriteQueue(Path(key))
+        return writer
+
+
+@atexit.register
+def close_writers():
+    """Commit pending jobs and stop all writers."""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
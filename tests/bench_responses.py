@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Response compression benchmark for azstat-report backend.
+Reports bytes on the wire and CPU time per report detail response.
+
+Usage: PYTHONPATH=backend python tests/bench_responses.py [--products 500] [--runs 200]
+"""
+
+import sys
+import time
+import gzip
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from fastapi.testclient import TestClient
+
+import main
+import compression
+from models import SectionIRow, ProductRow, ReportData, ValidationResult
+from database import DatabaseHandler
+from conftest import build_report
+
+
+NAMES = ["Xam ipək, emal olunmamış", "Мазут топочный", "Ipək sapı (əyirilmiş)", "Pambıq lifi, daranmış"]
+
+
+def make_report(products: int) -> ReportData:
+    """Build a report with many products and long mixed-script names."""
+    return build_report(
+        name="Şəki İpək ASC",
+        rows=[
+            SectionIRow(row_code=str(code), row_name="Malların satışı", current_year=code * 1000.5)
+            for code in range(1, 40)
+        ],
+        products=[
+            ProductRow(
+                product_code=f"{131010000 + code}", product_name=NAMES[code % len(NAMES)], unit="ton",
+                produced=code * 1.5, sold_quantity=code * 1.25, sold_value=code * 99.9
+            )
+            for code in range(products)
+        ]
+    )
+
+
+def cpu_per_call(func, runs: int) -> float:
+    """Average CPU milliseconds per call."""
+    start = time.process_time()
+    for _ in range(runs):
+        func()
+    return (time.process_time() - start) * 1000 / runs
+
+
+def main_bench(products: int, runs: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(str(Path(tmp) / "reports.db"))
+        report_id = db.save_report(make_report(products), ValidationResult())
+        payload = main._report_detail_payload(db.get_report_row(report_id))
+        
+        print(f"Payload: {products} products, {len(payload)} bytes identity")
+        print(f"{'encoding':<12}{'bytes':>10}{'ratio':>8}{'cpu ms':>10}")
+        variants = [(f"gzip-{level}", lambda level=level: gzip.compress(payload, compresslevel=level, mtime=0)) for level in (1, 6, 9)]
+        if compression.brotli is not None:
+            variants += [(f"br-{q}", lambda q=q: compression.brotli.compress(payload, quality=q)) for q in (1, 5, 11)]
+        for name, func in variants:
+            size = len(func())
+            print(f"{name:<12}{size:>10}{size / len(payload):>8.2f}{cpu_per_call(func, runs):>10.3f}")
+        
+        # End-to-end: cold (build + compress) vs cached responses
+        main.DatabaseHandler = lambda: DatabaseHandler(str(Path(tmp) / "reports.db"))
+        client = TestClient(main.app)
+        for encoding in ("identity", "gzip"):
+            def request():
+                return client.get(f"/api/reports/{report_id}", headers={"Accept-Encoding": encoding})
+            
+            main._detail_cache.clear()
+            main._compressed_cache.clear()
+            cold = cpu_per_call(request, 1)
+            wire = request().num_bytes_downloaded
+            print(f"endpoint {encoding:<9} {wire:>8} bytes  cold {cold:.3f} ms  cached {cpu_per_call(request, runs):.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    main_bench(args.products, args.runs)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Write throughput benchmark for azstat-report backend.
+Concurrent save_report calls through the single writer thread, with readers
+running in parallel under WAL. Reports reports/second, reads/second and errors.
+
+Usage: PYTHONPATH=backend python tests/bench_writes.py [--writers 16] [--readers 4] [--seconds 5]
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from models import SectionIRow, ProductRow, ReportData, ValidationResult
+from database import DatabaseHandler
+from writer import get_writer
+from conftest import build_report
+
+
+def make_report(org_code: str, period: str, revenue: float) -> ReportData:
+    return build_report(
+        period, revenue, org_code, "12-isth", name="Benchmark Org",
+        rows=[
+            SectionIRow(row_code=str(code), row_name="Satış", current_year=revenue + code)
+            for code in range(1, 20)
+        ],
+        products=[
+            ProductRow(product_code=f"{code:09d}", product_name="Məhsul", sold_value=revenue * code)
+            for code in range(50)
+        ]
+    )
+
+
+def run(writers: int, readers: int, seconds: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseHandler(str(Path(tmp) / "reports.db"))
+        db.save_report(make_report("0000000", "2025-01", 1.0), ValidationResult())
+        stop = threading.Event()
+        counts = {'writes': 0, 'reads': 0, 'errors': 0}
+        lock = threading.Lock()
+        
+        def count(name: str):
+            with lock:
+                counts[name] += 1
+        
+        def writer_loop(index: int):
+            n = 0
+            while not stop.is_set():
+                # New periods and re-uploads (updates with version deltas)
+                period = f"{2000 + n // 12:04d}-{n % 12 + 1:02d}" if n % 4 else "2025-01"
+                try:
+                    db.save_report(make_report(f"{index:07d}", period, float(n)), ValidationResult())
+                    count('writes')
+                except Exception:
+                    count('errors')
+                n += 1
+        
+        def reader_loop():
+            while not stop.is_set():
+                try:
+                    db.get_history(limit=20)
+                    db.get_statistics()
+                    count('reads')
+                except Exception:
+                    count('errors')
+        
+        threads = [threading.Thread(target=writer_loop, args=(i + 1,)) for i in range(writers)]
+        threads += [threading.Thread(target=reader_loop) for _ in range(readers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        
+        stats = get_writer(db.db_path).stats()
+        print(f"writers={writers} readers={readers} seconds={elapsed:.1f}")
+        print(f"reports/s: {counts['writes'] / elapsed:.0f}")
+        print(f"reads/s:   {counts['reads'] / elapsed:.0f}")
+        print(f"errors:    {counts['errors']}")
+        print(f"batches:   {stats['batches']} (avg {stats['jobs'] / max(stats['batches'], 1):.1f} writes, largest {stats['largest_batch']})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    run(args.writers, args.readers, args.seconds)
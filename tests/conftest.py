@@ -0,0 +1,41 @@
+# Shared pytest setup for azstat-report tests
+
+import sys
+import pytest
+from pathlib import Path
+
+# Backend modules use flat imports (as when run from backend/)
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from models import OrganizationInfo, SectionIRow, SectionI, ProductRow, SectionII, ReportData
+
+
+def build_report(
+    period="2024",
+    revenue=1000.0,
+    org_code="1293310",
+    report_type="1-isth",
+    name="Test Organization",
+    region=None,
+    activity_code="",
+    rows=None,
+    products=None
+) -> ReportData:
+    """Create a small test report (rows and products replace the default Section I/II rows)."""
+    return ReportData(
+        organization=OrganizationInfo(code=org_code, name=name, region=region, activity_code=activity_code),
+        report_type=report_type,
+        report_period=period,
+        section_i=SectionI(rows=[
+            SectionIRow(row_code="1", row_name="Malların satışı", current_year=revenue, previous_year=1.0),
+        ] if rows is None else rows),
+        section_ii=SectionII(products=[
+            ProductRow(product_code="111", product_name="Product", unit="ton", produced=10.0, sold_value=revenue),
+        ] if products is None else products)
+    )
+
+
+@pytest.fixture
+def make_report():
+    """Report factory shared by the test modules (see build_report)."""
+    return build_report
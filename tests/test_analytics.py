@@ -0,0 +1,101 @@
+# Unit tests for analytics helpers
+
+import json
+import pytest
+
+import analytics
+from analytics import (
+    report_metrics, parse_dimensions, parse_codes, build_timeseries, timeseries_to_arrow, comparison_matrix,
+    top_movers
+)
+
+
+def stored(period, sales, products=()):
+    """A stored report as (period, section_i_json, section_ii_json)."""
+    return (
+        period,
+        json.dumps([{"row_code": "1", "current_year": sales}]),
+        json.dumps([{"product_code": code, "sold_value": value, "produced": 1.0} for code, value in products]),
+    )
+
+
+class TestReportMetrics:
+    """Tests for cube measures."""
+    
+    def test_sales_exports_and_products(self):
+        rows = [{"row_code": "1", "current_year": 10.0}, {"row_code": "1.2", "current_year": 4.0}]
+        products = [{"sold_value": 3.0}, {"sold_value": None}]
+        
+        assert report_metrics("12-isth", rows, products) == {"sales": 10.0, "exports": 4.0, "product_sales": 3.0}
+        assert report_metrics("1-isth", rows, [])["exports"] == 0.0
+    
+    def test_parse_dimensions(self):
+        assert parse_dimensions(" period, region,period") == ["period", "region"]
+        assert parse_dimensions(None) == []
+        with pytest.raises(ValueError):
+            parse_dimensions("period,name")
+
+
+class TestBuildTimeseries:
+    """Tests for columnar time series."""
+    
+    def test_aligned_columns(self):
+        reports = [stored("2025-01", 1.0, [("111", 5.0)]), stored("2025-02", 2.0), stored("2025-03", 3.0, [("111", 1.0), ("111", 2.0)])]
+        
+        series = build_timeseries(reports, parse_codes("1,8"), ["111"], ["sold_value"])
+        
+        assert series["periods"] == ["2025-01", "2025-02", "2025-03"]
+        assert series["step"] == 1
+        assert series["rows"] == {"1": [1.0, 2.0, 3.0], "8": [None, None, None]}
+        assert series["products"] == {"111": {"sold_value": [5.0, None, 3.0]}}
+    
+    def test_downsampled_to_bucket_means(self):
+        reports = [stored(f"2025-{month:02d}", float(month)) for month in range(1, 8)]
+        
+        series = build_timeseries(reports, ["1"], [], [], max_points=3)
+        
+        assert series["step"] == 3
+        assert series["periods"] == ["2025-01", "2025-04", "2025-07"]
+        assert series["rows"]["1"] == [2.0, 5.0, 7.0]
+    
+    def test_arrow_requires_pyarrow(self, monkeypatch):
+        monkeypatch.setattr(analytics, "pyarrow", None)
+        
+        with pytest.raises(RuntimeError):
+            timeseries_to_arrow(build_timeseries([], ["1"], [], []))
+
+
+class TestComparisonMatrix:
+    """Tests for multi-period comparison."""
+    
+    def test_matrix_and_product_changes(self):
+        reports = [
+            stored("2025-01", 10.0, [("111", 100.0)]),
+            stored("2025-02", 12.0, [("111", 150.0), ("222", 5.0)]),
+            stored("2025-03", 9.0, [("222", 0.0)]),
+        ]
+        
+        matrix = comparison_matrix(reports)
+        products = {p["product_code"]: p["fields"] for p in matrix["products"]}
+        
+        assert matrix["periods"] == ["2025-01", "2025-02", "2025-03"]
+        assert matrix["rows"] == [{"row_code": "1", "row_name": "", "values": [10.0, 12.0, 9.0]}]
+        assert products["111"]["sold_value"] == {
+            "values": [100.0, 150.0, None], "change": [None, 50.0, None], "change_pct": [None, 50.0, None]
+        }
+        assert products["222"]["sold_value"]["change_pct"] == [None, None, -100.0]
+        assert products["111"]["produced"]["change"] == [None, 0.0, None]
+    
+    def test_empty(self):
+        assert comparison_matrix([]) == {"periods": [], "rows": [], "products": []}
+
+
+class TestTopMovers:
+    """Tests for the bounded top movers heap."""
+    
+    def test_ranked_by_magnitude(self):
+        pairs = [("a", "A", 110.0, 100.0), ("b", "B", 40.0, 100.0), ("c", None, 5.0, 0.0)]
+        
+        assert [m["organization_code"] for m in top_movers(pairs, 2)] == ["b", "a"]
+        assert [m["organization_code"] for m in top_movers(pairs, 5, by="change_pct")] == ["b", "a"]
+        assert top_movers([], 5) == []
@@ -0,0 +1,208 @@
+# Unit tests for caching helpers
+
+import asyncio
+import pytest
+
+import validation_cache
+from cache import LRUCache, VersionedTTLCache, SingleFlight, report_digest
+from database import DatabaseHandler
+from validation_cache import ValidationCache
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseHandler(str(tmp_path / "reports.db"))
+
+
+class TestLRUCache:
+    """Tests for LRUCache."""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert len(cache) == 2
+
+    def test_invalidate(self):
+        cache = LRUCache()
+        cache.set(("x", 1), 1)
+        cache.set(("x", 2), 2)
+        cache.set(("y", 1), 3)
+
+        assert cache.invalidate(lambda key, value: key[0] == "x") == 2
+        assert len(cache) == 1
+
+
+class TestVersionedTTLCache:
+    """Tests for VersionedTTLCache."""
+    
+    def setup_method(self):
+        self.now = 0.0
+        self.version = 1
+        self.computed = 0
+        self.version_reads = 0
+        self.cache = VersionedTTLCache(ttl=5.0, clock=lambda: self.now)
+    
+    def get(self):
+        def compute():
+            self.computed += 1
+            return self.computed
+        
+        def version():
+            self.version_reads += 1
+            return self.version
+        
+        return self.cache.get_or_compute("stats", compute, version)
+    
+    def test_served_from_memory_within_ttl(self):
+        assert self.get() == 1
+        self.now = 4.9
+        assert self.get() == 1
+        assert self.version_reads == 1
+    
+    def test_expired_entry_revalidated_by_version(self):
+        self.get()
+        self.now = 6.0
+        assert self.get() == 1
+        assert self.version_reads == 2
+        
+        self.now = 8.0
+        assert self.get() == 1
+        assert self.version_reads == 2
+    
+    def test_expired_entry_recomputed_on_version_change(self):
+        self.get()
+        self.version = 2
+        self.now = 6.0
+        assert self.get() == 2
+    
+    def test_clear(self):
+        self.get()
+        self.cache.clear()
+        assert self.get() == 2
+    
+    def test_compute_racing_clear_not_stored(self):
+        def compute():
+            self.cache.clear()
+            return "stale"
+        
+        assert self.cache.get_or_compute("stats", compute, lambda: 1) == "stale"
+        assert len(self.cache) == 0
+
+
+class TestSingleFlight:
+    """Tests for SingleFlight."""
+    
+    def test_concurrent_calls_coalesced(self):
+        flights = SingleFlight()
+        calls = []
+        
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"report_id": 1}
+        
+        async def run():
+            results = await asyncio.gather(*(flights.do("key", work) for _ in range(5)))
+            other = await flights.do("other", work)
+            return results, other
+        
+        results, other = asyncio.run(run())
+        
+        assert len(calls) == 2
+        assert all(result is results[0] for result in results)
+        assert other == {"report_id": 1}
+        assert len(flights) == 0
+    
+    def test_exception_shared_and_not_cached(self):
+        flights = SingleFlight()
+        calls = []
+        
+        async def failing():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("parse error")
+        
+        async def run():
+            first = await asyncio.gather(flights.do("key", failing), flights.do("key", failing), return_exceptions=True)
+            second = await asyncio.gather(flights.do("key", failing), return_exceptions=True)
+            return first + second
+        
+        results = asyncio.run(run())
+        
+        assert all(isinstance(result, ValueError) for result in results)
+        assert len(calls) == 2
+
+
+class TestReportDigest:
+    """Tests for report_digest."""
+
+    def test_ignores_upload_time(self, make_report):
+        first = make_report()
+        second = make_report()
+        second.uploaded_at = second.uploaded_at.replace(year=2000)
+
+        assert report_digest(first) == report_digest(second)
+
+    def test_changes_with_content(self, make_report):
+        assert report_digest(make_report(revenue=1.0)) != report_digest(make_report(revenue=2.0))
+
+
+class TestValidationCache:
+    """Tests for ValidationCache."""
+
+    def test_memory_hit(self, monkeypatch, make_report):
+        cache = ValidationCache()
+        report = make_report()
+        first, key = cache.validate(report)
+
+        monkeypatch.setattr(validation_cache, "ValidationEngine", None)  # Would fail if called
+        second, second_key = cache.validate(report)
+
+        assert second is first
+        assert second_key == key
+
+    def test_key_depends_on_baseline_and_mode(self, make_report):
+        cache = ValidationCache()
+        report = make_report()
+        _, plain_key = cache.validate(report)
+        _, compared_key = cache.validate(report, make_report(period="2023", revenue=10.0))
+        _, other_baseline_key = cache.validate(report, make_report(period="2023", revenue=20.0))
+        _, counts_key = cache.validate(report, mode='counts_only')
+
+        assert len({plain_key, compared_key, other_baseline_key, counts_key}) == 4
+
+    def test_persisted_hit(self, db, monkeypatch, make_report):
+        report = make_report()
+        result, key = ValidationCache().validate(report, db=db)
+        db.save_report(report, result, validation_key=key)
+
+        monkeypatch.setattr(validation_cache, "ValidationEngine", None)  # Would fail if called
+        cached, cached_key = ValidationCache().validate(report, db=db)
+
+        assert cached_key == key
+        assert cached.model_dump() == result.model_dump()
+
+    def test_invalidate_baseline(self, make_report):
+        cache = ValidationCache()
+        cache.validate(make_report(), make_report(period="2023", revenue=10.0))
+
+        assert cache.invalidate_baseline("1293310", "1-isth", "2023") == 1
+        assert cache.invalidate_baseline("1293310", "1-isth", "2023") == 0
+
+    def test_baseline_upload_evicts_memory_entries(self, db, make_report):
+        cache = validation_cache.validation_cache
+        cache.clear()
+        report = make_report()
+        baseline = make_report(period="2023", revenue=10.0)
+        cache.validate(report, baseline)
+
+        result, key = cache.validate(baseline)
+        db.save_report(baseline, result, validation_key=key)
+
+        assert cache.invalidate_baseline("1293310", "1-isth", "2023") == 0
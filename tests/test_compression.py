@@ -0,0 +1,54 @@
+# Unit tests for response compression helpers
+
+import gzip
+import pytest
+
+import compression
+from compression import negotiate_encoding, compress
+
+
+class TestNegotiateEncoding:
+    """Tests for Accept-Encoding negotiation."""
+    
+    @pytest.fixture(autouse=True)
+    def without_brotli(self, monkeypatch):
+        monkeypatch.setattr(compression, "brotli", None)
+    
+    def test_identity(self):
+        assert negotiate_encoding(None) is None
+        assert negotiate_encoding("") is None
+        assert negotiate_encoding("identity") is None
+        assert negotiate_encoding("deflate") is None
+    
+    def test_gzip(self):
+        assert negotiate_encoding("gzip, deflate") == "gzip"
+        assert negotiate_encoding("GZIP;q=0.5") == "gzip"
+        assert negotiate_encoding("*") == "gzip"
+    
+    def test_rejected(self):
+        assert negotiate_encoding("gzip;q=0") is None
+        assert negotiate_encoding("*, gzip;q=0") is None
+    
+    def test_brotli_preferred_when_available(self, monkeypatch):
+        monkeypatch.setattr(compression, "brotli", object())
+        
+        assert negotiate_encoding("gzip, br") == "br"
+        assert negotiate_encoding("gzip, br;q=0.5") == "gzip"
+        assert negotiate_encoding("gzip") == "gzip"
+
+
+class TestCompress:
+    """Tests for compress."""
+    
+    def test_gzip_round_trip_is_deterministic(self):
+        body = "Şəki İpək ASC, Мазут".encode('utf-8') * 100
+        
+        first = compress(body, "gzip")
+        
+        assert gzip.decompress(first) == body
+        assert compress(body, "gzip") == first
+        assert len(first) < len(body)
+    
+    def test_unknown_encoding(self):
+        with pytest.raises(ValueError):
+            compress(b"{}", "deflate")
@@ -0,0 +1,781 @@
+# Unit tests for database handler
+
+import json
+import sqlite3
+import pytest
+
+from models import ProductRow, ValidationResult, ValidationIssue
+import database
+from database import DatabaseHandler
+from cache import VersionedTTLCache
+from periods import period_key
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseHandler(str(tmp_path / "reports.db"))
+
+
+class TestSchema:
+    """Tests for schema setup."""
+    
+    def test_old_sqlite_rejected(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(database.sqlite3, "sqlite_version_info", (3, 34, 1))
+        
+        with pytest.raises(RuntimeError, match="SQLite 3.38.0 or newer"):
+            DatabaseHandler(str(tmp_path / "old.db"))
+
+
+class TestSaveReport:
+    """Tests for DatabaseHandler.save_report upsert behaviour."""
+    
+    def test_id_stable_across_reuploads(self, db, make_report):
+        first = db.save_report(make_report("2023", revenue=1.0), ValidationResult())
+        other = db.save_report(make_report("2024"), ValidationResult())
+        second = db.save_report(make_report("2023", revenue=2.0), ValidationResult(status="warning"))
+        
+        assert second == first
+        assert other != first
+        record = db.get_report(first)
+        assert json.loads(record.section_i_data)[0]["current_year"] == 2.0
+        assert record.validation_status == "warning"
+        assert len(db.get_history(limit=10)) == 2
+    
+    def test_unchanged_reupload_not_written(self, db, monkeypatch, make_report):
+        report = make_report("2023")
+        report_id = db.save_report(report, ValidationResult(), validation_key="k1")
+        version = db.get_data_version()
+        uploaded_at = db.get_report_version(report_id)
+        
+        monkeypatch.setattr(database, "_write_metrics", dict.fromkeys(("saves", "rows_written", "skipped"), 0))
+        events = []
+        monkeypatch.setattr(database, "_write_listeners", [lambda *args: events.append(args)])
+        
+        assert db.save_report(make_report("2023"), ValidationResult(), validation_key="k1") == report_id
+        
+        assert db.get_data_version() == version
+        assert db.get_report_version(report_id) == uploaded_at
+        assert events == []
+        assert database.write_metrics() == {"saves": 1, "rows_written": 0, "skipped": 1, "write_amplification": 0.0}
+    
+    def test_metrics_count_rows_in_all_tables(self, db, monkeypatch, make_report):
+        monkeypatch.setattr(database, "_write_metrics", dict.fromkeys(("saves", "rows_written", "skipped"), 0))
+        
+        db.save_report(make_report("2023"), ValidationResult())
+        db.save_report(make_report("2023"), ValidationResult())
+        
+        metrics = database.write_metrics()
+        # report, organization, product catalog and link, metrics, cube, obligation, change log, data version
+        assert metrics["rows_written"] > 5
+        assert (metrics["saves"], metrics["skipped"]) == (2, 1)
+        assert metrics["write_amplification"] == metrics["rows_written"] / 2
+    
+    def test_changed_validation_is_written(self, db, make_report):
+        report_id = db.save_report(make_report("2023"), ValidationResult())
+        version = db.get_data_version()
+        
+        assert db.save_report(make_report("2023"), ValidationResult(status="failed", error_count=1)) == report_id
+        
+        assert db.get_data_version() > version
+        assert db.get_report(report_id).validation_status == "failed"
+
+
+class TestDataVersion:
+    """Tests for the shared data version counter."""
+    
+    def test_version_changes_on_every_write(self, db, make_report):
+        versions = [db.get_data_version()]
+        report_id = db.save_report(make_report("2023"), ValidationResult())
+        versions.append(db.get_data_version())
+        db.save_report(make_report("2023", revenue=2.0), ValidationResult())
+        versions.append(DatabaseHandler(str(db.db_path)).get_data_version())
+        db.delete_report(db.get_report_by_key("1293310", "1-isth", "2023").id)
+        versions.append(db.get_data_version())
+        
+        assert len(set(versions)) == 4
+        assert versions == sorted(versions)
+
+
+class TestReportVersions:
+    """Tests for versioned report history."""
+    
+    def test_versions_reconstructed_from_deltas(self, db, make_report):
+        report_id = db.save_report(make_report("2023", revenue=1.0), ValidationResult())
+        db.save_report(make_report("2023", revenue=2.0), ValidationResult(status="warning"))
+        db.save_report(make_report("2023", revenue=2.0), ValidationResult(status="warning"))  # unchanged
+        db.save_report(make_report("2023", revenue=3.0), ValidationResult())
+        
+        versions = db.list_report_versions(report_id)
+        
+        assert [v["version"] for v in versions] == [3, 2, 1]
+        assert [v["current"] for v in versions] == [True, False, False]
+        assert versions[1]["validation_status"] == "warning"
+        for version, revenue in ((1, 1.0), (2, 2.0), (3, 3.0), (None, 3.0)):
+            document = db.get_report_document(report_id, version)
+            assert document["section_i"][0]["current_year"] == revenue
+            assert document["section_ii"][0]["sold_value"] == revenue
+        assert db.get_report_document(report_id, 2)["validation_results"]["status"] == "warning"
+        assert db.get_report_document(report_id, 4) is None
+    
+    def test_diff_versions(self, db, make_report):
+        report_id = db.save_report(make_report("2023", revenue=1.0), ValidationResult())
+        db.save_report(make_report("2023", revenue=2.0), ValidationResult())
+        
+        diff = db.diff_report_versions(report_id, 1)
+        
+        assert (diff["from_version"], diff["to_version"]) == (1, 2)
+        assert diff["section_i"]["changed"][0]["fields"]["current_year"] == {"from": 1.0, "to": 2.0}
+    
+    def test_delete_removes_versions(self, db, make_report):
+        report_id = db.save_report(make_report("2023", revenue=1.0), ValidationResult())
+        db.save_report(make_report("2023", revenue=2.0), ValidationResult())
+        db.delete_report(report_id)
+        
+        new_id = db.save_report(make_report("2023", revenue=5.0), ValidationResult())
+        
+        assert [v["version"] for v in db.list_report_versions(new_id)] == [1]
+        assert db.list_report_versions(report_id) == []
+        with sqlite3.connect(db.db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM report_versions").fetchone()[0] == 0
+
+
+class TestChangeLog:
+    """Tests for the analytics mirror change log."""
+    
+    def test_writes_logged(self, db, make_report):
+        report_id = db.save_report(make_report("2024"), ValidationResult())
+        db.save_report(make_report("2024"), ValidationResult())  # unchanged, skipped
+        db.save_report(make_report("2024", revenue=5.0), ValidationResult())
+        db.delete_report(report_id)
+        
+        with sqlite3.connect(db.db_path) as conn:
+            log = conn.execute("SELECT report_id, op FROM change_log ORDER BY seq").fetchall()
+        
+        assert log == [(report_id, "upsert"), (report_id, "upsert"), (report_id, "delete")]
+    
+    def test_capped_without_mirror(self, db, monkeypatch, make_report):
+        monkeypatch.setattr(database.Config, "CHANGE_LOG_MAX_ROWS", 3)
+        for revenue in range(1, 7):
+            db.save_report(make_report("2024", revenue=float(revenue)), ValidationResult())
+        
+        with sqlite3.connect(db.db_path) as conn:
+            assert [row[0] for row in conn.execute("SELECT seq FROM change_log ORDER BY seq")] == [4, 5, 6]
+
+
+class TestOrganizations:
+    """Tests for the organizations master table."""
+    
+    def test_upserted_on_save(self, db, make_report):
+        db.save_report(make_report("2023", org_code="1001", name="Old name", region="21", activity_code="13.10"), ValidationResult())
+        db.save_report(make_report("2024", org_code="1001", name="New name"), ValidationResult())
+        
+        organization = db.get_organization("1001")
+        
+        assert organization.name == "New name"
+        assert organization.region == "21"
+        assert organization.activity_code == "13.10"
+        assert {r.organization_name for r in db.get_history(org_code="1001")} == {"New name"}
+        assert db.get_organization("9999") is None
+    
+    def test_name_not_stored_in_reports(self, db, make_report):
+        db.save_report(make_report("2023", org_code="1001", name="Org"), ValidationResult())
+        
+        with sqlite3.connect(db.db_path) as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(reports)")}
+        
+        assert "organization_name" not in columns
+        assert "org_id" in columns
+        assert db.search_reports("Org")[0].organization_code == "1001"
+    
+    def test_breakdown_by_activity_and_region(self, db, make_report):
+        db.save_report(make_report("2024", org_code="1001", region="21", activity_code="13.10"), ValidationResult(status="passed"))
+        db.save_report(make_report("2023", org_code="1001", region="21", activity_code="13.10"), ValidationResult(status="failed"))
+        db.save_report(make_report("2024", org_code="1002", region="21", activity_code="10.71"), ValidationResult(status="warning"))
+        
+        by_activity = {g["activity_code"]: g for g in db.get_breakdown("activity_code")}
+        by_region = db.get_breakdown("region", period="2024")
+        
+        assert by_activity["13.10"]["total"] == 2
+        assert by_activity["13.10"]["failed"] == 1
+        assert by_activity["10.71"]["warnings"] == 1
+        assert by_region == [{"region": "21", "organizations": 2, "total": 2, "passed": 1, "warnings": 1, "failed": 0}]
+        with pytest.raises(ValueError):
+            db.get_breakdown("name")
+    
+    def test_rename_changes_report_version(self, db, make_report):
+        report_id = db.save_report(make_report("2023", org_code="1001", name="Old name", region="21"), ValidationResult())
+        token = db.get_report_version(report_id)
+        
+        db.save_report(make_report("2024", org_code="1001", name="Old name"), ValidationResult())
+        unchanged = db.get_report_version(report_id)
+        db.save_report(make_report("2025", org_code="1001", name="New name"), ValidationResult())
+        
+        assert unchanged == token
+        assert db.get_report_version(report_id) != token
+        assert db.get_report_row(report_id)["version_token"] == db.get_report_version(report_id)
+    
+    def test_names_moved_out_of_existing_reports(self, tmp_path):
+        path = tmp_path / "old.db"
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "CREATE TABLE reports (id INTEGER PRIMARY KEY AUTOINCREMENT, organization_code TEXT NOT NULL, "
+                "organization_name TEXT, report_type TEXT NOT NULL, report_period TEXT NOT NULL, "
+                "section_i_data TEXT, section_ii_data TEXT, validation_results TEXT, validation_status TEXT, "
+                "uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, UNIQUE(organization_code, report_type, report_period))"
+            )
+            conn.execute("INSERT INTO reports (organization_code, organization_name, report_type, report_period, uploaded_at) "
+                         "VALUES ('1001', 'Old', '1-isth', '2023', '2024-01-01 00:00:00')")
+            conn.execute("INSERT INTO reports (organization_code, organization_name, report_type, report_period, uploaded_at) "
+                         "VALUES ('1001', 'Latest', '1-isth', '2024', '2025-01-01 00:00:00')")
+        
+        db = DatabaseHandler(str(path))
+        
+        assert db.get_organization("1001").name == "Latest"
+        assert [r.organization_name for r in db.get_history()] == ["Latest", "Latest"]
+
+
+class TestProductCatalog:
+    """Tests for the product catalog and catalog-referenced Section II rows."""
+    
+    def test_rows_stored_by_product_id(self, db, make_report):
+        report_id = db.save_report(make_report("2024", products=[
+            ProductRow(product_code="111", product_name="Product", unit="ton", sold_value=5.0),
+            ProductRow(product_code="222", product_name="Other", unit="kq", sold_value=1.0),
+            ProductRow(product_code="111", product_name="Product", unit="ton", sold_value=2.0),
+        ]), ValidationResult())
+        db.save_report(make_report("2025", org_code="1293311"), ValidationResult())
+        
+        with sqlite3.connect(db.db_path) as conn:
+            catalog = conn.execute("SELECT id, code, name FROM products ORDER BY id").fetchall()
+            stored = json.loads(conn.execute(
+                "SELECT section_ii_data FROM reports WHERE id = ?", (report_id,)
+            ).fetchone()[0])
+        
+        assert catalog == [(1, "111", "Product"), (2, "222", "Other")]
+        assert [row["product_id"] for row in stored] == [1, 2, 1]
+        assert "product_code" not in stored[0] and "product_name" not in stored[0]
+    
+    def test_reads_join_catalog_back_in(self, db, make_report):
+        products = [
+            ProductRow(product_code="222", product_name="Other", unit="kq", produced=3.5),
+            ProductRow(product_code="111", product_name="Product", unit="ton", sold_value=5.0),
+        ]
+        report_id = db.save_report(make_report("2024", products=products), ValidationResult())
+        
+        record = db.get_report(report_id)
+        previous = db.get_previous_report_data("1293310", "1-isth", "2025")
+        
+        assert json.loads(record.section_ii_data) == [product.model_dump() for product in products]
+        assert previous.section_ii.products == products
+        assert db.get_report_document(report_id)["section_ii"] == [product.model_dump() for product in products]
+    
+    def test_empty_section_ii(self, db, make_report):
+        report_id = db.save_report(make_report("2024", products=[]), ValidationResult())
+        
+        assert json.loads(db.get_report(report_id).section_ii_data) == []
+    
+    def test_existing_reports_moved_to_catalog(self, db, make_report):
+        report_id = db.save_report(make_report("2024"), ValidationResult())
+        legacy = json.dumps([ProductRow(product_code="111", product_name="Product", sold_value=7.0).model_dump()])
+        with sqlite3.connect(db.db_path) as conn:
+            conn.execute("UPDATE reports SET section_ii_data = ? WHERE id = ?", (legacy, report_id))
+            conn.execute("DROP TABLE products")
+            conn.execute("DROP TABLE report_products")
+        database._initialized_paths.discard(str(db.db_path.resolve()))
+        
+        reopened = DatabaseHandler(str(db.db_path))
+        
+        with sqlite3.connect(db.db_path) as conn:
+            stored = json.loads(conn.execute("SELECT section_ii_data FROM reports").fetchone()[0])
+        assert stored[0]["product_id"] == 1
+        assert json.loads(reopened.get_report(report_id).section_ii_data) == json.loads(legacy)
+        assert [r["sold_value"] for r in reopened.get_product_reports("111")] == [7.0]
+    
+    def test_existing_labels_split_like_parser(self, db, make_report):
+        report_id = db.save_report(make_report("2024"), ValidationResult())
+        label = "016110430 - A seksiyası.Torpaqların suvarılması"
+        legacy = json.dumps([
+            ProductRow(product_code="", product_name=label, sold_value=7.0).model_dump(),  # only the _input label
+            ProductRow(product_code="016110430", product_name=label, sold_value=1.0).model_dump(),
+        ])
+        with sqlite3.connect(db.db_path) as conn:
+            conn.execute("UPDATE reports SET section_ii_data = ? WHERE id = ?", (legacy, report_id))
+            conn.execute("DROP TABLE products")
+            conn.execute("DROP TABLE report_products")
+        database._initialized_paths.discard(str(db.db_path.resolve()))
+        
+        reopened = DatabaseHandler(str(db.db_path))
+        
+        products = json.loads(reopened.get_report(report_id).section_ii_data)
+        assert {(p["product_code"], p["product_name"]) for p in products} == {
+            ("016110430", "A seksiyası.Torpaqların suvarılması"),
+        }
+        assert reopened.search_products("0161") == [
+            {"id": 1, "code": "016110430", "name": "A seksiyası.Torpaqların suvarılması"},
+        ]
+        assert [r["sold_value"] for r in reopened.get_product_reports("016110430")] == [7.0, 1.0]
+    
+    def test_report_products_follow_writes(self, db, make_report):
+        def links():
+            with sqlite3.connect(db.db_path) as conn:
+                return conn.execute("SELECT report_id, position, product_id FROM report_products ORDER BY 1, 2").fetchall()
+        
+        report_id = db.save_report(make_report("2024", products=[
+            ProductRow(product_code="111", product_name="Product"),
+            ProductRow(product_code="222", product_name="Other"),
+        ]), ValidationResult())
+        assert links() == [(report_id, 0, 1), (report_id, 1, 2)]
+        
+        db.save_report(make_report("2024", products=[ProductRow(product_code="222", product_name="Other")]), ValidationResult())
+        assert links() == [(report_id, 0, 2)]
+        
+        db.delete_report(report_id)
+        assert links() == []
+    
+    def test_product_lookup_uses_link_index(self, db, make_report):
+        db.save_report(make_report("2024"), ValidationResult())
+        
+        with sqlite3.connect(db.db_path) as conn:
+            plan = " ".join(row[3] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT r.id FROM report_products rp CROSS JOIN reports r ON r.id = rp.report_id "
+                "WHERE rp.product_id IN (1)"
+            ))
+        
+        assert "idx_report_products_product_id" in plan and "SCAN r" not in plan
+    
+    def test_product_reports(self, db, make_report):
+        db.save_report(make_report("2024", products=[
+            ProductRow(product_code="111", product_name="Product", sold_value=5.0),
+        ]), ValidationResult())
+        db.save_report(make_report("2025", products=[
+            ProductRow(product_code="222", product_name="Other", sold_value=1.0),
+            ProductRow(product_code="111", product_name="Product renamed", unit="ton", sold_value=8.0),
+        ]), ValidationResult())
+        db.save_report(make_report("2025", org_code="1293311", products=[
+            ProductRow(product_code="222", product_name="Other"),
+        ]), ValidationResult())
+        
+        reports = db.get_product_reports("111")
+        
+        assert [(r["report_period"], r["product_name"], r["sold_value"]) for r in reports] == [
+            ("2025", "Product renamed", 8.0), ("2024", "Product", 5.0),
+        ]
+        assert reports[0]["organization_name"] == "Test Organization"
+        assert [r["report_period"] for r in db.get_product_reports("111", period="2024")] == ["2024"]
+        assert len(db.get_product_reports("222")) == 2
+        assert db.get_product_reports("999") is None
+    
+    def test_search_products(self, db, make_report):
+        db.save_report(make_report("2024", products=[
+            ProductRow(product_code="111", product_name="Pambıq"),
+            ProductRow(product_code="222", product_name="İpək sapı"),
+        ]), ValidationResult())
+        
+        assert [p["code"] for p in db.search_products("11")] == ["111"]
+        assert [p["code"] for p in db.search_products("sapı")] == ["222"]
+        assert len(db.search_products("")) == 2
+
+
+class TestPeriodKey:
+    """Tests for period_key column and period-range queries."""
+    
+    def test_history_period_filter(self, db, make_report):
+        for period in ("2025-06", "2025-07", "2025-09", "2025-10"):
+            db.save_report(make_report(period, report_type="12-isth"), ValidationResult())
+        db.save_report(make_report("2025"), ValidationResult())
+        
+        quarter = {r.report_period for r in db.get_history(period="2025-Q3", limit=10)}
+        year = {r.report_period for r in db.get_history(period="2025", limit=10)}
+        
+        assert quarter == {"2025-07", "2025-09"}
+        assert year == {"2025", "2025-06", "2025-07", "2025-09", "2025-10"}
+    
+    def test_period_range_uses_index(self, db):
+        with sqlite3.connect(db.db_path) as conn:
+            plan = " ".join(row[-1] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM reports WHERE report_type = ? AND period_key >= ? AND period_key < ?",
+                ("12-isth", 202507, 202510)
+            ))
+            latest = " ".join(row[-1] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM reports WHERE organization_code = ? AND report_type = ? "
+                "AND period_key < ? ORDER BY period_key DESC LIMIT 1",
+                ("1293310", "1-isth", 202500)
+            ))
+        
+        assert "idx_reports_type_period_key" in plan
+        assert "idx_reports_org_type_period_key" in latest
+        assert "TEMP B-TREE" not in latest
+    
+    def test_existing_rows_backfilled(self, tmp_path):
+        path = tmp_path / "old.db"
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "CREATE TABLE reports (id INTEGER PRIMARY KEY AUTOINCREMENT, organization_code TEXT NOT NULL, "
+                "organization_name TEXT, report_type TEXT NOT NULL, report_period TEXT NOT NULL, "
+                "section_i_data TEXT, section_ii_data TEXT, validation_results TEXT, validation_status TEXT, "
+                "uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, UNIQUE(organization_code, report_type, report_period))"
+            )
+            conn.execute("INSERT INTO reports (organization_code, report_type, report_period) VALUES ('1', '12-isth', '2024-11')")
+            conn.execute("INSERT INTO reports (organization_code, report_type, report_period) VALUES ('1', '12-isth', 'bad')")
+        
+        DatabaseHandler(str(path))
+        
+        with sqlite3.connect(path) as conn:
+            keys = dict(conn.execute("SELECT report_period, period_key FROM reports"))
+        assert keys == {"2024-11": 202411, "bad": None}
+    
+    def test_previous_report_across_year_boundary(self, db, make_report):
+        db.save_report(make_report("2024-12", report_type="12-isth"), ValidationResult())
+        db.save_report(make_report("2024-09", report_type="12-isth"), ValidationResult())
+        
+        assert db.get_latest_report("1293310", "12-isth", "2025-01").report_period == "2024-12"
+        assert db.get_latest_report("1293310", "12-isth", "invalid") is None
+
+
+class TestLazyRecords:
+    """Tests for lazily loaded ReportRecord blob fields."""
+    
+    def test_history_records_load_blobs_on_access(self, db, monkeypatch, make_report):
+        db.save_report(make_report("2023"), ValidationResult(status="warning"))
+        calls = []
+        fetch = db._fetch_blobs
+        monkeypatch.setattr(db, "_fetch_blobs", lambda report_id: calls.append(report_id) or fetch(report_id))
+        
+        record = db.get_history()[0]
+        assert record.report_period == "2023"
+        assert calls == []
+        
+        assert json.loads(record.section_i_data)[0]["current_year"] == 1000.0
+        assert json.loads(record.validation_results)["status"] == "warning"
+        assert calls == [record.id]
+    
+    def test_lazy_record_dump_includes_blobs(self, db, make_report):
+        db.save_report(make_report("2023"), ValidationResult())
+        
+        dumped = db.search_reports("1293310")[0].model_dump()
+        
+        assert list(dumped) == list(db.get_report(dumped["id"]).model_dump())
+        assert json.loads(dumped["section_ii_data"])[0]["product_code"] == "111"
+
+
+class TestPreviousReportLoader:
+    """Tests for DatabaseHandler.get_previous_report_data."""
+    
+    def test_returns_latest_before_period(self, db, make_report):
+        db.save_report(make_report("2022", revenue=1.0), ValidationResult())
+        db.save_report(make_report("2023", revenue=2.0), ValidationResult())
+        db.save_report(make_report("2024", revenue=3.0), ValidationResult())
+        
+        previous = db.get_previous_report_data("1293310", "1-isth", "2024")
+        
+        assert previous.report_period == "2023"
+        assert previous.organization.code == "1293310"
+        assert previous.section_i.rows[0].current_year == 2.0
+        assert previous.section_ii.products[0].product_code == "111"
+        assert previous.section_ii.products[0].unit == "ton"
+    
+    def test_no_previous_report(self, db, make_report):
+        db.save_report(make_report("2024"), ValidationResult())
+        
+        assert db.get_previous_report_data("1293310", "1-isth", "2024") is None
+        assert db.get_previous_report_data("1293310", "12-isth", "2025-01") is None
+    
+    def test_decoded_baseline_is_cached(self, db, make_report):
+        db.save_report(make_report("2023"), ValidationResult())
+        
+        first = db.get_previous_report_data("1293310", "1-isth", "2024")
+        second = DatabaseHandler(str(db.db_path)).get_previous_report_data("1293310", "1-isth", "2024")
+        
+        assert second is first
+    
+    def test_cache_invalidated_on_save(self, db, make_report):
+        db.save_report(make_report("2022", revenue=1.0), ValidationResult())
+        assert db.get_previous_report_data("1293310", "1-isth", "2024").report_period == "2022"
+        
+        db.save_report(make_report("2023", revenue=2.0), ValidationResult())
+        assert db.get_previous_report_data("1293310", "1-isth", "2024").report_period == "2023"
+        
+        db.save_report(make_report("2023", revenue=5.0), ValidationResult())
+        assert db.get_previous_report_data("1293310", "1-isth", "2024").section_i.rows[0].current_year == 5.0
+    
+    def test_cache_invalidated_on_delete(self, db, make_report):
+        report_id = db.save_report(make_report("2023"), ValidationResult())
+        assert db.get_previous_report_data("1293310", "1-isth", "2024") is not None
+        
+        db.delete_report(report_id)
+        
+        assert db.get_previous_report_data("1293310", "1-isth", "2024") is None
+    
+    def test_cache_checked_against_other_process_writes(self, db, make_report):
+        db.save_report(make_report("2022", revenue=1.0), ValidationResult())
+        db.save_report(make_report("2023", revenue=2.0), ValidationResult())
+        assert db.get_previous_report_data("1293310", "1-isth", "2024").report_period == "2023"
+        
+        with sqlite3.connect(db.db_path) as conn:  # another worker: this process's cache is not told
+            conn.execute("DELETE FROM reports WHERE report_period = '2023'")
+        
+        assert db.get_previous_report_data("1293310", "1-isth", "2024").report_period == "2022"
+    
+    def test_cache_follows_organization_rename(self, db, make_report):
+        db.save_report(make_report("2023"), ValidationResult())
+        assert db.get_previous_report_data("1293310", "1-isth", "2024").organization.name == "Test Organization"
+        
+        renamed = make_report("2025-01", report_type="12-isth")
+        renamed.organization.name = "Renamed Organization"
+        db.save_report(renamed, ValidationResult())
+        
+        assert db.get_previous_report_data("1293310", "1-isth", "2024").organization.name == "Renamed Organization"
+
+
+class TestComparePeriods:
+    """Tests for DatabaseHandler.compare_periods."""
+    
+    def test_range_in_period_order(self, db, make_report):
+        for month, revenue in (("03", 3.0), ("01", 1.0), ("02", 2.0), ("05", 5.0)):
+            db.save_report(make_report(f"2025-{month}", revenue=revenue, report_type="12-isth"), ValidationResult())
+        db.save_report(make_report("2025", revenue=9.0), ValidationResult())
+        
+        matrix = db.compare_periods("1293310", "12-isth", start="2025-01", end="2025-Q1")
+        
+        assert matrix["periods"] == ["2025-01", "2025-02", "2025-03"]
+        assert matrix["rows"][0]["values"] == [1.0, 2.0, 3.0]
+        assert matrix["products"][0]["fields"]["sold_value"]["change"] == [None, 1.0, 1.0]
+        assert db.compare_periods("1293310", "12-isth")["periods"][-1] == "2025-05"
+        with pytest.raises(ValueError):
+            db.compare_periods("1293310", "12-isth", start="2025-13")
+
+
+class TestStatisticsCube:
+    """Tests for the incrementally maintained statistics cube."""
+    
+    def cube_rows(self, db):
+        with sqlite3.connect(db.db_path) as conn:
+            return sorted(conn.execute("SELECT * FROM stats_cube"))
+    
+    def test_updated_on_save_and_delete(self, db, make_report):
+        db.save_report(make_report("2024", revenue=100.0, org_code="1001", region="21"), ValidationResult())
+        report_id = db.save_report(make_report("2024", revenue=50.0, org_code="1002", region="21"), ValidationResult())
+        db.save_report(make_report("2024", revenue=10.0, org_code="1003", region="22"), ValidationResult())
+        
+        assert db.query_cube(["region"]) == [
+            {"region": "21", "reports": 2, "sales": 150.0, "exports": 0, "product_sales": 150.0},
+            {"region": "22", "reports": 1, "sales": 10.0, "exports": 0, "product_sales": 10.0},
+        ]
+        
+        # Re-upload replaces the old contribution, delete removes it
+        db.save_report(make_report("2024", revenue=70.0, org_code="1002", region="21"), ValidationResult())
+        assert db.query_cube([], {"region": "21"})[0]["sales"] == 170.0
+        db.delete_report(report_id)
+        assert db.query_cube([], {"region": "21"})[0]["reports"] == 1
+        db.delete_report(db.save_report(make_report("2024", revenue=10.0, org_code="1003", region="22"), ValidationResult()))
+        assert [cell["region"] for cell in db.query_cube(["region"])] == ["21"]
+    
+    def test_slices_by_period(self, db, make_report):
+        for month in ("01", "02", "07"):
+            db.save_report(make_report(f"2025-{month}", revenue=1.0, report_type="12-isth"), ValidationResult())
+        db.save_report(make_report("2025", revenue=5.0), ValidationResult())
+        
+        cells = db.query_cube(["report_type", "period"], {"period": "2025-Q1"})
+        
+        assert [(c["report_type"], c["period"]) for c in cells] == [("12-isth", "2025-01"), ("12-isth", "2025-02")]
+        assert db.query_cube([], {"period": "2025"})[0]["reports"] == 4
+    
+    def test_rebuild_matches_incremental(self, db, make_report):
+        db.save_report(make_report("2024", revenue=100.0, org_code="1001", region="21"), ValidationResult())
+        db.save_report(make_report("2024", revenue=120.0, org_code="1001", region="21"), ValidationResult())
+        db.save_report(make_report("2023", revenue=30.0, org_code="1002", region="22"), ValidationResult())
+        incremental = self.cube_rows(db)
+        
+        assert db.rebuild_stats_cube() == 2
+        assert self.cube_rows(db) == incremental
+    
+    def test_organization_attribute_change_moves_its_reports(self, db, make_report):
+        db.save_report(make_report("2023", revenue=100.0, org_code="1001", region="21"), ValidationResult())
+        db.save_report(
+            make_report("2024-01", revenue=10.0, org_code="1001", region="21", report_type="12-isth"), ValidationResult()
+        )
+        db.save_report(make_report("2023", revenue=30.0, org_code="1002", region="21"), ValidationResult())
+        
+        db.save_report(make_report("2024", revenue=120.0, org_code="1001", region="22", activity_code="14.10"), ValidationResult())
+        
+        assert [(c["region"], c["reports"], c["sales"]) for c in db.query_cube(["region"])] == [
+            ("21", 1, 30.0), ("22", 3, 230.0),
+        ]
+        incremental = self.cube_rows(db)
+        db.rebuild_stats_cube()
+        assert self.cube_rows(db) == incremental
+
+
+class TestRankChanges:
+    """Tests for DatabaseHandler.rank_changes."""
+    
+    def test_top_movers_against_previous_period(self, db, monkeypatch, make_report):
+        monkeypatch.setattr(database.Config, "RANKING_WORKERS", 3)
+        for index, (before, after) in enumerate([(100.0, 110.0), (100.0, 40.0), (10.0, 30.0), (50.0, 50.0), (0.0, 5.0)]):
+            for period, revenue in (("2024-12", before), ("2025-01", after)):
+                db.save_report(make_report(period, revenue=revenue, org_code=f"100{index}", report_type="12-isth"), ValidationResult())
+        # No previous period
+        db.save_report(make_report("2025-01", revenue=999.0, org_code="2000", report_type="12-isth"), ValidationResult())
+        
+        by_change = db.rank_changes("2025-01", "12-isth", limit=3)
+        by_pct = db.rank_changes("2025-01", "12-isth", by="change_pct", limit=2)
+        
+        assert by_change["previous_period"] == "2024-12"
+        assert [m["organization_code"] for m in by_change["movers"]] == ["1001", "1002", "1000"]
+        assert by_change["movers"][0]["change"] == -60.0
+        assert [(m["organization_code"], m["change_pct"]) for m in by_pct["movers"]] == [("1002", 200.0), ("1001", -60.0)]
+    
+    def test_cached_until_written(self, db, make_report):
+        db.save_report(make_report("2025-01", revenue=10.0, org_code="1001", report_type="12-isth"), ValidationResult())
+        db.save_report(make_report("2025-02", revenue=20.0, org_code="1001", report_type="12-isth"), ValidationResult())
+        first = db.rank_changes("2025-02", "12-isth")
+        
+        assert db.rank_changes("2025-02", "12-isth") is first
+        db.save_report(make_report("2025-01", revenue=15.0, org_code="1001", report_type="12-isth"), ValidationResult())
+        assert db.rank_changes("2025-02", "12-isth")["movers"][0]["change"] == 5.0
+    
+    def test_write_from_other_process_seen_after_ttl(self, db, monkeypatch, make_report):
+        now = [0.0]
+        monkeypatch.setattr(database, "_ranking_cache", VersionedTTLCache(5.0, clock=lambda: now[0]))
+        db.save_report(make_report("2025-01", revenue=10.0, org_code="1001", report_type="12-isth"), ValidationResult())
+        db.save_report(make_report("2025-02", revenue=20.0, org_code="1001", report_type="12-isth"), ValidationResult())
+        first = db.rank_changes("2025-02", "12-isth")
+        
+        with sqlite3.connect(db.db_path) as conn:  # another worker: bumps data_version, leaves this cache alone
+            conn.execute("UPDATE report_metrics SET sales = 15.0 WHERE period_key = ?", (period_key("2025-01"),))
+            conn.execute("UPDATE reports SET uploaded_at = uploaded_at WHERE report_period = '2025-01'")
+        
+        assert db.rank_changes("2025-02", "12-isth") is first
+        now[0] = 6.0
+        assert db.rank_changes("2025-02", "12-isth")["movers"][0]["change"] == 5.0
+    
+    def test_invalid_arguments(self, db):
+        for kwargs in ({"period": "2025-Q1"}, {"period": "2025", "metric": "name"}, {"period": "2025", "by": "size"}):
+            with pytest.raises(ValueError):
+                db.rank_changes(report_type="1-isth", **kwargs)
+
+
+class TestExportChunks:
+    """Tests for DatabaseHandler.iter_export_chunks."""
+    
+    def test_filters_and_chunking(self, db, make_report):
+        for month in range(1, 6):
+            report = make_report(f"2025-{month:02d}", org_code="1001", report_type="12-isth")
+            report.organization.activity_code = "13.10"
+            db.save_report(report, ValidationResult(status="passed" if month != 3 else "failed"))
+        db.save_report(make_report("2025-02", org_code="1002", report_type="12-isth"), ValidationResult(status="passed"))
+        
+        chunks = list(db.iter_export_chunks("2025-02", "2025-Q1", status="passed", activity_code="13", chunk_size=1))
+        everything = [row for chunk in db.iter_export_chunks(with_sections=False) for row in chunk]
+        
+        assert [[row["report_period"] for row in chunk] for chunk in chunks] == [["2025-02"]]
+        assert chunks[0][0]["section_i_data"]
+        assert len(everything) == 6
+        assert "section_i_data" not in everything[0].keys()
+
+
+class TestValidationIssues:
+    """Tests for the validation_issues table."""
+    
+    def validation(self, *issues):
+        return ValidationResult(status="failed", issues=[
+            ValidationIssue(category=category, field=field, rule_id=rule_id, severity="blocking", message="x")
+            for category, field, rule_id in issues
+        ])
+    
+    def test_replaced_with_report(self, db, make_report):
+        report_id = db.save_report(make_report("2025"), self.validation(
+            ("error", "section_ii.111.produced", "negative_product_value"),
+            ("error", "section_ii.222.produced", "negative_product_value"),
+        ))
+        db.save_report(make_report("2025", revenue=5.0), self.validation(
+            ("warning", "section_i.1", "sales_below_own_production"),
+        ))
+        
+        assert [i["rule_id"] for i in db.list_issues()] == ["sales_below_own_production"]
+        db.delete_report(report_id)
+        assert db.list_issues() == []
+    
+    def test_summary_and_filters(self, db, make_report):
+        db.save_report(make_report("2024"), self.validation(("error", "section_ii.111.produced", "negative_product_value")))
+        db.save_report(make_report("2025"), self.validation(
+            ("error", "section_ii.111.produced", "negative_product_value"),
+            ("error", "section_ii.222.produced", "negative_product_value"),
+            ("info", "section_i.1", "revenue_change"),
+        ))
+        
+        by_rule = db.issue_summary("rule_id")
+        by_period = db.issue_summary("period", {"field": "section_ii.*.produced"})
+        
+        assert by_rule[0] == {"rule_id": "negative_product_value", "issues": 3, "reports": 2, "errors": 3, "warnings": 0, "info": 0}
+        assert by_period == [
+            {"period": "2025", "issues": 2, "reports": 1, "errors": 2, "warnings": 0, "info": 0},
+            {"period": "2024", "issues": 1, "reports": 1, "errors": 1, "warnings": 0, "info": 0},
+        ]
+        assert db.issue_summary("field", {"period": "2025", "category": "info"})[0]["field"] == "section_i.*"
+        assert len(db.list_issues({"field": "section_ii.111.produced"})) == 2
+        with pytest.raises(ValueError):
+            db.issue_summary("organization")
+    
+    def test_paged_newest_first(self, db, make_report):
+        db.save_report(make_report("2025"), self.validation(*[("info", f"section_i.{n}", "revenue_change") for n in range(5)]))
+        
+        first = db.list_issues(limit=3)
+        second = db.list_issues(limit=3, before_id=first[-1]["id"])
+        
+        assert [i["field"] for i in first + second] == [f"section_i.{n}" for n in range(4, -1, -1)]
+        assert first[0]["organization_code"] == "1293310"
+    
+    def test_backfilled_from_stored_results(self, db, make_report):
+        db.save_report(make_report("2025"), self.validation(("error", "organization.code", "")))
+        with sqlite3.connect(db.db_path) as conn:
+            conn.execute("DROP TABLE validation_issues")
+        database._initialized_paths.discard(str(db.db_path.resolve()))
+        
+        reopened = DatabaseHandler(str(db.db_path))
+        
+        assert [i["field"] for i in reopened.list_issues()] == ["organization.code"]
+
+
+class TestMissingReports:
+    """Tests for expected-submission tracking."""
+    
+    def test_expected_after_submissions(self, db, monkeypatch, make_report):
+        monkeypatch.setattr(database.Config, "OBLIGATION_PERIODS", 2)
+        db.save_report(make_report("2025-01", org_code="1001", report_type="12-isth", region="21"), ValidationResult())
+        db.save_report(make_report("2025-01", org_code="1002", report_type="12-isth", region="22"), ValidationResult())
+        db.save_report(make_report("2025-02", org_code="1002", report_type="12-isth", region="22"), ValidationResult())
+        db.save_report(make_report("2024-11", org_code="1003", report_type="12-isth", region="21"), ValidationResult())
+        
+        february = db.get_missing_reports("2025-02", "12-isth")
+        march = db.get_missing_reports("2025-03", "12-isth", region="21")
+        
+        assert (february["expected"], february["missing_count"]) == (2, 1)
+        assert february["missing"] == [{
+            "organization_code": "1001", "organization_name": "Test Organization",
+            "activity_code": "", "region": "21", "last_period": "2025-01",
+        }]
+        assert [m["organization_code"] for m in march["missing"]] == ["1001"]
+        assert db.get_missing_reports("2025-04", "12-isth")["missing_count"] == 1  # 1002 only
+        with pytest.raises(ValueError):
+            db.get_missing_reports("2025-Q1", "12-isth")
+    
+    def test_submission_and_delete_update_missing(self, db, make_report):
+        db.save_report(make_report("2025-01", org_code="1001", report_type="12-isth", region="21"), ValidationResult())
+        db.save_report(make_report("2025-02", org_code="1001", report_type="12-isth", region="21"), ValidationResult())
+        assert db.get_missing_reports("2025-02", "12-isth")["missing_count"] == 0
+        
+        report_id = db.get_report_by_key("1001", "12-isth", "2025-02").id
+        db.delete_report(report_id)
+        
+        assert db.get_missing_reports("2025-02", "12-isth")["missing"][0]["organization_code"] == "1001"
+    
+    def test_backfilled_from_existing_reports(self, db, make_report):
+        db.save_report(make_report("2025-01", org_code="1001", report_type="12-isth", region="21"), ValidationResult())
+        with sqlite3.connect(db.db_path) as conn:
+            conn.execute("DROP TABLE obligations")
+        database._initialized_paths.discard(str(db.db_path.resolve()))
+        
+        reopened = DatabaseHandler(str(db.db_path))
+        
+        assert reopened.get_missing_reports("2025-02", "12-isth")["missing_count"] == 1
@@ -0,0 +1,67 @@
+# Unit tests for streaming export
+
+import csv
+import io
+import json
+import pytest
+
+import export
+from export import EXPORT_TABLES, table_rows, export_stream, format_for_path
+
+
+def report_row(report_id, period, products=()):
+    """A report row as returned by DatabaseHandler.iter_export_chunks."""
+    return {
+        'id': report_id, 'organization_code': '1001', 'organization_name': 'Org', 'report_type': '12-isth',
+        'report_period': period, 'validation_status': 'passed', 'uploaded_at': '2025-01-01 00:00:00',
+        'activity_code': '13.10', 'region': '21',
+        'section_i_data': json.dumps([{'row_code': '1', 'row_name': 'Satış', 'current_year': 5.0, 'previous_year': 4.0}]),
+        'section_ii_data': json.dumps([{'product_code': code, 'sold_value': 1.0} for code in products]),
+    }
+
+
+class TestExport:
+    """Tests for export row building and encoding."""
+    
+    def test_product_rows(self):
+        chunks = [[report_row(1, '2025-01', ['111', '222'])], [report_row(2, '2025-02')]]
+        
+        rows = list(table_rows(chunks, 'products'))
+        
+        assert [len(chunk) for chunk in rows] == [2, 0]
+        assert rows[0][1][:5] == (1, '1001', '12-isth', '2025-01', '222')
+        assert len(rows[0][0]) == len(EXPORT_TABLES['products'])
+    
+    def test_csv_streamed_per_chunk(self):
+        chunks = [[report_row(1, '2025-01')], [report_row(2, '2025-02')]]
+        
+        pieces = list(export_stream(iter(chunks), 'section_i', 'csv'))
+        parsed = list(csv.DictReader(io.StringIO(b''.join(pieces).decode('utf-8'))))
+        
+        assert len(pieces) == 2
+        assert [row['report_period'] for row in parsed] == ['2025-01', '2025-02']
+        assert parsed[0]['row_name'] == 'Satış'
+        assert float(parsed[0]['current_year']) == 5.0
+    
+    def test_invalid_and_missing_pyarrow(self, monkeypatch):
+        with pytest.raises(ValueError):
+            export_stream([], 'organizations', 'csv')
+        monkeypatch.setattr(export, 'pyarrow', None)
+        with pytest.raises(RuntimeError):
+            export_stream([], 'reports', 'parquet')
+    
+    def test_parquet_round_trip(self):
+        pyarrow = pytest.importorskip('pyarrow')
+        import pyarrow.parquet
+        chunks = [[report_row(1, '2025-01', ['111'])], [report_row(2, '2025-02', ['111', '222'])]]
+        
+        data = b''.join(export_stream(iter(chunks), 'products', 'parquet'))
+        table = pyarrow.parquet.read_table(pyarrow.BufferReader(data))
+        
+        assert table.num_rows == 3
+        assert table.column('product_code').to_pylist() == ['111', '111', '222']
+    
+    def test_format_for_path(self):
+        assert format_for_path('out.parquet') == 'parquet'
+        assert format_for_path('out.csv') == 'csv'
+        assert format_for_path('out.parquet', 'csv') == 'csv'
@@ -0,0 +1,521 @@
+# API endpoint tests
+
+import re
+import gzip
+import time
+import asyncio
+import sqlite3
+import pytest
+import httpx
+from pathlib import Path
+
+from click.testing import CliRunner
+from fastapi.testclient import TestClient
+
+import main
+import mirror
+from models import ProductRow, ReportData, ValidationResult, ValidationIssue
+from database import DatabaseHandler
+
+
+@pytest.fixture
+def make_report(make_report):
+    """Create a small test report from a silk producer."""
+    def make(period="2024", revenue=1000.0, org_code="1293310") -> ReportData:
+        return make_report(period, revenue, org_code, name="Şəki İpək ASC", products=[
+            ProductRow(product_code="131010000", product_name="İpək sapı", produced=10.0, sold_value=revenue),
+        ])
+    return make
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # Endpoints use the default relative database path
+    monkeypatch.chdir(tmp_path)
+    return DatabaseHandler()
+
+
+@pytest.fixture
+def client(db):
+    return TestClient(main.app)
+
+
+class TestReportDetail:
+    """Tests for GET /api/reports/{id}."""
+    
+    def test_detail_passes_stored_json_through(self, db, client, make_report):
+        validation = ValidationResult(status="warning", warning_count=1, issues=[
+            ValidationIssue(category="warning", field="section_i.1", message="Satış", severity="logical")
+        ])
+        report_id = db.save_report(make_report(), validation)
+        
+        response = client.get(f"/api/reports/{report_id}")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        data = response.json()
+        assert data["id"] == report_id
+        assert data["organization_name"] == "Şəki İpək ASC"
+        assert data["section_i_data"][0]["current_year"] == 1000.0
+        assert data["section_ii_data"][0]["product_name"] == "İpək sapı"
+        assert data["validation_results"]["issues"][0]["field"] == "section_i.1"
+    
+    def test_detail_not_found(self, client):
+        assert client.get("/api/reports/999").status_code == 404
+    
+    def test_detail_etag_not_modified(self, db, client, make_report):
+        report_id = db.save_report(make_report(), ValidationResult())
+        
+        first = client.get(f"/api/reports/{report_id}")
+        etag = first.headers["etag"]
+        second = client.get(f"/api/reports/{report_id}", headers={"If-None-Match": etag})
+        
+        assert second.status_code == 304
+        assert second.headers["etag"] == etag
+        assert second.content == b""
+    
+    def test_detail_etag_changes_on_reupload(self, db, client, make_report):
+        report_id = db.save_report(make_report(revenue=1.0), ValidationResult())
+        etag = client.get(f"/api/reports/{report_id}").headers["etag"]
+        
+        new_id = db.save_report(make_report(revenue=2.0), ValidationResult())
+        response = client.get(f"/api/reports/{new_id}", headers={"If-None-Match": etag})
+        
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["section_i_data"][0]["current_year"] == 2.0
+    
+    def test_detail_etag_changes_on_organization_rename(self, db, client, make_report):
+        report_id = db.save_report(make_report("2023"), ValidationResult())
+        etag = client.get(f"/api/reports/{report_id}").headers["etag"]
+        
+        renamed = make_report("2024")
+        renamed.organization.name = "Şəki İpək MMC"
+        db.save_report(renamed, ValidationResult())
+        response = client.get(f"/api/reports/{report_id}", headers={"If-None-Match": etag})
+        
+        assert response.status_code == 200
+        assert response.json()["organization_name"] == "Şəki İpək MMC"
+    
+    def test_detail_payload_cached(self, db, client, monkeypatch, make_report):
+        report_id = db.save_report(make_report(), ValidationResult())
+        first = client.get(f"/api/reports/{report_id}")
+        
+        monkeypatch.setattr(DatabaseHandler, "get_report_row", lambda self, report_id: pytest.fail("payload not cached"))
+        second = client.get(f"/api/reports/{report_id}")
+        
+        assert second.content == first.content
+    
+    def test_detail_compressed_when_large(self, db, client, make_report):
+        report = make_report()
+        report.section_ii.products = [
+            ProductRow(product_code=f"{code}", product_name="Xam ipək, emal olunmamış", sold_value=1.0)
+            for code in range(100)
+        ]
+        report_id = db.save_report(report, ValidationResult())
+        
+        compressed = client.get(f"/api/reports/{report_id}", headers={"Accept-Encoding": "gzip"})
+        identity = client.get(f"/api/reports/{report_id}", headers={"Accept-Encoding": "identity"})
+        
+        assert compressed.headers["content-encoding"] == "gzip"
+        assert int(compressed.headers["content-length"]) < len(identity.content)
+        assert "content-encoding" not in identity.headers
+        assert compressed.json() == identity.json()
+        assert compressed.headers["etag"] != identity.headers["etag"]
+        
+        revalidated = client.get(
+            f"/api/reports/{report_id}",
+            headers={"Accept-Encoding": "gzip", "If-None-Match": compressed.headers["etag"]}
+        )
+        other_representation = client.get(
+            f"/api/reports/{report_id}",
+            headers={"Accept-Encoding": "identity", "If-None-Match": compressed.headers["etag"]}
+        )
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == compressed.headers["etag"]
+        assert "Accept-Encoding" in revalidated.headers["vary"]
+        assert other_representation.status_code == 200
+        assert other_representation.headers["etag"] == identity.headers["etag"]
+    
+    def test_self_encoded_route_bypasses_gzip_middleware(self):
+        body = gzip.compress(b"x" * 5000)
+        
+        async def endpoint(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-encoding", b"gzip")]})
+            await send({"type": "http.response.body", "body": body})
+        
+        middleware = main._GZipMiddleware(endpoint, skip_paths=re.compile(r"^/api/reports/\d+$"), minimum_size=10)
+        sent = []
+        
+        async def send(message):
+            sent.append(message)
+        
+        scope = {"type": "http", "path": "/api/reports/1", "headers": [(b"accept-encoding", b"gzip")]}
+        asyncio.run(middleware(scope, None, send))
+        
+        assert sent[1]["body"] == body
+    
+    def test_small_detail_not_compressed(self, db, client, make_report):
+        report_id = db.save_report(make_report(), ValidationResult())
+        
+        response = client.get(f"/api/reports/{report_id}", headers={"Accept-Encoding": "gzip"})
+        
+        assert "content-encoding" not in response.headers
+
+
+class TestStatistics:
+    """Tests for cached /api/stats and /api/health."""
+    
+    def test_stats_cached_between_writes(self, db, client, monkeypatch, make_report):
+        db.save_report(make_report("2023"), ValidationResult(status="passed"))
+        assert client.get("/api/stats").json()["total"] == 1
+        
+        monkeypatch.setattr(DatabaseHandler, "get_statistics", lambda self: pytest.fail("stats not cached"))
+        assert client.get("/api/stats").json()["total"] == 1
+        assert client.get("/api/health").json()["total_reports"] == 1
+    
+    def test_stats_invalidated_on_save_and_delete(self, db, client, make_report):
+        report_id = db.save_report(make_report("2023"), ValidationResult(status="passed"))
+        assert client.get("/api/health").json()["total_reports"] == 1
+        
+        db.save_report(make_report("2024"), ValidationResult(status="failed"))
+        stats = client.get("/api/stats").json()
+        assert stats["total"] == 2
+        assert stats["failed"] == 1
+        
+        db.delete_report(report_id)
+        assert client.get("/api/stats").json()["total"] == 1
+        assert client.get("/api/stats", params={"organization_code": "1293310"}).json()["total_reports"] == 1
+    
+    def test_stats_revalidated_by_version_after_ttl(self, db, client, monkeypatch):
+        monkeypatch.setattr(main._stats_cache, "ttl", 0.0)
+        assert client.get("/api/stats").json()["total"] == 0
+        
+        # Write from another worker: no local invalidation, only the version changes
+        with sqlite3.connect(db.db_path) as conn:
+            conn.execute(
+                "INSERT INTO reports (organization_code, report_type, report_period, validation_status) VALUES ('1', '1-isth', '2024', 'passed')"
+            )
+        
+        assert client.get("/api/stats").json()["total"] == 1
+
+
+class TestUpload:
+    """Tests for POST /api/upload."""
+    
+    def test_identical_concurrent_uploads_coalesced(self, db, monkeypatch):
+        calls = []
+        
+        def process(content, compare):
+            calls.append((content, compare))
+            time.sleep(0.05)
+            return {"content": content.decode(), "compare": compare}
+        
+        monkeypatch.setattr(main, "_process_upload", process)
+        
+        async def upload(client, content, compare=False):
+            response = await client.post(
+                "/api/upload", params={"compare": compare},
+                files={"file": ("report.html", content, "text/html")}
+            )
+            return response.json()
+        
+        async def run():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(
+                    upload(client, b"<html>1</html>"),
+                    upload(client, b"<html>1</html>"),
+                    upload(client, b"<html>1</html>", compare=True),
+                    upload(client, b"<html>2</html>"),
+                )
+        
+        results = asyncio.run(run())
+        
+        assert len(calls) == 3
+        assert results[0] == results[1]
+        assert [r["compare"] for r in results] == [False, False, True, False]
+        assert results[3]["content"] == "<html>2</html>"
+    
+    def test_non_html_rejected(self, client):
+        response = client.post("/api/upload", files={"file": ("report.pdf", b"%PDF", "application/pdf")})
+        
+        assert response.status_code == 400
+    
+    def test_unreadable_file_rejected(self, client):
+        for path in ("/api/upload", "/api/validate"):
+            response = client.post(path, files={"file": ("report.html", b"\xff\xfe<html>", "text/html")})
+            
+            assert response.status_code == 400
+    
+    def test_saved_validation_is_always_full(self, db, client, monkeypatch):
+        modes = []
+        validate = main.validation_cache.validate
+        
+        def spy(report, previous_report=None, mode='full', db=None):
+            modes.append(mode)
+            return validate(report, previous_report, mode=mode, db=db)
+        
+        monkeypatch.setattr(main.validation_cache, "validate", spy)
+        html = b'<html><input name="tab1:0:j_idt51:j_idt55" value="100"></html>'
+        
+        client.post("/api/upload", params={"mode": "counts_only"}, files={"file": ("r.html", html, "text/html")})
+        client.post("/api/validate", params={"mode": "counts_only"}, files={"file": ("r.html", html, "text/html")})
+        
+        assert modes == ["full", "counts_only"]
+
+
+class TestReportVersions:
+    """Tests for report version endpoints."""
+    
+    def test_list_and_diff(self, db, client, make_report):
+        report_id = db.save_report(make_report(revenue=1.0), ValidationResult())
+        db.save_report(make_report(revenue=2.0), ValidationResult())
+        
+        versions = client.get(f"/api/reports/{report_id}/versions").json()["versions"]
+        diff = client.get(f"/api/reports/{report_id}/versions/diff").json()
+        first = client.get(f"/api/reports/{report_id}/versions/1").json()
+        
+        assert [v["version"] for v in versions] == [2, 1]
+        assert client.get(f"/api/reports/{report_id}").json()["version"] == 2
+        assert diff["section_ii"]["changed"][0]["fields"]["sold_value"] == {"from": 1.0, "to": 2.0}
+        assert first["section_i"][0]["current_year"] == 1.0
+    
+    def test_errors(self, db, client, make_report):
+        report_id = db.save_report(make_report(), ValidationResult())
+        
+        assert client.get("/api/reports/999/versions").status_code == 404
+        assert client.get(f"/api/reports/{report_id}/versions/diff").status_code == 400
+        assert client.get(f"/api/reports/{report_id}/versions/5").status_code == 404
+
+
+class TestReportList:
+    """Tests for GET /api/reports."""
+    
+    def test_period_filter(self, db, client, make_report):
+        db.save_report(make_report("2025-08"), ValidationResult())
+        db.save_report(make_report("2025-11"), ValidationResult())
+        
+        response = client.get("/api/reports", params={"period": "2025-Q3"})
+        
+        assert [r["report_period"] for r in response.json()["reports"]] == ["2025-08"]
+        assert client.get("/api/reports", params={"period": "2025-Q9"}).status_code == 400
+
+
+class TestOrganizations:
+    """Tests for organization endpoints."""
+    
+    def test_breakdown_and_lookup(self, db, client, make_report):
+        report = make_report("2025")
+        report.organization.activity_code = "13.10"
+        db.save_report(report, ValidationResult())
+        
+        breakdown = client.get("/api/stats/breakdown", params={"by": "activity_code"}).json()
+        
+        assert breakdown["groups"][0]["activity_code"] == "13.10"
+        assert client.get("/api/organizations/1293310").json()["name"] == "Şəki İpək ASC"
+        assert client.get("/api/organizations/0000000").status_code == 404
+        assert client.get("/api/stats/breakdown", params={"by": "name"}).status_code == 422
+
+
+class TestStatisticsCube:
+    """Tests for the statistics cube endpoint."""
+    
+    def test_slices_and_validates_dims(self, db, client, make_report):
+        report = make_report("2025")
+        report.organization.region = "21"
+        db.save_report(report, ValidationResult())
+        
+        body = client.get("/api/analytics/cube", params={"dims": "period,region", "report_type": "1-isth"}).json()
+        
+        assert body["dims"] == ["period", "region"]
+        assert body["cells"][0]["period"] == "2025"
+        assert body["cells"][0]["region"] == "21"
+        assert body["cells"][0]["reports"] == 1
+        assert client.get("/api/analytics/cube", params={"dims": "name"}).status_code == 400
+        assert client.get("/api/analytics/cube", params={"period": "2025-Q5"}).status_code == 400
+
+
+class TestTimeseries:
+    """Tests for the organization time series endpoint."""
+    
+    def test_columnar_history(self, db, client, make_report):
+        for year, revenue in (("2023", 1.0), ("2025", 3.0), ("2024", 2.0)):
+            db.save_report(make_report(year, revenue=revenue), ValidationResult())
+        
+        body = client.get(
+            "/api/orgs/1293310/timeseries",
+            params={"report_type": "1-isth", "rows": "1", "products": "131010000", "fields": "sold_value"}
+        ).json()
+        
+        assert body["periods"] == ["2023", "2024", "2025"]
+        assert body["rows"] == {"1": [1.0, 2.0, 3.0]}
+        assert body["products"]["131010000"]["sold_value"] == [1.0, 2.0, 3.0]
+    
+    def test_errors(self, db, client, make_report):
+        db.save_report(make_report("2025"), ValidationResult())
+        
+        assert client.get("/api/orgs/0000000/timeseries").status_code == 404
+        assert client.get("/api/orgs/1293310/timeseries", params={"fields": "price"}).status_code == 400
+        assert client.get("/api/orgs/1293310/timeseries", params={"format": "csv"}).status_code == 422
+
+
+class TestComparePeriods:
+    """Tests for the multi-period comparison endpoint."""
+    
+    def test_matrix(self, db, client, make_report):
+        for year, revenue in (("2023", 1.0), ("2024", 2.0), ("2025", 4.0)):
+            db.save_report(make_report(year, revenue=revenue), ValidationResult())
+        
+        body = client.get(
+            "/api/orgs/1293310/compare", params={"report_type": "1-isth", "start": "2024", "end": "2025"}
+        ).json()
+        
+        assert body["periods"] == ["2024", "2025"]
+        assert body["rows"][0]["values"] == [2.0, 4.0]
+        assert body["products"][0]["fields"]["sold_value"]["change_pct"] == [None, 100.0]
+        assert client.get("/api/orgs/1293310/compare", params={"start": "2025-Q9"}).status_code == 400
+        assert client.get("/api/orgs/0000000/compare").status_code == 404
+
+
+class TestTopMovers:
+    """Tests for the top movers endpoint."""
+    
+    def test_annual_movers(self, db, client, make_report):
+        db.save_report(make_report("2024", revenue=100.0), ValidationResult())
+        db.save_report(make_report("2025", revenue=150.0), ValidationResult())
+        
+        body = client.get("/api/analytics/movers", params={"period": "2025"}).json()
+        
+        assert body["report_type"] == "1-isth"
+        assert body["movers"][0]["change_pct"] == 50.0
+        assert client.get("/api/analytics/movers", params={"period": "2025-Q1"}).status_code == 400
+        assert client.get("/api/analytics/movers", params={"period": "2025", "metric": "name"}).status_code == 422
+
+
+class TestExport:
+    """Tests for the export endpoint."""
+    
+    def test_streams_csv(self, db, client, make_report):
+        db.save_report(make_report("2024"), ValidationResult())
+        db.save_report(make_report("2025"), ValidationResult())
+        
+        response = client.get("/api/export", params={"table": "products", "start": "2025"})
+        lines = response.text.splitlines()
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "products.csv" in response.headers["content-disposition"]
+        assert lines[0].startswith("report_id,organization_code")
+        assert len(lines) == 2 and ",2025,131010000," in lines[1]
+        assert client.get("/api/export", params={"start": "2025-Q7"}).status_code == 400
+        assert client.get("/api/export", params={"table": "users"}).status_code == 422
+
+
+class TestAnalyticsMirror:
+    """Tests for routing analytics endpoints to the DuckDB mirror."""
+    
+    def test_routed_to_mirror(self, db, client, monkeypatch, make_report):
+        pytest.importorskip("duckdb")
+        monkeypatch.setattr(main.Config, "MIRROR_PATH", Path("analytics.duckdb"))
+        db.save_report(make_report("2025"), ValidationResult())
+        
+        body = client.get("/api/analytics/cube", params={"dims": "period"}).json()
+        
+        assert body["cells"] == [{"period": "2025", "reports": 1, "sales": 1000.0, "exports": 0.0, "product_sales": 1000.0}]
+        assert Path("analytics.duckdb").exists()
+    
+    def test_sqlite_fallback_without_duckdb(self, db, client, monkeypatch, make_report):
+        monkeypatch.setattr(mirror, "duckdb", None)
+        monkeypatch.setattr(mirror, "_mirrors", {})
+        monkeypatch.setattr(main.Config, "MIRROR_PATH", Path("analytics.duckdb"))
+        db.save_report(make_report("2025"), ValidationResult())
+        
+        for _ in range(2):
+            body = client.get("/api/analytics/cube", params={"dims": "period"}).json()
+            assert body["cells"][0]["reports"] == 1
+        assert list(mirror._mirrors.values()) == [None]
+
+
+class TestValidationIssues:
+    """Tests for the validation issue endpoints."""
+    
+    def test_listing_and_summary(self, db, client, make_report):
+        validation = ValidationResult(status="failed", error_count=3, issues=[
+            ValidationIssue(category="error", field=f"section_ii.{code}.produced", rule_id="negative_product_value")
+            for code in ("111", "222", "333")
+        ])
+        db.save_report(make_report("2025"), validation)
+        
+        page = client.get("/api/issues", params={"field": "section_ii.*.produced", "limit": 2}).json()
+        rest = client.get("/api/issues", params={"limit": 2, "before_id": page["next_before_id"]}).json()
+        summary = client.get("/api/issues/summary", params={"by": "period", "category": "error"}).json()
+        
+        assert [i["field"] for i in page["issues"] + rest["issues"]] == [
+            "section_ii.333.produced", "section_ii.222.produced", "section_ii.111.produced"
+        ]
+        assert rest["next_before_id"] is None
+        assert summary["groups"] == [{"period": "2025", "issues": 3, "reports": 1, "errors": 3, "warnings": 0, "info": 0}]
+        assert client.get("/api/issues/summary", params={"by": "org"}).status_code == 422
+        assert client.get("/api/issues", params={"period": "2025-Q0"}).status_code == 400
+
+
+class TestMissingReports:
+    """Tests for the missing reports endpoint."""
+    
+    def test_missing_annual_report(self, db, client, make_report):
+        db.save_report(make_report("2024"), ValidationResult())
+        
+        body = client.get("/api/obligations/missing", params={"period": "2025"}).json()
+        
+        assert body["report_type"] == "1-isth"
+        assert body["missing"][0]["organization_code"] == "1293310"
+        assert body["missing"][0]["last_period"] == "2024"
+        assert client.get("/api/obligations/missing", params={"period": "2025-H1"}).status_code == 400
+
+
+class TestProducts:
+    """Tests for the product catalog endpoints."""
+    
+    def test_search_and_product_reports(self, db, client, make_report):
+        db.save_report(make_report("2024", revenue=500.0), ValidationResult())
+        db.save_report(make_report("2025", revenue=800.0), ValidationResult())
+        
+        products = client.get("/api/products", params={"q": "1310"}).json()["products"]
+        body = client.get("/api/products/131010000/reports", params={"report_type": "1-isth"}).json()
+        
+        assert [(p["code"], p["name"]) for p in products] == [("131010000", "İpək sapı")]
+        assert [(r["report_period"], r["sold_value"]) for r in body["reports"]] == [("2025", 800.0), ("2024", 500.0)]
+        assert client.get("/api/products/999/reports").status_code == 404
+        assert client.get("/api/products/131010000/reports", params={"period": "2025-Q9"}).status_code == 400
+
+
+class TestCli:
+    """Tests for CLI argument errors."""
+    
+    def test_reconcile_rejects_invalid_year(self, db):
+        for year in ("abc", "2025-07"):
+            result = CliRunner().invoke(main.cli, ["reconcile", year])
+            assert result.exit_code == 2
+            assert f"Invalid year: {year}" in result.output
+    
+    def test_movers_rejects_invalid_period(self, db):
+        result = CliRunner().invoke(main.cli, ["movers", "2025-13"])
+        
+        assert result.exit_code == 2
+        assert "2025-13" in result.output
+    
+    def test_missing_rejects_invalid_period(self, db):
+        result = CliRunner().invoke(main.cli, ["missing", "2025-13"])
+        
+        assert result.exit_code == 2
+        assert "2025-13" in result.output
+    
+    def test_export_rejects_invalid_range_before_writing(self, db, tmp_path):
+        output = tmp_path / "out.csv"
+        
+        result = CliRunner().invoke(main.cli, ["export", str(output), "--start", "abc"])
+        
+        assert result.exit_code == 2
+        assert "--start" in result.output
+        assert not output.exists()
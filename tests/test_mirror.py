@@ -0,0 +1,137 @@
+# Unit tests for the DuckDB analytics mirror
+
+import sys
+import sqlite3
+import subprocess
+import pytest
+
+pytest.importorskip("duckdb")
+
+from models import ReportData, ValidationResult
+import database
+from database import DatabaseHandler
+import mirror as mirror_module
+from mirror import AnalyticsMirror, get_mirror
+from writer import get_writer
+
+
+@pytest.fixture
+def make_report(make_report):
+    def make(code, period, revenue, region="21", report_type="12-isth") -> ReportData:
+        return make_report(
+            period, revenue, code, report_type, name=f"Org {code}", region=region, activity_code="13.10"
+        )
+    return make
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseHandler(str(tmp_path / "reports.db"))
+
+
+@pytest.fixture
+def mirror(db, tmp_path):
+    mirror = AnalyticsMirror(db.db_path, tmp_path / "analytics.duckdb", sync_interval=0)
+    yield mirror
+    mirror.close()
+
+
+def change_log_size(db):
+    get_writer(db.db_path).run(lambda conn: None)  # wait for queued pruning
+    with sqlite3.connect(db.db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+
+
+class TestAnalyticsMirror:
+    """Tests for AnalyticsMirror."""
+    
+    def test_full_then_incremental_sync(self, db, mirror, make_report):
+        db.save_report(make_report("1001", "2025-01", 10.0), ValidationResult())
+        report_id = db.save_report(make_report("1002", "2025-01", 20.0), ValidationResult())
+        
+        assert mirror.sync() == 2
+        assert mirror.sync() == 0
+        assert change_log_size(db) == 0
+        
+        db.save_report(make_report("1001", "2025-01", 15.0, region="22"), ValidationResult())
+        db.delete_report(report_id)
+        
+        assert mirror.sync() == 2
+        assert mirror.query_cube(["region"]) == db.query_cube(["region"])
+        assert mirror.query_cube([]) == [{"reports": 1, "sales": 15.0, "exports": 0.0, "product_sales": 15.0}]
+    
+    def test_queries_match_sqlite(self, db, mirror, make_report):
+        for code, before, after in (("1001", 100.0, 110.0), ("1002", 100.0, 40.0), ("1003", 10.0, 30.0)):
+            db.save_report(make_report(code, "2024-12", before), ValidationResult())
+            db.save_report(make_report(code, "2025-01", after), ValidationResult())
+        
+        for dims in ([], ["period"], ["report_type", "period", "activity_code", "region"]):
+            assert mirror.query_cube(dims, {"period": "2025"}) == db.query_cube(dims, {"period": "2025"})
+        for by in ("change", "change_pct"):
+            assert mirror.rank_changes("2025-01", "12-isth", by=by, limit=2) == db.rank_changes("2025-01", "12-isth", by=by, limit=2)
+        with pytest.raises(ValueError):
+            mirror.rank_changes("2025-01", "12-isth", metric="name")
+    
+    def test_reopened_mirror_continues(self, db, mirror, tmp_path, make_report):
+        db.save_report(make_report("1001", "2025-01", 10.0), ValidationResult())
+        mirror.sync()
+        mirror.close()
+        db.save_report(make_report("1002", "2025-01", 5.0), ValidationResult())
+        
+        reopened = AnalyticsMirror(db.db_path, tmp_path / "analytics.duckdb", sync_interval=0)
+        try:
+            assert reopened.sync() == 1
+            assert reopened.query_cube([])[0]["reports"] == 2
+        finally:
+            reopened.close()
+    
+    def test_organization_change_refreshes_its_reports(self, db, mirror, make_report):
+        db.save_report(make_report("1001", "2025-01", 10.0), ValidationResult())
+        db.save_report(make_report("1002", "2025-01", 20.0), ValidationResult())
+        mirror.sync()
+        
+        db.save_report(make_report("1001", "2025", 1.0, region="22", report_type="1-isth"), ValidationResult())
+        
+        assert mirror.sync() == 2
+        assert [(cell["region"], cell["reports"]) for cell in mirror.query_cube(["region"])] == [("21", 1), ("22", 2)]
+        assert mirror.query_cube(["report_type", "region"]) == db.query_cube(["report_type", "region"])
+    
+    def test_behind_change_log_cap_reloads_in_full(self, db, mirror, monkeypatch, make_report):
+        db.save_report(make_report("1001", "2025-01", 10.0), ValidationResult())
+        mirror.sync()
+        monkeypatch.setattr(database.Config, "CHANGE_LOG_MAX_ROWS", 1)
+        db.save_report(make_report("1002", "2025-01", 20.0), ValidationResult())
+        db.save_report(make_report("1003", "2025-01", 30.0), ValidationResult())
+        
+        assert mirror.sync() == 3
+        assert mirror.query_cube([]) == db.query_cube([])
+    
+    def test_cube_rebuild_reloads_in_full(self, db, mirror, make_report):
+        db.save_report(make_report("1001", "2025-01", 10.0), ValidationResult())
+        db.save_report(make_report("1002", "2025-01", 20.0), ValidationResult())
+        mirror.sync()
+        
+        db.rebuild_stats_cube()
+        
+        assert mirror.sync() == 2
+        assert change_log_size(db) == 0
+
+
+class TestGetMirror:
+    """Tests for get_mirror fallbacks."""
+    
+    def test_mirror_held_by_other_process(self, db, tmp_path, monkeypatch):
+        monkeypatch.setattr(mirror_module, "_mirrors", {})
+        path = tmp_path / "analytics.duckdb"
+        holder = subprocess.Popen(
+            [sys.executable, "-c", f"import duckdb, time; conn = duckdb.connect({str(path)!r}); print('ok', flush=True); time.sleep(30)"],
+            stdout=subprocess.PIPE, text=True
+        )
+        try:
+            assert holder.stdout.readline().strip() == "ok"
+            with pytest.raises(RuntimeError, match="in use by another process"):
+                AnalyticsMirror(db.db_path, path)
+            assert get_mirror(db.db_path, path) is None
+        finally:
+            holder.kill()
+            holder.wait()
@@ -140,6 +140,29 @@ class TestAzstatParser:
         assert report.organization.code == "1293310"
         assert report.report_type == '1-isth'
         assert len(report.section_i.rows) > 0
+    
+    
+    def test_parse_products_split_autocomplete_label(self):
+        """Product code and name are split from the autocomplete label."""
+        html = """
+        <html>
+        <body>
+            <input name="tab1:0:j_idt51:j_idt55" value="1000">
+            <input name="tab2:0:j_idt155" value="016110430">
+            <input name="tab2:0:j_idt155_input" value="016110430 - A seksiyası.Torpaqların suvarılması">
+            <input name="tab2:0:j_idt158" value="ha">
+            <input name="tab2:1:j_idt155_input" value="016110440 - Heyvandarlıq">
+        </body>
+        </html>
+        """
+        parser = AzstatParser(html)
+        products = parser.parse_section_ii().products
+        
+        assert [(p.product_code, p.product_name) for p in products] == [
+            ("016110430", "A seksiyası.Torpaqların suvarılması"),
+            ("016110440", "Heyvandarlıq"),
+        ]
+        assert products[0].unit == "ha"
 
 
 class TestParserEdgeCases:
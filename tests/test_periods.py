@@ -0,0 +1,68 @@
+# Unit tests for report period keys
+
+import pytest
+
+from periods import (
+    period_key, period_range, period_label, previous_period, previous_period_key, next_period_key
+)
+
+
+class TestPeriodKey:
+    """Tests for period_key."""
+    
+    def test_valid_periods(self):
+        assert period_key("2025") == 202500
+        assert period_key("2025-01") == 202501
+        assert period_key("2025-12") == 202512
+        assert period_key(" 2024-07 ") == 202407
+    
+    def test_invalid_periods(self):
+        for period in (None, "", "2025-13", "2025-00", "25-01", "2025/01", "abc"):
+            assert period_key(period) is None
+    
+    def test_annual_sorts_before_its_months(self):
+        periods = ["2025-02", "2025", "2024-12", "2024", "2025-01"]
+        
+        assert sorted(periods, key=period_key) == ["2024", "2024-12", "2025", "2025-01", "2025-02"]
+
+
+class TestPeriodRange:
+    """Tests for period_range."""
+    
+    def test_ranges(self):
+        assert period_range("2025") == (202500, 202600)
+        assert period_range("2025-07") == (202507, 202508)
+        assert period_range("2025-Q3") == (202507, 202510)
+        assert period_range("2025-q1") == (202501, 202504)
+        assert period_range("2025-H2") == (202507, 202513)
+    
+    def test_invalid(self):
+        for spec in ("", "2025-Q5", "2025-13", "Q3-2025", "2025-H3"):
+            with pytest.raises(ValueError):
+                period_range(spec)
+
+
+class TestPeriodNeighbours:
+    """Tests for period_label, previous_period and the neighbouring period keys."""
+    
+    def test_label_round_trip(self):
+        for period in ("2025", "2025-01", "2024-12"):
+            assert period_label(period_key(period)) == period
+        assert period_label(None) is None
+    
+    def test_previous_period(self):
+        assert previous_period_key(202500) == 202400
+        assert previous_period_key(202501) == 202412
+        assert previous_period_key(202507) == 202506
+    
+    def test_previous_period_label(self):
+        assert previous_period("2025") == "2024"
+        assert previous_period("2025-01") == "2024-12"
+        assert previous_period("2025-10") == "2025-09"
+        assert previous_period("") is None
+        assert previous_period("2025-13") is None
+    
+    def test_next_period(self):
+        assert next_period_key(202500) == 202600
+        assert next_period_key(202512) == 202601
+        assert next_period_key(202507) == 202508
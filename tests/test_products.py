@@ -0,0 +1,58 @@
+# Unit tests for product catalog helpers
+
+import pytest
+
+from products import split_product_label, compact_products
+
+
+class TestSplitProductLabel:
+    """Tests for split_product_label."""
+    
+    def test_code_value_and_full_label(self):
+        assert split_product_label("016110430", "016110430 - A seksiyası.Torpaqların suvarılması") == (
+            "016110430", "A seksiyası.Torpaqların suvarılması"
+        )
+    
+    def test_full_label_in_either_input(self):
+        expected = ("016110430", "Suvarma")
+        
+        assert split_product_label("016110430 - Suvarma", "") == expected
+        assert split_product_label("", "016110430 - Suvarma") == expected
+        assert split_product_label("016110430 - Suvarma", "016110430 - Suvarma") == expected
+    
+    def test_plain_values(self):
+        assert split_product_label("111", "Məhsul") == ("111", "Məhsul")
+        assert split_product_label("111", "111") == ("111", "")
+        assert split_product_label(" 111 ", None) == ("111", "")
+        assert split_product_label("", "") == ("", "")
+    
+    def test_name_keeps_later_separators(self):
+        assert split_product_label("", "111 - Boru - polad") == ("111", "Boru - polad")
+    
+    def test_strings_are_interned(self):
+        first = split_product_label("".join(["0161", "10430"]), "".join(["x - Suv", "arma"]))
+        second = split_product_label("".join(["01611", "0430"]), "".join(["x - Suva", "rma"]))
+        
+        assert first[0] is second[0]
+        assert first[1] is second[1]
+
+
+class TestCompactProducts:
+    """Tests for compact_products."""
+    
+    def test_code_and_name_replaced_by_id(self):
+        products = [
+            {"product_code": "111", "product_name": "A", "unit": "ton", "sold_value": 5.0},
+            {"product_code": "222", "product_name": "B", "unit": "kq", "sold_value": 1.0},
+        ]
+        
+        rows = compact_products(products, {("111", "A"): 7, ("222", "B"): 9})
+        
+        assert rows == [
+            {"product_id": 7, "unit": "ton", "sold_value": 5.0},
+            {"product_id": 9, "unit": "kq", "sold_value": 1.0},
+        ]
+    
+    def test_unknown_product_raises(self):
+        with pytest.raises(KeyError):
+            compact_products([{"product_code": "111", "product_name": "A"}], {})
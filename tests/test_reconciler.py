@@ -0,0 +1,155 @@
+# Unit tests for reconciliation engine
+
+import pytest
+
+from models import (
+    OrganizationInfo, SectionIRow, SectionI,
+    ProductRow, SectionII, ReportData, ValidationResult
+)
+from database import DatabaseHandler
+from reconciler import ReconciliationEngine
+
+
+@pytest.fixture
+def make_report(make_report):
+    """Create a report with one sales row, one export row and one product."""
+    def make(org_code, report_type, period, sales, exports, produced, stock) -> ReportData:
+        export_row = "8" if report_type == '1-isth' else "1.2"
+        return make_report(
+            period, org_code=org_code, report_type=report_type, name=f"Org {org_code}",
+            rows=[
+                SectionIRow(row_code="1", row_name="Satış", current_year=sales),
+                SectionIRow(row_code=export_row, row_name="İxrac", current_year=exports),
+            ],
+            products=[
+                ProductRow(
+                    product_code="111", product_name="Product",
+                    produced=produced, sold_quantity=produced, sold_value=sales,
+                    year_end_stock=stock
+                ),
+            ]
+        )
+    return make
+
+
+@pytest.fixture
+def save_year(db, make_report):
+    """Save 100 sales per month and the annual report."""
+    def save(org_code, year="2025", annual_sales=1200.0, months=range(1, 13)):
+        for month in months:
+            db.save_report(
+                make_report(org_code, '12-isth', f"{year}-{month:02d}", 100.0, 10.0, 5.0, float(month)),
+                ValidationResult()
+            )
+        db.save_report(
+            make_report(org_code, '1-isth', year, annual_sales, 120.0, 60.0, 12.0),
+            ValidationResult()
+        )
+    return save
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseHandler(str(tmp_path / "reports.db"))
+
+
+class TestReconciliationEngine:
+    """Tests for ReconciliationEngine."""
+    
+    def test_consistent_year(self, db, save_year):
+        save_year("1001")
+        
+        result = ReconciliationEngine(db).reconcile("1001", "2025")
+        
+        assert result.status == "passed"
+        assert len(result.monthly_periods) == 12
+        assert result.annual_report_id is not None
+        assert result.issues == []
+    
+    def test_sales_mismatch(self, db, save_year):
+        save_year("1001", annual_sales=5000.0)
+        
+        result = ReconciliationEngine(db).reconcile("1001", "2025")
+        
+        assert result.status == "warning"
+        fields = {issue.field for issue in result.issues}
+        assert "section_i.1" in fields
+        assert "section_ii.111.sold_value" in fields
+        assert "section_i.8" not in fields
+    
+    def test_missing_months_skipped(self, db, save_year):
+        save_year("1001", months=range(1, 11))
+        
+        result = ReconciliationEngine(db).reconcile("1001", "2025")
+        
+        assert result.status == "skipped"
+        assert "11, 12" in result.issues[0].message
+    
+    def test_missing_annual_skipped(self, db, make_report):
+        db.save_report(make_report("1001", '12-isth', "2025-01", 1.0, 0.0, 1.0, 0.0), ValidationResult())
+        
+        result = ReconciliationEngine(db).reconcile("1001", "2025")
+        
+        assert result.status == "skipped"
+        assert result.annual_report_id is None
+    
+    def test_other_years_ignored(self, db, make_report, save_year):
+        save_year("1001")
+        db.save_report(make_report("1001", '12-isth', "2026-01", 999.0, 0.0, 1.0, 0.0), ValidationResult())
+        db.save_report(make_report("1001", '12-isth', "2024-12", 999.0, 0.0, 1.0, 0.0), ValidationResult())
+        
+        result = ReconciliationEngine(db).reconcile("1001", "2025")
+        
+        assert result.status == "passed"
+        assert len(result.monthly_periods) == 12
+    
+    def test_reconcile_year_all_organizations(self, db, save_year):
+        save_year("1001")
+        save_year("1002", annual_sales=5000.0)
+        save_year("1003", months=range(1, 6))
+        
+        results = {r.organization_code: r.status for r in ReconciliationEngine(db).reconcile_year("2025")}
+        
+        assert results == {"1001": "passed", "1002": "warning", "1003": "skipped"}
+
+
+class TestPreviousYearAudit:
+    """Tests for 1-isth previous_year column checks."""
+    
+    def annual(self, org_code, year, current, previous):
+        return ReportData(
+            organization=OrganizationInfo(code=org_code),
+            report_type='1-isth',
+            report_period=year,
+            section_i=SectionI(rows=[
+                SectionIRow(row_code="1", row_name="Satış", current_year=current, previous_year=previous),
+            ]),
+            section_ii=SectionII()
+        )
+    
+    def test_check_previous_year(self, db):
+        db.save_report(self.annual("1001", "2024", 800.0, 0.0), ValidationResult())
+        db.save_report(self.annual("1001", "2025", 1000.0, 650.0), ValidationResult())
+        
+        result = ReconciliationEngine(db).check_previous_year("1001", "2025")
+        
+        assert result.status == "warning"
+        assert result.issues[0].field == "section_i.1.previous_year"
+    
+    def test_check_previous_year_without_prior(self, db):
+        db.save_report(self.annual("1001", "2025", 1000.0, 650.0), ValidationResult())
+        
+        result = ReconciliationEngine(db).check_previous_year("1001", "2025")
+        
+        assert result.status == "skipped"
+    
+    def test_audit_previous_year(self, db):
+        for org_code, reported_previous in (("1001", 800.0), ("1002", 10.0), ("1003", 800.0)):
+            db.save_report(self.annual(org_code, "2025", 1000.0, reported_previous), ValidationResult())
+        db.save_report(self.annual("1001", "2024", 800.0, 0.0), ValidationResult())
+        db.save_report(self.annual("1002", "2024", 800.0, 0.0), ValidationResult())
+        
+        results = {r.organization_code: r.status for r in ReconciliationEngine(db).audit_previous_year("2025")}
+        
+        # 1003 has no prior-year report and is not part of the join
+        assert results == {"1001": "passed", "1002": "warning"}
@@ -272,6 +272,151 @@ class TestValidationEngine:
         assert result.error_count >= 1  # Negative import
         assert result.warning_count >= 1  # Internal use warning
 
+    def _stock_product(self, code, produced, sold, internal, stock):
+        return {
+            "product_code": code,
+            "product_name": f"Product {code}",
+            "unit": "ton",
+            "produced": produced,
+            "internal_use": internal,
+            "sold_quantity": sold,
+            "sold_value": sold * 10,
+            "year_end_stock": stock,
+            "import_value": 0.0
+        }
+
+    def test_inventory_continuity_balanced(self):
+        """Test stock balance passes when beginning stock comes from previous period."""
+        previous = self.create_test_report(products_data=[
+            self._stock_product("111", 100.0, 80.0, 0.0, 50.0)
+        ])
+        previous.report_period = "2023"
+        # 50 + 100 - 90 - 10 = 50
+        current = self.create_test_report(products_data=[
+            self._stock_product("111", 100.0, 90.0, 10.0, 50.0)
+        ])
+
+        result = ValidationEngine(current, previous).validate()
+
+        assert not any(i.field == 'section_ii.111.year_end_stock' for i in result.issues)
+
+    def test_inventory_continuity_mismatch(self):
+        """Test stock balance warning when year end stock does not add up."""
+        previous = self.create_test_report(products_data=[
+            self._stock_product("111", 100.0, 80.0, 0.0, 50.0)
+        ])
+        previous.report_period = "2023"
+        # Expected 50 + 100 - 90 - 10 = 50, reported 200
+        current = self.create_test_report(products_data=[
+            self._stock_product("111", 100.0, 90.0, 10.0, 200.0)
+        ])
+
+        result = ValidationEngine(current, previous).validate()
+
+        assert result.status == "warning"
+        assert any(
+            i.field == 'section_ii.111.year_end_stock' and i.severity == 'logical'
+            for i in result.issues
+        )
+
+    def test_inventory_continuity_skipped_for_non_consecutive_period(self):
+        """Test stock balance is not checked against a non-adjacent period."""
+        previous = self.create_test_report(products_data=[
+            self._stock_product("111", 100.0, 80.0, 0.0, 50.0)
+        ])
+        previous.report_period = "2021"
+        current = self.create_test_report(products_data=[
+            self._stock_product("111", 100.0, 90.0, 10.0, 200.0)
+        ])
+
+        result = ValidationEngine(current, previous).validate()
+
+        assert not any(i.field == 'section_ii.111.year_end_stock' for i in result.issues)
+
+    def _multi_issue_report(self):
+        return self.create_test_report(
+            org_code="",  # Error
+            products_data=[
+                self._stock_product("111", 100.0, 50.0, 150.0, 0.0),  # Warning
+                {**self._stock_product("222", 10.0, 0.0, 0.0, 0.0), "import_value": -1.0},  # Error
+            ]
+        )
+
+    def test_counts_only_mode(self):
+        """Test counts_only mode tallies categories without building issues."""
+        report = self._multi_issue_report()
+        full = ValidationEngine(report).validate()
+        counts = ValidationEngine(report).validate(mode='counts_only')
+
+        assert counts.issues == []
+        assert counts.status == full.status == "failed"
+        assert counts.error_count == full.error_count == 2
+        assert counts.warning_count == full.warning_count
+        assert counts.info_count == full.info_count
+
+    def test_fail_fast_mode(self):
+        """Test fail_fast mode stops at the first blocking error."""
+        result = ValidationEngine(self._multi_issue_report()).validate(mode='fail_fast')
+
+        assert result.status == "failed"
+        assert result.error_count == 1
+        assert len(result.issues) == 1
+        assert result.issues[0].category == 'error'
+
+    def test_fail_fast_mode_without_errors_runs_all_checks(self):
+        """Test fail_fast mode behaves like full mode when nothing blocks."""
+        report = self.create_test_report(products_data=[
+            self._stock_product("111", 100.0, 50.0, 150.0, 0.0)
+        ])
+        result = ValidationEngine(report).validate(mode='fail_fast')
+        full = ValidationEngine(report).validate()
+
+        assert result.status == "warning"
+        assert result.issues == full.issues
+
+    def test_unknown_mode(self):
+        """Test unknown validation mode is rejected."""
+        with pytest.raises(ValueError):
+            ValidationEngine(self.create_test_report()).validate(mode='fast')
+    
+    def test_previous_year_column_matches_prior_report(self):
+        """Test 1-isth previous_year column agreeing with prior-year report."""
+        previous = self.create_test_report(rows_data=[("1", "Malların satışı", 800.0, 700.0)])
+        previous.report_period = "2023"
+        current = self.create_test_report(rows_data=[("1", "Malların satışı", 1000.0, 800.0)])
+        
+        result = ValidationEngine(current, previous).validate()
+        
+        assert not any(i.field == 'section_i.1.previous_year' for i in result.issues)
+    
+    def test_previous_year_column_drift(self):
+        """Test 1-isth previous_year column drifting from prior-year report."""
+        previous = self.create_test_report(rows_data=[("1", "Malların satışı", 500.0, 700.0)])
+        previous.report_period = "2023"
+        current = self.create_test_report(rows_data=[("1", "Malların satışı", 1000.0, 800.0)])
+        
+        result = ValidationEngine(current, previous).validate()
+        
+        assert any(
+            i.field == 'section_i.1.previous_year' and i.severity == 'consistency'
+            for i in result.issues
+        )
+    
+    def test_issues_carry_rule_id(self):
+        """Test that every issue names the check that raised it."""
+        report = self.create_test_report(
+            org_code="",
+            rows_data=[("1", "Malların satışı", -100.0, 800.0)],
+            products_data=[{"product_code": "111", "produced": -1.0}]
+        )
+        
+        result = ValidationEngine(report).validate()
+        
+        assert {i.rule_id for i in result.issues} >= {
+            'negative_value', 'missing_organization_code', 'negative_product_value'
+        }
+        assert all(i.rule_id for i in result.issues)
+
 
 class TestValidationEdgeCases:
     """Edge case tests for validation."""
@@ -0,0 +1,75 @@
+# Unit tests for report version deltas
+
+import json
+
+from versions import row_keys, make_delta, apply_delta, diff_documents
+
+
+def product(code, value, name="Product"):
+    return {"product_code": code, "product_name": name, "sold_value": value}
+
+
+def document(products, rows=None, name="Org", validation=None):
+    return {
+        "organization_name": name,
+        "section_i": rows or [{"row_code": "1", "current_year": 100.0}],
+        "section_ii": products,
+        "validation_results": validation or {"status": "passed"},
+    }
+
+
+class TestRowKeys:
+    """Tests for row_keys."""
+    
+    def test_repeated_and_empty_codes(self):
+        rows = [{"product_code": "111"}, {"product_code": ""}, {"product_code": "111"}, {}]
+        
+        assert row_keys(rows, "product_code") == ["111#1", "#1", "111#2", "#2"]
+
+
+class TestDelta:
+    """Tests for make_delta / apply_delta."""
+    
+    def test_round_trip(self):
+        older = document([product("111", 1.0), product("222", 2.0), product("", 3.0), product("", 4.0)])
+        newer = document(
+            [product("333", 9.0), product("", 3.5), product("111", 1.0)],
+            rows=[{"row_code": "1", "current_year": 200.0}],
+            name="Org (renamed)",
+            validation={"status": "warning"}
+        )
+        
+        delta = make_delta(newer, older)
+        
+        assert apply_delta(newer, delta) == older
+        assert make_delta(older, older) == {}
+    
+    def test_delta_stores_only_edited_rows(self):
+        older = document([product(str(code), float(code)) for code in range(500)])
+        newer = document([product(str(code), float(code) + (code == 7)) for code in range(500)])
+        
+        delta = make_delta(newer, older)
+        
+        assert list(delta) == ["section_ii"]
+        assert delta["section_ii"] == {"rows": {"7#1": product("7", 7.0)}}
+        assert len(json.dumps(delta)) < len(json.dumps(older)) / 100
+        assert apply_delta(newer, delta) == older
+
+
+class TestDiffDocuments:
+    """Tests for diff_documents."""
+    
+    def test_added_removed_changed(self):
+        older = document([product("111", 1.0), product("222", 2.0)])
+        newer = document([product("111", 1.5), product("333", 3.0)], name="New name")
+        
+        diff = diff_documents(older, newer)
+        
+        assert diff["organization_name"] == {"from": "Org", "to": "New name"}
+        assert "validation_results" not in diff
+        assert diff["section_i"] == {"added": [], "removed": [], "changed": []}
+        assert diff["section_ii"]["added"] == [product("333", 3.0)]
+        assert diff["section_ii"]["removed"] == [product("222", 2.0)]
+        assert diff["section_ii"]["changed"] == [
+            {"key": "111#1", "product_code": "111", "fields": {"sold_value": {"from": 1.0, "to": 1.5}}}
+        ]
@@ -0,0 +1,122 @@
+# Unit tests for the single-writer queue
+
+import sqlite3
+import threading
+import pytest
+
+from models import (
+    OrganizationInfo, SectionIRow, SectionI, SectionII, ReportData, ValidationResult
+)
+from database import DatabaseHandler
+from writer import WriteQueue, get_writer
+
+
+@pytest.fixture
+def writer(tmp_path):
+    path = tmp_path / "writes.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE items (value INTEGER UNIQUE)")
+    writer = WriteQueue(path, max_batch=100, max_delay=0.05)
+    yield writer
+    writer.close()
+
+
+def insert(value):
+    def job(conn):
+        conn.execute("INSERT INTO items (value) VALUES (?)", (value,))
+        return value
+    return job
+
+
+def values(writer):
+    with sqlite3.connect(writer.db_path) as conn:
+        return sorted(row[0] for row in conn.execute("SELECT value FROM items"))
+
+
+class TestWriteQueue:
+    """Tests for WriteQueue."""
+    
+    def test_pending_writes_committed_together(self, writer):
+        release = threading.Event()
+        blocker = writer.submit(lambda conn: release.wait(5))
+        futures = [writer.submit(insert(value)) for value in range(10)]
+        release.set()
+        
+        assert blocker.result(5) is True
+        assert [future.result(5) for future in futures] == list(range(10))
+        assert values(writer) == list(range(10))
+        assert writer.stats()["batches"] == 1
+        assert writer.stats()["jobs"] == 11
+    
+    def test_failing_job_rolled_back_alone(self, writer):
+        futures = [writer.submit(insert(value)) for value in (1, 2, 1, 3)]
+        
+        with pytest.raises(sqlite3.IntegrityError):
+            futures[2].result(5)
+        assert [futures[i].result(5) for i in (0, 1, 3)] == [1, 2, 3]
+        assert values(writer) == [1, 2, 3]
+    
+    def test_timed_out_job_is_not_written(self, writer, monkeypatch):
+        monkeypatch.setattr("writer.Config.WRITE_TIMEOUT", 0.2)
+        release = threading.Event()
+        blocker = writer.submit(lambda conn: release.wait(5))
+        
+        with pytest.raises(TimeoutError):
+            writer.run(insert(1))
+        release.set()
+        blocker.result(5)
+        writer.submit(insert(2)).result(5)
+        
+        assert values(writer) == [2]
+    
+    def test_running_job_outlives_timeout(self, writer, monkeypatch):
+        monkeypatch.setattr("writer.Config.WRITE_TIMEOUT", 0.2)
+        
+        def slow(conn):
+            threading.Event().wait(0.5)
+            return insert(1)(conn)
+        
+        assert writer.run(slow) == 1
+        assert values(writer) == [1]
+    
+    def test_close_commits_pending_jobs(self, writer):
+        futures = [writer.submit(insert(value)) for value in range(5)]
+        writer.close()
+        
+        assert all(future.done() for future in futures)
+        assert values(writer) == list(range(5))
+
+
+class TestConcurrentSaves:
+    """Tests for save_report through the writer thread."""
+    
+    def test_concurrent_saves_and_reads(self, tmp_path):
+        db = DatabaseHandler(str(tmp_path / "reports.db"))
+        errors = []
+        
+        def upload(org_code):
+            try:
+                for year in range(2000, 2010):
+                    report = ReportData(
+                        organization=OrganizationInfo(code=org_code),
+                        report_type="1-isth",
+                        report_period=str(year),
+                        section_i=SectionI(rows=[SectionIRow(row_code="1", row_name="Satış", current_year=float(year))]),
+                        section_ii=SectionII()
+                    )
+                    db.save_report(report, ValidationResult())
+                    db.get_history(org_code=org_code, limit=5)
+            except Exception as exc:
+                errors.append(exc)
+        
+        threads = [threading.Thread(target=upload, args=(f"{org:07d}",)) for org in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert errors == []
+        assert db.get_statistics()["total"] == 80
+        stats = get_writer(db.db_path).stats()
+        assert stats["jobs"] == 80
+        assert stats["batches"] < 80